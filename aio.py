@@ -0,0 +1,56 @@
+"""
+The parts of uasyncio used by the tester, the same on the device and on the host.
+
+The LoBo firmware does not freeze uasyncio in, it has to be installed to /flash/lib, so AVAILABLE tells whether
+it was found.  On the host the asyncio module of CPython takes its place; the simulator gives it an event loop
+on the virtual clock.  The old uasyncio of MicroPython 1.9 has no run() and no module level create_task(), the
+event loop is used for both there.
+"""
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    try:
+        import asyncio
+    except ImportError:
+        asyncio = None
+
+AVAILABLE = asyncio is not None
+
+
+def _sleep_ms(ms: int):
+    """
+    Args:
+        ms (int): The time in milliseconds to hand to the other tasks.
+    Returns:
+        The awaitable, i.e. await aio.sleep_ms(20)
+    """
+    return asyncio.sleep(ms / 1000)
+
+
+# the sleep_ms() of uasyncio returns the same object every time, a test awaits it twice per cycle
+sleep_ms = asyncio.sleep_ms if hasattr(asyncio, 'sleep_ms') else _sleep_ms
+
+
+def create_task(coro):
+    """
+    Args:
+        coro: The coroutine to run as a task of the running event loop.
+    Returns:
+        The task.
+    """
+    if hasattr(asyncio, 'create_task'):
+        return asyncio.create_task(coro)
+    return asyncio.get_event_loop().create_task(coro)
+
+
+def run(coro):
+    """
+    Args:
+        coro: The coroutine to run to the end, with the tasks it creates.
+    Returns:
+        What the coroutine returned.
+    """
+    if hasattr(asyncio, 'run'):
+        return asyncio.run(coro)
+    return asyncio.get_event_loop().run_until_complete(coro)
@@ -0,0 +1,135 @@
+"""
+Interrupt driven button input.
+
+Every edge on a button pin raises an IRQ.  The handler debounces it against the time of the last accepted edge
+and puts a one byte event into a ring buffer, which the foreground reads with get() whenever it has time.  The
+IRQ handler is the only writer of the head of the ring and get() the only writer of the tail, so no lock is
+needed and nothing is allocated on either side.  Nothing reads the pins during a test, so a press never costs
+the test a timing slot; the events simply wait in the ring.
+
+Held buttons auto-repeat, starting after REPEAT_DELAY_MS and getting faster down to MIN_REPEAT_MS.  Repeats are
+made by get() from the time the button went down, not queued, so a long press can not fill the ring.
+"""
+
+import machine
+import utime
+from micropython import const
+
+import lib.m5stack as m5stack
+
+BUTTON_A = const(0)
+BUTTON_B = const(1)
+BUTTON_C = const(2)
+BUTTON_MASK = const(0x0f)
+
+NO_EVENT = const(-1)
+EVENT_PRESS = const(0x10)
+EVENT_RELEASE = const(0x20)
+EVENT_REPEAT = const(0x30)
+EVENT_MASK = const(0xf0)
+
+QUEUE_SIZE = const(16)
+DEBOUNCE_MS = const(20)
+REPEAT_DELAY_MS = const(400)
+REPEAT_MS = const(150)
+MIN_REPEAT_MS = const(40)
+
+
+class ButtonInput:
+    """
+    Args:
+        pins (tuple): The GPIO pins of the buttons, active low. Default = the A, B and C buttons of the M5Stack
+        debounce_ms (int): Edges closer than this to the last accepted edge are bounces. Default = DEBOUNCE_MS
+        repeat_delay_ms (int): How long a button is held before it repeats. Default = REPEAT_DELAY_MS
+        repeat_ms (int): The first repeat interval, shortened by a quarter on every repeat. Default = REPEAT_MS
+        min_repeat_ms (int): The shortest repeat interval. Default = MIN_REPEAT_MS
+    Notes:
+        get() returns NO_EVENT or the index of the button ORed with EVENT_PRESS, EVENT_RELEASE or EVENT_REPEAT.
+        The events that did not fit in the ring are counted in dropped.
+    """
+    def __init__(self, pins: tuple=(m5stack.BUTTON_A_PIN, m5stack.BUTTON_B_PIN, m5stack.BUTTON_C_PIN),
+                 debounce_ms: int=DEBOUNCE_MS, repeat_delay_ms: int=REPEAT_DELAY_MS, repeat_ms: int=REPEAT_MS,
+                 min_repeat_ms: int=MIN_REPEAT_MS):
+        self.debounce_ms = debounce_ms
+        self.repeat_delay_ms = repeat_delay_ms
+        self.repeat_ms = repeat_ms
+        self.min_repeat_ms = min_repeat_ms
+        self.queue = bytearray(QUEUE_SIZE)
+        self.head = 0  # written by the IRQ handler only
+        self.tail = 0  # written by get() only
+        self.dropped = 0
+        self.pins = []
+        self.pressed = bytearray(len(pins))
+        self.accepted_ms = [0] * len(pins)
+        self.next_repeat_ms = [0] * len(pins)
+        self.interval_ms = [0] * len(pins)
+        self.handlers = []
+        for pin_number in pins:
+            pin = machine.Pin(pin_number, machine.Pin.IN)
+            handler = self._handler(len(self.pins))
+            self.pins.append(pin)
+            self.handlers.append(handler)  # keeps the closure alive
+            self.pressed[len(self.pins) - 1] = 1 - pin.value()
+            pin.irq(handler=handler, trigger=machine.Pin.IRQ_ANYEDGE)
+
+    def _handler(self, index: int):
+        def handler(pin):
+            self._edge(index, utime.ticks_ms())
+        return handler
+
+    def _edge(self, index: int, now: int):
+        level = 1 - self.pins[index].value()
+        if level == self.pressed[index] or utime.ticks_diff(now, self.accepted_ms[index]) < self.debounce_ms:
+            return
+        self.pressed[index] = level
+        self.accepted_ms[index] = now
+        if level:
+            self.next_repeat_ms[index] = utime.ticks_add(now, self.repeat_delay_ms)
+            self.interval_ms[index] = self.repeat_ms
+            self._put(index | EVENT_PRESS)
+        else:
+            self._put(index | EVENT_RELEASE)
+
+    def _put(self, event: int):
+        head = (self.head + 1) % QUEUE_SIZE
+        if head == self.tail:
+            self.dropped += 1
+            return
+        self.queue[self.head] = event
+        self.head = head
+
+    def get(self) -> int:
+        """
+        Returns:
+            The oldest event, a repeat of a held button or NO_EVENT.
+        Notes:
+            Edges lost to the debounce window, i.e. a release right after a press, are picked up here once the
+            pin has been stable for debounce_ms.
+        """
+        if self.tail != self.head:
+            event = self.queue[self.tail]
+            self.tail = (self.tail + 1) % QUEUE_SIZE
+            return event
+
+        now = utime.ticks_ms()
+        for index in range(len(self.pins)):
+            if 1 - self.pins[index].value() != self.pressed[index]:
+                state = machine.disable_irq()
+                self._edge(index, now)
+                machine.enable_irq(state)
+                if self.tail != self.head:
+                    return self.get()
+            elif self.pressed[index] and utime.ticks_diff(now, self.next_repeat_ms[index]) >= 0:
+                self.next_repeat_ms[index] = utime.ticks_add(now, self.interval_ms[index])
+                self.interval_ms[index] = max(self.interval_ms[index] * 3 // 4, self.min_repeat_ms)
+                return index | EVENT_REPEAT
+        return NO_EVENT
+
+    def clear(self):
+        """
+        Returns:
+            Nothing
+        Notes:
+            Drops the queued events, i.e. the presses made while a test was running.
+        """
+        self.tail = self.head
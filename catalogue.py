@@ -0,0 +1,175 @@
+"""
+Persisted index of the test files on the SD card: TEST_*.py scripts and TEST_*.cyc profiles.
+
+The menu shows the test files listed in the index right away, instead of listing the whole card first.  The card
+is then checked in the background, from the idle time of the menu loop: the directory is walked with ilistdir()
+a few entries at a time, so the full listing is never held in RAM, and the index is only rewritten when the test
+files found differ from the indexed ones.  The directory mtime is not used as the key, FAT only keeps it to the
+nearest 2 seconds and not every firmware updates it.
+
+Index layout: the first line holds the signature of the test files (their number and a hash of their names and
+sizes), then one test file per line.
+"""
+
+import uos as os
+import utime
+
+from testprofile import PROFILE_SUFFIX
+
+INDEX_PATH = '/flash/test_index'
+TEST_DIR = '/sd'
+
+
+def is_test_file(filename: str) -> bool:
+    return filename[:5] == "TEST_" and (filename[-3:].lower() == ".py" or filename[-4:].lower() == PROFILE_SUFFIX)
+
+
+def test_name(filename: str) -> str:
+    """
+    Args:
+        filename (str): A test file, i.e. 'TEST_32109.py'
+    Returns:
+        The name shown in the menu, i.e. '32109'
+    """
+    return filename[5:filename.rindex('.')]
+
+
+def menu_names(filenames: list) -> list:
+    """
+    Args:
+        filenames (list): Test files, i.e. ['TEST_31334.cyc', 'TEST_32109.cyc', 'TEST_32109.py']
+    Returns:
+        The name shown in the menu for each, in the same order.  The name keeps its suffix where a script and a
+        profile share one, i.e. ['31334', '32109.cyc', '32109.py']
+    """
+    names = [test_name(filename) for filename in filenames]
+    return [filename[5:] if names.count(name) > 1 else name for name, filename in zip(names, filenames)]
+
+
+def _entry_hash(filename: str, size: int) -> int:
+    value = size & 0xffff
+    for char in filename:
+        value = (value * 33 + ord(char)) & 0xffffff
+    return value
+
+
+class TestCatalogue:
+    """
+    Args:
+        directory (str): The directory holding the test files. Default = TEST_DIR
+        index_path (str): Where the index is kept. Default = INDEX_PATH
+    Notes:
+        load() returns the indexed test files, building the index first if there is none.  check() starts the
+        background walk and step() advances it, returning True once it has found a change, at which point
+        names holds the new list.  The first check() after load() built the index is skipped, the card has just
+        been walked.
+    """
+    def __init__(self, directory: str=TEST_DIR, index_path: str=INDEX_PATH):
+        self.directory = directory
+        self.index_path = index_path
+        self.names = []
+        self.signature = ''
+        self.built = ''  # signature of the index load() built, until check() is first called
+        self.walk = None
+
+    def load(self) -> list:
+        """
+        Returns:
+            The sorted test files from the index.
+        """
+        try:
+            with open(self.index_path, 'r') as index_file:
+                self.signature = index_file.readline().strip()
+                self.names = [line.strip() for line in index_file if line.strip()]
+        except OSError:
+            self.rebuild()
+            self.built = self.signature
+        return self.names
+
+    def rebuild(self) -> list:
+        """
+        Returns:
+            The sorted test files, read from the directory right away.
+        """
+        self.walk = self._walk()
+        while self.walk is not None:
+            self.step()
+        return self.names
+
+    def check(self):
+        """
+        Returns:
+            Nothing
+        Notes:
+            Starts the background walk, unless load() has just built the index from the same walk.
+        """
+        built = self.built
+        self.built = ''
+        if built and built == self.signature:
+            return
+        self.walk = self._walk()
+
+    def step(self, budget_ms: int=0) -> bool:
+        """
+        Args:
+            budget_ms (int): Keep walking for this many milliseconds. 0 = a single batch of entries. Default = 0
+        Returns:
+            True if the walk just finished and found test files added or removed.
+        """
+        if self.walk is None:
+            return False
+        start = utime.ticks_ms()
+        while True:
+            try:
+                next(self.walk)
+            except StopIteration as done:
+                self.walk = None
+                return done.value is True
+            if utime.ticks_diff(utime.ticks_ms(), start) >= budget_ms:
+                return False
+
+    def _walk(self):
+        found = []
+        total = 0
+        count = 0
+        try:
+            for entry in os.ilistdir(self.directory):
+                if is_test_file(entry[0]):
+                    found.append(entry[0])
+                    total += _entry_hash(entry[0], entry[3] if len(entry) > 3 else 0)
+                count += 1
+                if count % 8 == 0:
+                    yield
+        except OSError:
+            print("Can not list %s" % self.directory)
+            return False
+        found.sort()
+        signature = "%d-%x" % (len(found), total & 0xffffffff)
+        changed = found != self.names
+        if signature == self.signature and not changed:
+            return False
+        self.names = found
+        self.signature = signature
+        self.save()
+        return changed
+
+    def save(self):
+        """
+        Returns:
+            Nothing
+        Notes:
+            Writes the index to a temporary file first, so a power loss never leaves a half written index.
+        """
+        temp_path = self.index_path + '.tmp'
+        try:
+            with open(temp_path, 'w') as index_file:
+                index_file.write(self.signature + "\n")
+                for name in self.names:
+                    index_file.write(name + "\n")
+            try:
+                os.remove(self.index_path)
+            except OSError:
+                pass
+            os.rename(temp_path, self.index_path)
+        except OSError:
+            print("Can not write the test index to %s" % self.index_path)
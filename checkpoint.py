@@ -0,0 +1,182 @@
+"""
+Checkpoints of a running test, so a long run can resume where it stopped after a power loss.
+
+The test file, round index and last completed cycle are written to flash, alternating between two slots with a
+sequence number and a checksum.  A write interrupted by a power loss can only damage the older slot, and load()
+always returns the newest slot that is intact.  Writes are batched by time to limit flash wear, and only happen
+from the idle hook when there is time for them before the next edge.
+"""
+
+try:
+    import ustruct as struct
+except ImportError:
+    import struct
+
+import uos as os
+import utime
+from micropython import const
+
+CHECKPOINT_PATH = '/flash/checkpoint'   # the slots are CHECKPOINT_PATH + '.0' and '.1'
+CHECKPOINT_INTERVAL_MS = const(30000)   # minimum time between two writes during a test
+WRITE_COST_MS = const(50)               # assumed cost of a write before one has been measured
+GUARD_MS = const(2)
+
+MAGIC = b'CKPT'
+NAME_SIZE = const(128)          # the longest test file name, in utf-8 bytes, that can be checkpointed
+RECORD_FORMAT = '<4sIHIIB128sH'  # magic, sequence, round, cycle, cycles of the round, name length, name, checksum
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+
+
+def _checksum(data) -> int:
+    total = 0
+    for byte in data:
+        total = (total + byte) & 0xffff
+    return total
+
+
+class Checkpoint:
+    """
+    Args:
+        path (str): The base name of the two slot files. Default = CHECKPOINT_PATH
+        interval_ms (int): The minimum time between two writes during a test. Default = CHECKPOINT_INTERVAL_MS
+    Notes:
+        During a test, call update() after every cycle (it only stores the values) and pass service() to the
+        idle hook.  save() writes right away, for the end of a round.  clear() removes the checkpoint once the
+        whole test file has run.  A test file whose name is longer than NAME_SIZE is not checkpointed, as a
+        truncated name would never match the file again.
+    """
+    def __init__(self, path: str=CHECKPOINT_PATH, interval_ms: int=CHECKPOINT_INTERVAL_MS):
+        self.path = path
+        self.interval_ms = interval_ms
+        self.buffer = bytearray(RECORD_SIZE)
+        self.sequence = 0
+        self.slot = 0
+        self.name = ''
+        self.encoded = b''  # the name as saved, empty when it can not be
+        self.round = 0
+        self.cycle = 0
+        self.cycles = 0
+        self.dirty = False
+        self.write_cost_ms = WRITE_COST_MS
+        self.last_write = utime.ticks_ms()
+        saved = self._newest()
+        if saved is not None:
+            self.sequence, self.slot = saved[0], saved[1]
+
+    def _slot_path(self, slot: int) -> str:
+        return '%s.%d' % (self.path, slot)
+
+    def _read_slot(self, slot: int):
+        try:
+            with open(self._slot_path(slot), 'rb') as slot_file:
+                data = slot_file.read()
+        except OSError:
+            return None
+        if len(data) != RECORD_SIZE:
+            return None
+        magic, sequence, round_index, cycle, cycles, length, name, checksum = struct.unpack(RECORD_FORMAT, data)
+        if magic != MAGIC or checksum != _checksum(data[:-2]):
+            return None
+        return sequence, slot, str(name[:length], 'utf-8'), round_index, cycle, cycles
+
+    def _newest(self):
+        newest = None
+        for slot in (0, 1):
+            saved = self._read_slot(slot)
+            if saved is not None and (newest is None or saved[0] > newest[0]):
+                newest = saved
+        return newest
+
+    def load(self):
+        """
+        Returns:
+            (test file, round index, last completed cycle, cycles of the round) of the newest intact checkpoint,
+            or None if there is none.
+        """
+        saved = self._newest()
+        if saved is None:
+            return None
+        return saved[2:]
+
+    def start(self, name: str, round_index: int, cycles: int):
+        """
+        Args:
+            name (str): The test file, i.e. 'TEST_32109.py'
+            round_index (int): The index of the round starting now, 0 for the first begin_test() of the file.
+            cycles (int): The number of cycles of the round.
+        Returns:
+            Nothing
+        """
+        self.name = name
+        self.encoded = name.encode('utf-8')
+        if len(self.encoded) > NAME_SIZE:
+            print("%s is longer than %d bytes, it will not be checkpointed" % (name, NAME_SIZE))
+            self.encoded = b''
+            self.clear()  # a checkpoint left by an earlier file would be offered for this run
+        self.round = round_index
+        self.cycles = cycles
+        self.cycle = 0
+        self.dirty = False
+        self.last_write = utime.ticks_ms()
+
+    def update(self, cycle_num: int):
+        """
+        Args:
+            cycle_num (int): The last completed cycle of the current round.
+        Returns:
+            Nothing
+        """
+        self.cycle = cycle_num
+        self.dirty = True
+
+    def service(self, slack_ms: int) -> bool:
+        """
+        Args:
+            slack_ms (int): The time in milliseconds until the next relay edge.
+        Returns:
+            True if a checkpoint was written.
+        """
+        if not self.dirty or not self.encoded or self.write_cost_ms + GUARD_MS >= slack_ms:
+            return False
+        if utime.ticks_diff(utime.ticks_ms(), self.last_write) < self.interval_ms:
+            return False
+        self.save()
+        return True
+
+    def save(self):
+        """
+        Returns:
+            Nothing
+        Notes:
+            Writes the current values to the older slot, unless the name is too long to be saved.
+        """
+        if not self.encoded:
+            self.dirty = False
+            return
+        start = utime.ticks_ms()
+        name = self.encoded
+        self.sequence += 1
+        self.slot ^= 1
+        struct.pack_into(RECORD_FORMAT, self.buffer, 0, MAGIC, self.sequence, self.round, self.cycle, self.cycles,
+                         len(name), name, 0)
+        struct.pack_into('<H', self.buffer, RECORD_SIZE - 2, _checksum(memoryview(self.buffer)[:-2]))
+        with open(self._slot_path(self.slot), 'wb') as slot_file:
+            slot_file.write(self.buffer)
+        self.dirty = False
+        self.last_write = utime.ticks_ms()
+        cost = utime.ticks_diff(self.last_write, start)
+        self.write_cost_ms = max(cost, (self.write_cost_ms * 7 + cost) // 8)
+
+    def clear(self):
+        """
+        Returns:
+            Nothing
+        Notes:
+            Removes both slots, so nothing is offered for resume at the next boot.
+        """
+        for slot in (0, 1):
+            try:
+                os.remove(self._slot_path(slot))
+            except OSError:
+                pass
+        self.dirty = False
@@ -40,6 +40,28 @@ import utime, machine  # Cycle count required imports
 # from micropython import const
 # import hardware_config
 from hardware_config import M5stack
+from fontcache import FontMetrics
+from scheduler import EdgeScheduler, IdleChain, Channel, ChannelScheduler
+from render import RenderDispatcher
+from pulse import TimerPulseEngine
+from edgethread import EdgeThread
+from segments import compile_test, execute, Dwell, SegmentTable
+from timing import TimingCapture
+from cyclelog import CycleLogger
+from heapcheck import HeapProbe
+from timefmt import pretty_time, truncate, TimeTextCache
+from eta import EtaEstimator
+from gcsched import GcScheduler
+from checkpoint import Checkpoint
+from telemetry import open_stream, DONE, ABORTED, FAULT
+from catalogue import TestCatalogue, menu_names, test_name
+from testprofile import load_profile, PROFILE_SUFFIX, LEVELS
+from mpycache import import_test
+from runtime import TestRuntime, TestAborted, ABORT_EVENT
+import aio
+from buttons import ButtonInput, NO_EVENT, EVENT_PRESS, EVENT_RELEASE, EVENT_MASK, BUTTON_MASK, \
+    BUTTON_A, BUTTON_B, BUTTON_C
+import ringlog as log
 import lib.m5stack as m5stack
 import gc
 import uos as os
@@ -48,12 +70,25 @@ print("My __name__ is " + __name__)
 
 # tft, btn_a, btn_b, btn_c = M5stack()  # Initialize the display and all 3 buttons
 tft = M5stack()  # Initialize the display and all 3 buttons
+fonts = FontMetrics(tft)  # every font switch goes through fonts.select()
+time_texts = TimeTextCache()  # the times shown on the parameter pane, the same for most rounds
 
 # ---------------------------------------------
 # -------------GLOBAL VARIABLES----------------
 # ---------------------------------------------
 
 popupActive = False
+TIMER_POLL_MS = 10  # how often the foreground checks the counter of a timer driven test
+PLAYLIST_ENGINES = ("loop", "table")  # the engines whose rounds a Playlist can run, all from one segment table
+MENU_POLL_MS = 20  # how long the menu idles before it checks for button events again
+buttons = None  # ButtonInput, set up by the menu
+FAULT_LOG_PATH = '/sd/diagnostics.log'  # where the log ring is written when a test stops on an error
+SD_MOUNT_TIMEOUT_MS = 100  # how long to wait for the SD card to become readable after mounting it
+checkpoint = None  # Checkpoint of the running test file, set up by the menu
+test_file_name = ""  # the TEST_ file being run
+round_index = 0  # begin_test() calls made so far by the running test file
+resume_point = None  # (round index, last completed cycle) to resume the running test file from
+telemetry = None  # TelemetryStream, set up by the menu
 
 # ---------------------------------------------
 def null():
@@ -153,7 +188,7 @@ class TestUI:
         Notes:
             Draws the button labels at the bottom of the display, then sets the window to not include the footer area.
         """
-        tft.font(tft.FONT_Ubuntu)
+        fonts.select(tft.FONT_Ubuntu)
         tft.rect(  0, 220, self.screenwidth, 30, tft.YELLOW, tft.YELLOW)
 
         tft.rect( 25, 220, 80, 30, tft.BLUE, tft.BLUE)
@@ -171,8 +206,10 @@ class TestUI:
             Nothing
         Notes:
             Gets passed as a callback, to allow all panes to be redrawn, but called from the is_popup pane.
+            The glass has been cleared by then, so the shadow copy of every pane is invalidated first.
         """
         for pane in self.panes:
+            pane.invalidate()
             pane.update_all_lines()
         self.footer()
 
@@ -201,10 +238,12 @@ class DisplayPane:
         self.font = font
         self.is_popup = is_popup
         self.corner_radius = corner_radius
-        tft.font(self.font)
         self.func = func
         self.line_height, self.text_y = self.line_height_margin_calc(30)
         self.num_of_lines = int(self.frame_height / self.line_height)
+        self.line_ys = []        # layout table: y of the top of every line, see __build_layout()
+        self.text_ys = []        # layout table: y of the text of every line
+        self.__build_layout()
         # print(str(self.font))
         # print("self.x = " + str(self.x))
         # print("self.y = " + str(self.y))
@@ -212,6 +251,9 @@ class DisplayPane:
         # print("lineheight =" + str(self.line_height))
         # print("num of lines = " + str(self.num_of_lines))
         self.lines = []
+        self.shown = []          # shadow copy of the text on the glass, None = unknown
+        self.shown_fonts = []    # font each line was last drawn with
+        self.frame_drawn = False
 
         tft.set_bg(self.fill_color)
         tft.set_fg(self.text_color)
@@ -229,18 +271,51 @@ class DisplayPane:
         tft.set_bg(self.fill_color)
         tft.roundrect(self.x, self.y, self.frame_width, self.frame_height, self.corner_radius,
                       self.frame_color, self.fill_color)
+        self.frame_drawn = True
+
+    def __build_layout(self):
+        """
+        Returns:
+            Nothing
+        Notes:
+            Fills the layout table.  update_all_lines() also draws the line after the last one, so the table
+            has num_of_lines + 1 entries.  Needs to run again whenever the pane moves, see pop_up().
+        """
+        self.line_ys = [(line_num * self.line_height) + self.y for line_num in range(self.num_of_lines + 1)]
+        self.text_ys = [line_y + self.text_y for line_y in self.line_ys]
 
     def __initialize_pane_line(self, y):
         tft.set_bg(self.fill_color)
         tft.roundrect(0, y, self.frame_width, self.line_height, 0,
                       self.fill_color, self.fill_color)
 
+    def line_position(self, line_number: int) -> tuple:
+        """
+        Args:
+            line_number (int): The line number in the pane
+        Returns:
+            The y coordinate of the top of the line
+            The y coordinate of the text in the line
+        """
+        if line_number < len(self.line_ys):
+            return self.line_ys[line_number], self.text_ys[line_number]
+        line_y = ((line_number * self.line_height) + self.y)
+        return line_y, line_y + self.text_y
+
+    def clear_line(self, line_number: int):
+        """
+        Args:
+            line_number (int): The line number to blank with the fill color
+        Returns:
+            Nothing
+        """
+        self.__initialize_pane_line(self.line_position(line_number)[0])
+
     def __initialize_pane_text(self):
-        tft.font(self.font)
         self.__create_lines(self.num_of_lines)
         self.update_all_lines()
 
-    def line_height_margin_calc(self, margin: int=10) -> Tuple(int, int):
+    def line_height_margin_calc(self, margin: int=10) -> tuple:
         """
         Args:
             margin (int): the percentage of font size for vertical margins
@@ -249,7 +324,7 @@ class DisplayPane:
             The number of pixels used above the font used for margins, to set the vertical offset for text_y
         """
         margin_pct = margin/100
-        font_height = int(tft.fontSize()[1])
+        font_height = int(fonts.size(self.font)[1])
         line_height_px = int(font_height * (1 + margin_pct))
         return line_height_px, int((line_height_px - font_height)/2)
 
@@ -265,6 +340,52 @@ class DisplayPane:
             self.lines.append(str(''))
             line_num += 1
 #        print(self.lines.items())
+        self.shown = [None] * (num_of_lines + 1)  # update_all_lines() also draws the line after the last one
+        self.shown_fonts = [self.font] * (num_of_lines + 1)
+
+    def _line_text(self, line_number: int) -> str:
+        if line_number >= len(self.lines):
+            return ''  # update_all_lines() also draws the line after the last one
+        text = self.lines[line_number]
+        if type(text) is str:
+            return text  # the common case, no copy
+        return str(text)
+
+    def invalidate(self):
+        """
+        Returns:
+            Nothing
+        Notes:
+            Forgets what is on the glass, so the next update_all_lines() repaints the frame and every line.
+            Needed whenever something else has drawn over the pane, i.e. tft.clearwin()
+        """
+        self.frame_drawn = False
+        line_num = 0
+        while line_num < len(self.shown):
+            self.shown[line_num] = None
+            line_num += 1
+
+    def flush(self) -> int:
+        """
+        Returns:
+            The number of lines redrawn.
+        Notes:
+            Compares self.lines with the shadow copy and redraws only the lines that differ, each in the font
+            it was last drawn with.
+        """
+        global popupActive
+
+        if popupActive is True is not self.is_popup:
+            return 0
+
+        drawn = 0
+        line_num = 0
+        while line_num <= self.num_of_lines:
+            if self._line_text(line_num) != self.shown[line_num]:
+                self.update_line(line_num, self.shown_fonts[line_num])
+                drawn += 1
+            line_num += 1
+        return drawn
 
     def update_line(self, line_number: int, font=None):
         """
@@ -280,23 +401,35 @@ class DisplayPane:
         if popupActive is True is not self.is_popup:
             return
 
-        if font is not None:
-            tft.font(font)
-        else:
-            tft.font(self.font)
+        if font is None:
+            font = self.font
+        fonts.select(font)
 
-        line_y = ((line_number * self.line_height) + self.y)
-        text_y = line_y + self.text_y
+        text = self._line_text(line_number)
+        line_y, text_y = self.line_position(line_number)
         self.__initialize_pane_line(line_y)
-        tft.text(self.x, text_y, str(self.lines[line_number:(line_number+1)])[2:-2], self.text_color, transparent=True)
+        tft.text(self.x, text_y, text, self.text_color, transparent=True)
+        if line_number < len(self.shown):
+            self.shown[line_number] = text
+            self.shown_fonts[line_number] = font
 
     def update_all_lines(self):
         """
         Returns:
             Nothing
         Notes:
-            Quick way to update all lines in the pane
+            Quick way to update all lines in the pane.  Once the frame is on the glass, only the lines that
+            changed since they were last drawn are sent to the display, see flush().
         """
+        global popupActive
+
+        if popupActive is True is not self.is_popup:
+            return
+
+        if self.frame_drawn:
+            self.flush()
+            return
+
         self.__initialize_pane_frame()
         line_num = 0
         while line_num <= self.num_of_lines:
@@ -321,8 +454,9 @@ class DisplayPane:
 
         self.x = x_offset
         self.y = y_offset
+        self.__build_layout()
 
-        self.__initialize_pane_frame()
+        self.invalidate()
         self.update_all_lines()
 
     def pop_down(self):
@@ -331,6 +465,95 @@ class DisplayPane:
         tft.clearwin()
         self.func()  # callback function to redraw all panes
 
+class CycleCounter:
+    """
+    Args:
+        pane (DisplayPane): The pane that owns the line.
+        line_number (int): The line of the pane used for the counter.
+        total (int): The total number of cycles, drawn once to the right of the count.
+        font: The font of the counter. Must have fixed width digits. Default = tft.FONT_7seg
+    Notes:
+        Draws "count : total" in fixed width digit cells.  update() repaints only the cells whose digit
+        changed, which is usually the last one or two, so the cost per cycle stays small and almost constant.
+    """
+    DIGITS = ('0', '1', '2', '3', '4', '5', '6', '7', '8', '9')
+    BLANK = 0xff
+
+    def __init__(self, pane: DisplayPane, line_number: int, total: int, font=tft.FONT_7seg):
+        self.pane = pane
+        self.line_number = line_number
+        self.total = total
+        self.font = font
+        self.cell_width = fonts.char_width(self.font)
+        self.cell_height = fonts.size(self.font)[1]
+        self.num_cells = len(str(total))
+        self.cells = bytearray(self.num_cells)  # digit currently shown in each cell
+        self.text_y = pane.line_position(line_number)[1]
+        self.x = pane.x + self.cell_width
+        self.count = 0
+
+    def draw_all(self, count: int=0):
+        """
+        Args:
+            count (int): The count to show.
+        Returns:
+            Nothing
+        Notes:
+            Clears the line and draws the separator, the total and every digit cell.
+        """
+        self.pane.clear_line(self.line_number)
+        fonts.select(self.font)
+        total_x = self.x + ((self.num_cells + 1) * self.cell_width)
+        tft.text(total_x, self.text_y, ":  %d" % self.total, self.pane.text_color, transparent=True)
+        cell = 0
+        while cell < self.num_cells:
+            self.cells[cell] = self.BLANK
+            cell += 1
+        self.count = -1
+        self.update(count, clear=False)
+
+    def update(self, count: int, clear: bool=True):
+        """
+        Args:
+            count (int): The count to show.
+            clear (bool): Blank a cell before drawing its new digit. Only False right after clearing the line.
+        Returns:
+            Nothing
+        """
+        if count == self.count:
+            return
+        self.count = count
+        fonts.select(self.font)
+        cell = self.num_cells - 1
+        x = self.x + (cell * self.cell_width)
+        while cell >= 0:
+            if count > 0 or cell == self.num_cells - 1:
+                digit = count % 10
+            else:
+                digit = self.BLANK  # no leading zeros
+            count //= 10
+            if self.cells[cell] != digit:
+                if clear:
+                    tft.rect(x, self.text_y, self.cell_width, self.cell_height,
+                             self.pane.fill_color, self.pane.fill_color)
+                if digit != self.BLANK:
+                    tft.text(x, self.text_y, self.DIGITS[digit], self.pane.text_color, transparent=True)
+                self.cells[cell] = digit
+            cell -= 1
+            x -= self.cell_width
+
+    def sync_pane(self):
+        """
+        Returns:
+            Nothing
+        Notes:
+            Stores the current count as the text of the pane line, so flush() of the pane leaves it alone.
+        """
+        text = " %d  :  %d" % (self.count, self.total)
+        self.pane.lines[self.line_number] = text
+        self.pane.shown[self.line_number] = text
+        self.pane.shown_fonts[self.line_number] = self.font
+
 class MenuUI(TestUI):
     def __init__(self):
 
@@ -338,6 +561,16 @@ class MenuUI(TestUI):
 
         self.screenwidth, self.screenheight = tft.screensize()
 
+        self.popup = DisplayPane(30, 20, 203, 300,
+                                 frame_color=tft.WHITE,
+                                 fill_color=tft.BLUE,
+                                 text_color=tft.WHITE,
+                                 font=tft.FONT_DejaVu24,
+                                 is_popup=True,
+                                 corner_radius=0,
+                                 func=self.refresh_all
+                                 )
+
         self.header = DisplayPane(x=0, y=0,
                            frame_height=30,
                            frame_width=self.screenwidth,
@@ -362,6 +595,8 @@ class MenuUI(TestUI):
                          func=self.refresh_all
                          )
 
+        self.panes = [self.header, self.menu]
+
         self.footer()
         self.header.lines[0:1] = ["Select Test"]
         self.header.update_all_lines()
@@ -386,14 +621,47 @@ class Menu(DisplayPane):
         super().__init__(x, y, frame_height, frame_width, frame_color, fill_color, text_color, font,
                          is_popup, corner_radius, func)
         self.mount_sd()
-        self.test_names_dict = self.get_test_names()
-        self.test_names_list = [name for name in self.test_names_dict]
-        self.test_names_list.sort()
+        self.catalogue = TestCatalogue()
+        self.set_test_names(self.catalogue.load())
+        self.catalogue.check()
         self.aperture_size = self.num_of_lines
-        self.num_of_files = len(self.test_names_list)
         self.offset = 0
         self.highlighted = 0
 
+    def set_test_names(self, test_files: list):
+        """
+        Args:
+            test_files (list): The sorted test files, i.e. ['TEST_32109.py']
+        Returns:
+            Nothing
+        """
+        self.test_names_list = menu_names(test_files)
+        self.test_names_dict = dict(zip(self.test_names_list, test_files))
+        self.num_of_files = len(self.test_names_list)
+
+    def idle(self, period_ms: int):
+        """
+        Args:
+            period_ms (int): The time to spend before the buttons are checked again.
+        Returns:
+            Nothing
+        Notes:
+            Spends at most the time checking the SD card for new or removed test files, the caller waits out
+            the rest.  The menu is redrawn if the test files changed.
+        """
+        start = utime.ticks_ms()
+        log.service(period_ms)
+        if telemetry is not None:
+            telemetry.service(period_ms)  # the testers waiting in the menu still report
+        if self.catalogue.step(period_ms - utime.ticks_diff(utime.ticks_ms(), start)):
+            print("Test files changed on the SD card")
+            self.set_test_names(self.catalogue.names)
+            self.offset = 0
+            self.highlighted = 0
+            self.lines[0:self.aperture_size+1] = [""] * (self.aperture_size + 1)
+            self._scroll("down")
+            self._highlight()
+
 
     def move_up(self):
         self._highlight("up")
@@ -405,7 +673,7 @@ class Menu(DisplayPane):
 
 
     def move(self, direction: str):
-        print("move activated in the direction of " + str(direction))
+        log.debug("move activated in the direction of %s", direction)
         if 0 < self.offset < self.aperture_size:
             self._highlight(direction)
         # elif self.offset == 0 and self.highlighted == 0:
@@ -439,11 +707,8 @@ class Menu(DisplayPane):
         self.update_line(line_num)
         self.lines[line_num] = self.lines[line_num][2:]  # reset currently highlighted line back to normal but don't update the display
 
-        print("test names = " + str(self.test_names_list))
-        print("aperture size = " + str(self.aperture_size))
-        print("Num of files = " + str(self.num_of_files))
-        print("offset = " + str(self.offset))
-        print("highlighted = " + str(self.highlighted))
+        log.debug("test names = %s, aperture size = %d", self.test_names_list, self.aperture_size)
+        log.debug("num of files = %d, offset = %d, highlighted = %d", self.num_of_files, self.offset, self.highlighted)
 
     def _scroll(self, direction: str):
         if direction == "down" and self.offset > 0:
@@ -461,12 +726,24 @@ class Menu(DisplayPane):
 
 
     def mount_sd(self):
+        if self.sd_ready():
+            return
         m5stack.sdconfig()
         try:
             os.mountsd()
         except:
             print("NO SD CARD")
-        utime.sleep_ms(100)
+            return
+        start = utime.ticks_ms()
+        while not self.sd_ready() and utime.ticks_diff(utime.ticks_ms(), start) < SD_MOUNT_TIMEOUT_MS:
+            utime.sleep_ms(5)
+
+    def sd_ready(self) -> bool:
+        try:
+            os.stat('/sd')
+            return True
+        except OSError:
+            return False
 
     def update_displayed_files(self):
         # max_displayed_files = self.num_of_lines
@@ -486,20 +763,12 @@ class Menu(DisplayPane):
         pass
 
     def get_test_names(self):
-        files = []
-        test_files = {}
-        try:
-            files = os.listdir('/sd')
-        except:
-            self.mount_sd()
-            print("No SD Card Mounted ... now mounting...")
-
-        for filename in files:
-            if filename[:5] == "TEST_" and filename[-3:].lower() == ".py":
-                test_files[filename[5:-3]] = filename
-
-#        print(test_files.items())
-        return test_files
+        """
+        Returns:
+            {test name: test file} read from the SD card right away, bypassing the index.
+        """
+        test_files = self.catalogue.rebuild()
+        return dict(zip(menu_names(test_files), test_files))
 
 class Relay(machine.Signal):
     """
@@ -509,7 +778,7 @@ class Relay(machine.Signal):
     Adds:
         toggle: Inverts the current state of the pin.
     """
-    def __init__(self, gpio_pin_number: Pin, inverted=False):
+    def __init__(self, gpio_pin_number: int, inverted=False):
         super().__init__(gpio_pin_number, inverted)
 
     # def on(self):
@@ -521,7 +790,7 @@ class Relay(machine.Signal):
     #     self.off()
 
     def toggle(self):
-        print("clickk")
+        log.debug("relay toggled")
         self.value(not self.value())
 
 class Button:
@@ -533,8 +802,205 @@ class Encoder:
     def __init__(self):
         pass
 
-class Test:
+class TestRun:
+    """
+    Notes:
+        What Test and Playlist share around their engine: the status pane with its cycle counter and time left
+        line, the bookkeeping after every cycle, the background services of the idle hook, and the reports and
+        popup once the last cycle is done or the run was aborted.  Their begin_test() calls _new_render(), then
+        _begin_round() as each round starts, _background(), _run(), _report() and _show_result().
+    """
+    counter = None
+    capture = None
+    logger = None
+    heap = None
+
+    def _new_render(self, first: list=()) -> RenderDispatcher:
+        """
+        Args:
+            first (list): (key, func) updates drawn ahead of the time left line and the counter. Default = none
+        Returns:
+            The RenderDispatcher of the run, kept in render.
+        """
+        render = RenderDispatcher()
+        for key, func in first:
+            render.register(key, func)
+        render.register("eta", self._draw_eta)  # before the counter, it is only posted once a second
+        render.register("counter", self._draw_counter)
+        self.render = render
+        self.collector = GcScheduler()
+        self.aborted = False
+        return render
+
+    def _begin_round(self, index: int, test, first_cycle: int, offset: int=0):
+        """
+        Args:
+            index (int): The index of the round in the test file, for the checkpoint and the telemetry.
+            test (Test): The round that is starting.
+            first_cycle (int): Its first cycle, more than 1 for a round resumed part way through.
+            offset (int): The engine numbers the cycles of the round from offset + 1. Default = 0
+        Returns:
+            Nothing
+        """
+        self.round_cycles = test.cycles
+        self.offset = offset
+        self.eta = EtaEstimator(test.cycles, test.on_time + test.off_time)
+        if checkpoint is not None:
+            checkpoint.start(test_file_name, index, test.cycles)
+            checkpoint.update(first_cycle - 1)
+        if telemetry is not None:
+            telemetry.start(index, test.cycles, test.on_time, test.off_time, first_cycle - 1, self.eta,
+                            self.collector, self.capture)
+
+    def _background(self) -> list:
+        """
+        Returns:
+            The idle hooks of everything but the display: gc, the log ring, the cycle log, the checkpoint and the
+            telemetry.
+        """
+        hooks = [self.collector.service, log.service]
+        if self.logger is not None:
+            hooks.append(self.logger.service)
+        if checkpoint is not None:
+            hooks.append(checkpoint.service)
+        if telemetry is not None:
+            hooks.append(telemetry.service)
+        return hooks
+
+    def _cycle_done(self, cycle_num: int) -> bool:
+        """
+        Args:
+            cycle_num (int): The cycle just completed, as the engine numbers it.
+        Returns:
+            True once the run is to stop, see execute().
+        """
+        self.cycle_num = cycle_num
+        round_cycle = cycle_num - self.offset
+        self.render.post("counter", round_cycle)
+        if self.eta.mark(round_cycle):
+            self.render.post("eta")
+        if checkpoint is not None:
+            checkpoint.update(round_cycle)
+        if telemetry is not None:
+            telemetry.update(round_cycle)
+        if self.heap is not None:
+            self.heap.sample()
+        return self.aborted
+
+    def _gc_paused(self, func):
+        collector = self.collector
+
+        def paused(param):
+            collector.paused(func, param)  # nothing is timed while it runs, gc may run too
+        return paused
+
+    def _run(self, engine) -> EdgeScheduler:
+        """
+        Args:
+            engine: Runs the cycles and returns its EdgeScheduler.
+        Returns:
+            What engine returned.
+        Notes:
+            gc is left to the GcScheduler while the engine runs, and _stopped() is called whether it returns
+            or raises.
+        """
+        scheduler = None
+        self.collector.begin()
+        try:
+            scheduler = engine()
+            return scheduler
+        finally:
+            self.collector.end()
+            self._stopped(scheduler)
+
+    def _stopped(self, scheduler: EdgeScheduler):
+        """
+        Args:
+            scheduler (EdgeScheduler): The scheduler of the run, None if the engine raised.
+        Returns:
+            Nothing
+        """
+        pass
+
+    def _report(self, scheduler: EdgeScheduler):
+        """
+        Args:
+            scheduler (EdgeScheduler): The scheduler of the run, for its timing report.
+        Returns:
+            Nothing
+        Notes:
+            Saves the checkpoint of a run that was not aborted, brings the display up to date and prints the
+            timing, heap and gc reports.
+        """
+        self.drift_ms = scheduler.drift_ms
+        if checkpoint is not None and not self.aborted:
+            checkpoint.update(self.round_cycles)
+            checkpoint.save()
+        self.render.flush()
+        self.counter.sync_pane()
+        log.flush()
+        print(scheduler.report())
+        if self.heap is not None:
+            print(self.heap.report())
+        print(self.collector.report())
+        if self.collector.overlaps:
+            log.warning("%d garbage collections overlapped an edge", self.collector.overlaps)
+        if telemetry is not None:
+            telemetry.finish(ABORTED if self.aborted else DONE, self.counter.count)
+
+        test_UI.status.lines[0] = scheduler.report()
+        test_UI.status.update_line(0)
+
+    def _show_result(self, completed: str, summary: str, results: list=None):
+        """
+        Args:
+            completed (str): The status line once the run is over, i.e. "Completed 5000 cycles"
+            summary (str): The second line of the completion popup, i.e. "5000 Cycles"
+            results (list): The last three lines of the popup. Default = None, the prompt to remove the boards
+        Returns:
+            Nothing
+        Raises:
+            TestAborted if the run was aborted, once the popup says so.
+        """
+        if self.aborted:
+            count = self.counter.count
+            test_UI.status.lines[1] = "Aborted after %d cycles" % count
+            test_UI.status.update_line(1)
+            test_UI.popup.lines[0] = "TEST ABORTED"
+            test_UI.popup.lines[1] = "%d of %d Cycles" % (count, self.round_cycles)
+            test_UI.popup.lines[2:5] = ["", "", ""]
+            test_UI.popup.pop_up()
+            raise TestAborted("aborted after %d cycles" % count)
+        test_UI.status.lines[1] = completed
+        test_UI.status.update_line(1)
+
+        test_UI.popup.lines[0] = "TEST COMPLETE"
+        test_UI.popup.lines[1] = summary
+        if results is not None:
+            test_UI.popup.lines[2:5] = results
+        else:
+            test_UI.popup.lines[2] = "You may now "
+            test_UI.popup.lines[3] = "Remove the "
+            test_UI.popup.lines[4] = "board(s)"
+        test_UI.popup.pop_up()
+
+    def _show_title(self, text: str):
+        test_UI.status.lines[0] = "Updates Disabled" if self.render.disabled else text
+        test_UI.status.update_line(0)
+
+    def _draw_eta(self, value=None):
+        text = self.eta.text()
+        if text != test_UI.status.lines[1]:  # the time left moves by a second, the rest rarely changes
+            test_UI.status.lines[1] = text
+            test_UI.status.update_line(1)
+
+    def _draw_counter(self, value: int):
+        self.counter.update(value)
+
+
+class Test(TestRun):
     total_time = 0
+    drift_ms = 0
 
     def __init__(self,
                  relay: Relay,
@@ -545,7 +1011,28 @@ class Test:
                  duty_cycle: float=0,
                  periodic_function=None,
                  func_param=None,
-                 func_call_freq: int=0):
+                 func_call_freq: int=0,
+                 engine: str="loop",
+                 capture: int=0,
+                 log: str=None,
+                 heap_check: bool=False):
+        """
+        Args:
+            engine (str): How the relay edges are generated.
+                          "loop": the test loop waits for every edge itself. Default
+                          "timer": machine.Timer callbacks generate the edges, see TimerPulseEngine
+                          "table": the test is compiled into a segment table first, see segments.py
+                          "async": uasyncio tasks for the edges, the display, the buttons and the rest, so
+                                   holding SEL aborts the test, see runtime.py
+                          "thread": a thread of its own for the edges, the display and the SD card stay on
+                                    this one and holding SEL aborts the test, see edgethread.py
+            capture (int): Measure the ON and OFF time of every cycle and keep the last capture cycles for the
+                           serial dump, see TimingCapture. 0 = off. Default = 0
+            log (str): Append a binary record of every cycle to this file, i.e. "/sd/log_32109.bin".
+                       Implies a timing capture. See cyclelog.py. Default = None
+            heap_check (bool): Sample gc.mem_free() after every cycle and print how much the cycle loop
+                               allocated, which should be 0. See heapcheck.py. Default = False
+        """
 
         # self.on_time = on_time
         # self.off_time = off_time
@@ -556,6 +1043,13 @@ class Test:
         self.periodic_function = periodic_function
         self.func_call_freq = func_call_freq
         self.func_param = func_param
+        self.engine = engine
+        self.capture_size = capture
+        self.capture = None
+        self.log_path = log
+        self.logger = None
+        self.heap_check = heap_check
+        self.heap = None
         if self.periodic_function is None:
             self.periodic_function = self.__pass
 
@@ -574,28 +1068,150 @@ class Test:
     def begin_test(self):
         gc.collect()
 
-        test_UI.status.lines[0] = "Cycle   of"
-        test_UI.status.update_line(0)
+        self.first_cycle = start_round(self.cycles)
+        if self.first_cycle > self.cycles:
+            print("Round %d already completed, skipped" % (round_index - 1))
+            return
 
-        cycle_num = 1
+        render = self._new_render()
+        self.counter = CycleCounter(test_UI.status, 2, self.cycles)
+        render.check_phases(self.on_time, self.off_time)
+        self._show_title("Cycle   of")
+        self.counter.draw_all(self.first_cycle - 1)
+
+        self.drive = self.relay
+        self.periodic = self.periodic_function
+        self.capture = None
+        self.logger = None
+        if self.capture_size > 0 or self.log_path is not None:
+            self.capture = TimingCapture(self.on_time, self.off_time, max(self.capture_size, 16))
+            self.drive = self.capture.wrap(self.relay)
+            self.periodic = self._periodic_then_skip
+        if self.log_path is not None:
+            self.logger = CycleLogger(self.log_path, self.on_time, self.off_time)
+            self.capture.logger = self.logger
+        self.cycle_num = self.first_cycle - 1
+        self._begin_round(round_index - 1, self, self.first_cycle)
+        background_hooks = self._background()
+        self.background = IdleChain(background_hooks)
+        self.idle = IdleChain([render.service] + background_hooks)
+        if not isinstance(self.periodic, Dwell):  # a Dwell is compiled into plain segments by the table engine
+            self.periodic = self._gc_paused(self.periodic)
+
+        if self.first_cycle > 1:
+            print("Resuming at cycle %d of %d" % (self.first_cycle, self.cycles))
+        self.heap = HeapProbe() if self.heap_check else None
+        if self.engine == "async" and not aio.AVAILABLE:
+            log.warning("uasyncio is not installed, the async engine falls back to the loop engine")
+        scheduler = self._run(self._run_engine)
+        if self.logger is not None:
+            print("Logged %d cycles to %s, %d dropped" % (self.logger.written, self.log_path, self.logger.dropped))
+        self._report(scheduler)
+
+        results = None
+        if self.capture is not None and not self.aborted:
+            if self.capture_size > 0:
+                self.capture.dump()
+            results = self.capture.results()
+        self._show_result("Completed %d cycles" % self.cycles, "%d Cycles" % self.cycles, results)
+        # utime.sleep(10)
+        # test_UI.popup.pop_down()
+
+    def _run_engine(self) -> EdgeScheduler:
+        if self.engine == "async" and aio.AVAILABLE:
+            return self._run_async(self.render)
+        if self.engine == "timer":
+            return self._run_timer(self.render)
+        if self.engine == "thread":
+            return self._run_thread(self.render)
+        if self.engine == "table":
+            return self._run_table(self.render)
+        return self._run_loop(self.render)
+
+    def _stopped(self, scheduler: EdgeScheduler):
+        if self.capture is not None:
+            self.capture.finish(None if scheduler is None else scheduler.end_us)  # the end of the last phase
+        if self.logger is not None:
+            self.logger.close()  # on an error too, the records buffered are the cycles leading up to it
+
+    def _run_loop(self, render: RenderDispatcher) -> EdgeScheduler:
+        scheduler = EdgeScheduler()
+        drive_on = self.drive.on  # bound once, a bound method made inside the loop would allocate every cycle
+        drive_off = self.drive.off
+        cycle_num = self.first_cycle
         while cycle_num <= self.cycles:
             if self.func_call_freq > 0 and cycle_num % self.func_call_freq == 0:
-                self.periodic_function(self.func_param)
-            cycle(self.on_time, self.off_time, self.relay)
-            test_UI.status.lines[2] = " %d  :  %d" % (cycle_num, self.cycles)
-            test_UI.status.update_line(2, tft.FONT_7seg)
+                scheduler.wait(self.idle)
+                self.periodic(self.func_param)
+                scheduler.resync()
+            scheduler.edge(drive_on, self.on_time, self.idle)
+            scheduler.edge(drive_off, self.off_time, self.idle)
+            self._cycle_done(cycle_num)
             cycle_num += 1
-        test_UI.status.lines[1] = "Completed %d cycles" % self.cycles
-        test_UI.status.update_line(1)
-
-        test_UI.popup.lines[0] = "TEST COMPLETE"
-        test_UI.popup.lines[1] = "%d Cycles" % self.cycles
-        test_UI.popup.lines[2] = "You may now "
-        test_UI.popup.lines[3] = "Remove the "
-        test_UI.popup.lines[4] = "board(s)"
-        test_UI.popup.pop_up()
-        # utime.sleep(10)
-        # test_UI.popup.pop_down()
+        scheduler.finish(self.idle)
+        return scheduler
+
+    def _run_async(self, render: RenderDispatcher) -> EdgeScheduler:
+        runtime = TestRuntime(self, render, self.background, buttons)
+        scheduler = runtime.run()
+        self.aborted = runtime.aborted
+        render.post("counter", runtime.cycle_num)
+        return scheduler
+
+    def _run_timer(self, render: RenderDispatcher) -> EdgeScheduler:
+        engine = TimerPulseEngine(self.drive, self.on_time, self.off_time, self.cycles, self.func_call_freq)
+        engine.start(self.first_cycle)
+        shown = engine.count
+        while not engine.done:
+            if engine.paused:
+                self.periodic(self.func_param)
+                engine.resume()
+            if engine.count != shown:
+                shown = engine.count
+                self._cycle_done(shown)
+            slack = engine.remaining()
+            if not self.idle(slack):
+                utime.sleep_ms(min(max(slack, 1), TIMER_POLL_MS))
+        render.post("counter", engine.count)
+        return engine.scheduler
+
+    def _run_thread(self, render: RenderDispatcher) -> EdgeScheduler:
+        engine = EdgeThread(self.drive, self.on_time, self.off_time, self.cycles, self.func_call_freq, self.relay)
+        engine.start(self.first_cycle)
+        shown = engine.count
+        while not engine.done:
+            if engine.paused:
+                self.periodic(self.func_param)  # on this thread, never on the edge thread
+                engine.resume()
+            if engine.count != shown:
+                shown = engine.count
+                self._cycle_done(shown)
+            if buttons is not None and buttons.get() == ABORT_EVENT:
+                engine.stop()
+            slack = engine.remaining()
+            if not self.idle(slack):
+                utime.sleep_ms(min(max(slack, 1), TIMER_POLL_MS))
+        if engine.count != shown:
+            self._cycle_done(engine.count)
+        if engine.error is not None:
+            raise engine.error
+        self.aborted = engine.stopped
+        render.post("counter", engine.count)
+        return engine.scheduler
+
+    def _run_table(self, render: RenderDispatcher) -> EdgeScheduler:
+        table = compile_test(self, relay=self.drive, periodic=self.periodic, first_cycle=self.first_cycle)
+        self.total_time = table.duration_ms()
+        print("Compiled %d cycles into %d words, total time %s%s" % (table.cycles(), len(table),
+                                                                    pretty_time(self.total_time),
+                                                                    "" if table.exact else " or more"))
+        scheduler = EdgeScheduler()
+        execute(table, scheduler, self.idle, self._cycle_done, first_cycle=self.first_cycle)
+        return scheduler
+
+    def _periodic_then_skip(self, param):
+        self.periodic_function(param)
+        self.capture.skip()  # the phase around the periodic function is not a normal cycle
 
     def __pass(self):
         """
@@ -606,101 +1222,400 @@ class Test:
         """
         pass
 
+class MultiTest:
+    """
+    Args:
+        tests (list): Test instances, one per fixture, each with its own relay.
+    Notes:
+        Runs all the tests at the same time from one ChannelScheduler, each with its own waveform and cycle
+        count, instead of one after the other.  The status pane shows the progress of two channels per line.
+        Periodic functions are not supported, they would stall every other channel, so a test with a
+        func_call_freq raises ValueError.
+    """
+    def __init__(self, tests: list):
+        for number in range(len(tests)):
+            if tests[number].func_call_freq > 0:
+                raise ValueError("channel %d: periodic functions can not run in a multi channel test" % (number + 1))
+        self.tests = tests
+        self.channels = []
+        for test in tests:
+            self.channels.append(Channel.from_test(test, str(len(self.channels) + 1)))
+
+    def begin_test(self):
+        gc.collect()
+
+        if start_round(1) > 1:
+            print("Round %d already completed, skipped" % (round_index - 1))
+            return
+        if checkpoint is not None:
+            checkpoint.start(test_file_name, round_index - 1, 1)
+
+        self.render = render = RenderDispatcher()
+        render.register("channels", self._draw_progress)
+        render.check_phases(min([channel.on_time_ms for channel in self.channels]),
+                            min([channel.off_time_ms for channel in self.channels]))
+        self._draw_progress()
+
+        scheduler = ChannelScheduler(self.channels)
+        self.collector = GcScheduler()
+        idle_hooks = [render.service, self.collector.service]
+        if telemetry is not None:
+            telemetry.start(round_index - 1, 1, 0, 0, 0, None, self.collector)  # one round, as for the checkpoint
+            idle_hooks.append(telemetry.service)
+        self.collector.begin()
+        try:
+            scheduler.run(IdleChain(idle_hooks), self._cycle_done)
+        finally:
+            self.collector.end()
+        render.post("channels")
+        render.flush()
+        print(self.collector.report())
+        if checkpoint is not None:
+            checkpoint.update(1)
+            checkpoint.save()
+        if telemetry is not None:
+            telemetry.finish(DONE, 1)
+
+        max_late_ms = max([channel.max_late_ms for channel in self.channels])
+        print("Multi channel test complete, max late %dms" % max_late_ms)
+        test_UI.status.lines[2] = "Max late %dms" % max_late_ms
+        test_UI.status.update_all_lines()
+
+        test_UI.popup.lines[0] = "TEST COMPLETE"
+        test_UI.popup.lines[1] = "%d Channels" % len(self.channels)
+        test_UI.popup.lines[2] = "You may now "
+        test_UI.popup.lines[3] = "Remove the "
+        test_UI.popup.lines[4] = "board(s)"
+        test_UI.popup.pop_up()
+
+    def _cycle_done(self, channel: Channel):
+        self.render.post("channels")
+
+    def _draw_progress(self, value=None):
+        line_num = 0
+        index = 0
+        while index < len(self.channels) and line_num < test_UI.status.num_of_lines:
+            text = ""
+            for channel in self.channels[index:index + 2]:
+                text += "%s:%d/%d  " % (channel.name, channel.count, channel.cycles)
+            test_UI.status.lines[line_num] = text
+            line_num += 1
+            index += 2
+        test_UI.status.update_all_lines()
+
+class Playlist(TestRun):
+    """
+    Args:
+        tests (list): Test instances, the rounds to run one after the other.
+    Notes:
+        Compiles every round into one segment table and runs it from one EdgeScheduler, so the edges go on
+        without a gap from one round to the next.  When a round starts, the parameter pane and the counter are
+        redrawn in place, in the slack like every other update, and the completion popup is shown once at the
+        end.  Holding SEL aborts the run at the end of the running cycle.
+        Every round runs as with engine="table", so a round asking for another engine than PLAYLIST_ENGINES, a
+        capture or a log raises ValueError.  heap_check on any round checks the whole run.
+    """
+    def __init__(self, tests: list):
+        for number in range(len(tests)):
+            test = tests[number]
+            if test.engine not in PLAYLIST_ENGINES:
+                raise ValueError("round %d: engine %s can not run in a playlist" % (number + 1, test.engine))
+            if test.capture_size > 0 or test.log_path is not None:
+                raise ValueError("round %d: capture and log can not run in a playlist" % (number + 1))
+        self.tests = tests
+        self.heap_check = any([test.heap_check for test in tests])
+        self.rounds = []  # (test, first cycle, round number) of the rounds still to run
+        self.round = 0
+        self.offset = 0
+        self.cycle_num = 0
+
+    def begin_test(self):
+        gc.collect()
+
+        self.rounds = []
+        for number in range(len(self.tests)):
+            test = self.tests[number]
+            first_cycle = start_round(test.cycles)
+            if first_cycle > test.cycles:
+                print("Round %d already completed, skipped" % (round_index - 1))
+            else:
+                self.rounds.append((test, first_cycle, number))
+        if not self.rounds:
+            return
+        self.first_round = round_index - len(self.rounds)  # index of the first round to run in the test file
+
+        render = self._new_render([("round", self._draw_round)])
+        self.table = SegmentTable()
+        for test, first_cycle, number in self.rounds:
+            periodic = test.periodic_function
+            if not isinstance(periodic, Dwell):
+                periodic = self._gc_paused(periodic)
+            compile_test(test, self.table, periodic=periodic, first_cycle=first_cycle)
+        self.total_time = self.table.duration_ms()
+        print("Compiled %d rounds, %d cycles into %d words, total time %s%s" % (len(self.rounds),
+                                                                               self.table.cycles(), len(self.table),
+                                                                               pretty_time(self.total_time),
+                                                                               "" if self.table.exact else " or more"))
+
+        render.check_phases(min([test.on_time for test, first_cycle, number in self.rounds]),
+                            min([test.off_time for test, first_cycle, number in self.rounds]))
+        self.cycle_num = 0
+        self._next_round(0)
+        self._draw_round()
+
+        self.idle = IdleChain([render.service, self._poll_abort] + self._background())
+        self.heap = HeapProbe() if self.heap_check else None
+        scheduler = self._run(self._execute)
+        self._report(scheduler)
+        self._show_result("Completed %d rounds" % len(self.tests), "%d Rounds" % len(self.tests))
+
+    def _execute(self) -> EdgeScheduler:
+        scheduler = EdgeScheduler()
+        execute(self.table, scheduler, self.idle, self._cycle_done, self._next_round)
+        return scheduler
+
+    def _next_round(self, index: int):
+        test, first_cycle, number = self.rounds[index]
+        self.round = index
+        # table cycle number - offset = cycle number of the round
+        self._begin_round(self.first_round + index, test, first_cycle, self.cycle_num - first_cycle + 1)
+        if index > 0:
+            self.render.post("round", index)
+
+    def _poll_abort(self, slack_ms: int) -> bool:
+        if buttons is not None and buttons.get() == ABORT_EVENT:
+            self.aborted = True  # _cycle_done() stops the table at the end of the cycle
+        return False
+
+    def _draw_round(self, value=None):
+        test, first_cycle, number = self.rounds[self.round]
+        update_parameters_pane(*test)
+        self._show_title("Round %d of %d" % (number + 1, len(self.tests)))
+        test_UI.status.lines[1] = ""
+        test_UI.status.update_line(1)
+        self.counter = CycleCounter(test_UI.status, 2, test.cycles)
+        self.counter.draw_all(self.cycle_num - self.offset)
+
 class SD:
     def __init__(self):
         m5stack.sdconfig()
 
 
-def pretty_time(milliseconds: int, precision_ms: int=1, verbose: bool=False) -> str:
+def start_round(cycles: int) -> int:
+    """
+    Args:
+        cycles (int): The number of cycles of the round that is starting.
+    Returns:
+        The first cycle to run.  More than cycles if the round was completed before the power loss being resumed.
+    Notes:
+        Called by every begin_test(), counts the rounds of the running test file.
+    """
+    global round_index
+    round_index += 1
+    if resume_point is None or round_index - 1 > resume_point[0]:
+        return 1
+    if round_index - 1 < resume_point[0]:
+        return cycles + 1
+    return min(resume_point[1], cycles) + 1
+
+def run_test_file(test_file: str, resume: tuple=None):
+    """
+    Args:
+        test_file (str): The test file to run, i.e. 'TEST_32109.py'
+        resume (tuple): (round index, last completed cycle) to resume from. Default = None, start from the beginning
+    Returns:
+        Nothing
+    Notes:
+        The checkpoint is removed once the test file has run to the end.
+    """
+    global test_UI, test_file_name, round_index, resume_point
+    test_file_name = test_file
+    round_index = 0
+    resume_point = resume
+    test_UI = TestUI()
+    try:
+        if test_file.endswith(PROFILE_SUFFIX):
+            run_profile('/sd/' + test_file)
+        else:
+            import_test(test_file)
+    except TestAborted as error:
+        log.warning("%s %s", test_file, error)  # the operator stopped it, the rounds left are not run either
+    except Exception as error:
+        log.error("%s stopped: %s", test_file, error)
+        log.flush(FAULT_LOG_PATH)  # keeps the messages leading up to the fault
+        if telemetry is not None:
+            telemetry.finish(FAULT)
+        raise
+    if checkpoint is not None:
+        checkpoint.clear()
+    if buttons is not None:
+        buttons.clear()  # presses made during the test are not meant for the menu
+
+def menu_event(event: int) -> str:
     """
     Args:
-        milliseconds: The value in milliseconds to on_off_time_calc
-        precision_ms: The number of digits to show for the milliseconds portion of the output.
-                     Default = 1
-        verbose: If verbose is True, it will output days, hours, minutes, seconds, milliseconds.
-                 If verbose is False, it will display only the minimum values needed.
-                 Default = False
-
-                 If a negative value is entered, it is set to 0
-
-    Returns: A string with the converted time in human readable on_off_time_calc with the precision specified.
-    """
-    years = weeks = days = hours = minutes = 0
-
-    if milliseconds < 0:
-        milliseconds = 0  # No negatives for you ...
-
-    if not verbose:
-
-        if milliseconds < 1000:
-            time = str("%sms" % truncate(milliseconds, precision=precision_ms))
-        elif milliseconds < 60000:  # less than 1 minute
-            time = str("%04.2fs" % (milliseconds / 1000))
-        elif milliseconds < 3600000:  # less than 1 hour
-            minutes, seconds = divmod(milliseconds, 60000)
-            seconds = int(seconds/1000)
-            time = str("%02dm %02ds" % (minutes, seconds))
-        elif milliseconds < 86400000:  # less than 24 hours
-            minutes, seconds = divmod(milliseconds, 60000)
-            seconds = int(seconds / 1000)
-            hours, minutes = divmod(minutes, 60)
-            time = str("%1dh %02dm %02ds" % (hours, minutes, seconds))
-        elif milliseconds < 604800000:  # less than 7 days
-            hours, minutes = divmod(milliseconds, 3600000)
-            minutes = int(minutes/60000)
-            days, hours = divmod(hours, 24)
-            time = str("%1dd %1dh %02dm" % (days, hours, minutes))
-        elif milliseconds < 31449600000:  # less than 1 year
-            days, hours = divmod(milliseconds, 86400000)
-            hours = int(hours/3600000)
-            weeks, days = divmod(days, 7)
-            time = str("%1dw %1dd %1dh" % (weeks, days, hours))
-        elif milliseconds > 31449600000:  # over 1 year
-            weeks, days = divmod(milliseconds, 604800000)
-            days = int(days/86400000)
-            years, weeks = divmod(weeks, 52)
-            time = str("%1dy %1dw %1dd" % (years, weeks, days))
+        event (int): An event from ButtonInput.get()
+    Returns:
+        The test file to run, or None.
+    Notes:
+        A moves the highlight up and B down, both repeat while held.  C selects the highlighted test.
+    """
+    button = event & BUTTON_MASK
+    kind = event & EVENT_MASK
+    if kind == EVENT_RELEASE:
+        return None
 
-    else:
-        seconds, milliseconds = divmod(milliseconds, 1000)
-        minutes, seconds = divmod(seconds, 60)
-        hours, minutes = divmod(minutes, 60)
-        days, hours = divmod(hours, 24)
-        weeks, days = divmod(days, 7)
-        years, weeks = divmod(weeks, 52)
+    if button == BUTTON_A:
+        menu_UI.menu.move_up()
 
-        time = str("%1dy %1dw %1dd %1dh %02dm %02d.%3ds" % (years, weeks, days, hours, minutes, seconds, milliseconds))
-    return time
+    elif button == BUTTON_B:
+        menu_UI.menu.move_down()
 
-def truncate(original_number: float, precision: int=1) -> str:
+    elif button == BUTTON_C and kind == EVENT_PRESS:
+        test_file_to_import = menu_UI.menu.test_names_dict[menu_UI.menu.test_names_list[menu_UI.menu.highlighted]]
+        log.info("running %s", test_file_to_import)
+        m5stack.tone(2000, duration=15, volume=1)
+        return test_file_to_import
+    return None
+
+class MenuTasks:
+    """
+    Notes:
+        The menu as two uasyncio tasks: the input task handles the buttons while the idle task looks for new
+        test files and writes out the log.  run() returns the test file selected, once both tasks ended.
+    """
+    def __init__(self):
+        self.selected = None
+        self.idling = False
+
+    def run(self) -> str:
+        return aio.run(self.main())
+
+    async def main(self):
+        self.selected = None
+        self.idling = True
+        aio.create_task(self.idle_task())
+        await self.input_task()
+        while self.idling:  # the old uasyncio would keep it in its queue for the next run()
+            await aio.sleep_ms(MENU_POLL_MS)
+        return self.selected
+
+    async def input_task(self):
+        while self.selected is None:
+            event = buttons.get()
+            if event == NO_EVENT:
+                await aio.sleep_ms(MENU_POLL_MS)
+            else:
+                self.selected = menu_event(event)
+
+    async def idle_task(self):
+        while self.selected is None:
+            menu_UI.menu.idle(MENU_POLL_MS)
+            await aio.sleep_ms(MENU_POLL_MS)
+        self.idling = False
+
+def tests_from_profile(profile) -> tuple:
     """
     Args:
-        original_number: The float that you want truncated (not rounded)
-        precision: Int defining how many decimal places to truncate at.
-
-    Returns: The string of the original float, but truncated to the specified number of decimal places.
-             Default = 1
-
-    Notes: This has to return a string due to the accuracy in the MCU causing numbers to have too many digits.
+        profile (Profile): A profile from testprofile.load_profile()
+    Returns:
+        (relay, [Test per round])
     """
-    precision = int(precision)
-    if precision > 0:
-        temp = str(float(original_number)).split('.')  # float to force a decimal point, string to split.
-        temp[1] = temp[1]+('0'*precision)  # make sure we have enough digits for the next step.
-        truncated_number = temp[0]+'.'+temp[1][:precision]
+    relay = Relay(profile.relay, profile.inverted)
+    tests = []
+    for keys in profile.rounds:
+        periodic = None
+        func_call_freq = 0
+        if keys.get('dwell_ms', 0) > 0 and keys.get('dwell_every', 0) > 0:
+            periodic = Dwell(relay, keys['dwell_ms'], LEVELS[keys.get('dwell_level', 'ON').upper()])
+            func_call_freq = keys['dwell_every']
+        tests.append(Test(relay=relay,
+                          cycles=keys['cycles'],
+                          on_time=keys.get('on_ms', 0),
+                          off_time=keys.get('off_ms', 0),
+                          pulse_width_ms=keys.get('pulse_width_ms', 0),
+                          duty_cycle=keys.get('duty', 0),
+                          periodic_function=periodic,
+                          func_call_freq=func_call_freq,
+                          engine=keys.get('engine', "loop"),
+                          capture=keys.get('capture', 0),
+                          log=keys.get('log')))
+    return relay, tests
+
+def run_profile(path: str):
+    """
+    Args:
+        path (str): A declarative profile, i.e. '/sd/TEST_32109r6.cyc'
+    Returns:
+        Nothing
+    Notes:
+        Runs every round of the profile on test_UI, like a TEST_ script would.
+    """
+    profile = load_profile(path)
+    relay, tests = tests_from_profile(profile)
+    test_UI.header.lines[0:1] = [profile.name]
+    test_UI.header.lines[1:2] = [profile.version]
+    test_UI.header.update_all_lines()
+    if profile.start is not None:
+        relay.value(profile.start)
+    if len(tests) > 1 and all([test.engine in PLAYLIST_ENGINES and test.capture_size == 0 and test.log_path is None
+                               for test in tests]):
+        Playlist(tests).begin_test()  # back to back, without a gap or a popup between the rounds
     else:
-        truncated_number = str(int(original_number))
-    return truncated_number
+        for test in tests:
+            update_parameters_pane(*test)
+            test.begin_test()
+    if profile.end is not None:
+        relay.value(profile.end)
 
-def cycle(on_time_ms: int, off_time_ms: int, relay: Relay) -> None:
+def offer_resume(saved: tuple) -> bool:
+    """
+    Args:
+        saved (tuple): (test file, round index, last completed cycle, cycles of the round) from Checkpoint.load()
+    Returns:
+        True to resume the test, False to discard the checkpoint.
+    Notes:
+        Asks on the menu popup, UP resumes and SEL discards.
+    """
+    test_file, saved_round, cycle_num, cycles = saved
+    menu_UI.popup.lines[0] = "RESUME TEST?"
+    menu_UI.popup.lines[1] = test_name(test_file)
+    menu_UI.popup.lines[2] = "Round %d" % (saved_round + 1)
+    menu_UI.popup.lines[3] = "Cycle %d of %d" % (cycle_num, cycles)
+    menu_UI.popup.lines[4] = "UP=Yes  SEL=No"
+    menu_UI.popup.pop_up()
+    while True:
+        event = buttons.get()
+        if event == NO_EVENT:
+            utime.sleep_ms(MENU_POLL_MS)
+        elif event == BUTTON_A | EVENT_PRESS:
+            m5stack.tone(2000, duration=15, volume=1)
+            return True
+        elif event == BUTTON_C | EVENT_PRESS:
+            m5stack.tone(1400, duration=15, volume=1)
+            menu_UI.popup.pop_down()
+            menu_UI.menu._highlight()
+            return False
+
+
+def cycle(on_time_ms: int, off_time_ms: int, relay: Relay, scheduler: EdgeScheduler=None, idle=None) -> None:
     """
     Args:
         on_time_ms (int): The desired time in milliseconds for the ON period of the cycle.
         off_time_ms (int): The desired time in milliseconds for the OFF period of the cycle.
         relay (Relay): The instance of the relay to be acted on.
+        scheduler (EdgeScheduler): Optional. When given, the edges are placed on its absolute deadlines
+                                   and the call returns right after the OFF edge, leaving the OFF period
+                                   free for other work.
+        idle: Optional idle hook handed to the scheduler, i.e. RenderDispatcher.service
     Returns:
         None
     """
+    if scheduler is not None:
+        scheduler.edge(relay.on, on_time_ms, idle)
+        scheduler.edge(relay.off, off_time_ms, idle)
+        return
+
     relay.on()
     utime.sleep_ms(on_time_ms)
     relay.off()
@@ -723,17 +1638,15 @@ def on_off_time_calc(on_time_ms: int=0, off_time_ms: int=0, pulse_width_ms: int=
     Notes:  pulse_width and duty_cycle take priority over any values given for the on_time_ms and off_time_ms.
     """
     if pulse_width_ms != 0:
-        print("pulse width = " + str(pulse_width_ms))
         on_time_ms = int(pulse_width_ms * (duty_cycle / 100))
         off_time_ms = int(pulse_width_ms - on_time_ms)
-        print((on_time_ms, off_time_ms, pulse_width_ms, duty_cycle))
     else:
-        print("on time = " + str(pulse_width_ms))
         on_time_ms = int(on_time_ms)
         off_time_ms = int(off_time_ms)
         pulse_width_ms = int(on_time_ms + off_time_ms)
         duty_cycle = float(truncate(((on_time_ms / pulse_width_ms) * 100), 2))
-        print((on_time_ms, off_time_ms, pulse_width_ms, duty_cycle))
+    log.debug("on = %dms, off = %dms, pulse width = %dms", on_time_ms, off_time_ms, pulse_width_ms)
+    log.debug("duty cycle = %s%%", duty_cycle)
 
     gc.collect()
     return on_time_ms, off_time_ms, pulse_width_ms, duty_cycle
@@ -743,11 +1656,11 @@ def update_parameters_pane(on_time_ms: int, off_time_ms: int,
                            cycles: int) -> None:
 
     time = ((on_time_ms + off_time_ms) * cycles)
-    test_UI.parameters.lines[0:1] = [("PW   = %s" % pretty_time(pulse_width_ms))]
+    test_UI.parameters.lines[0:1] = [("PW   = %s" % time_texts.pretty_time(pulse_width_ms))]
     test_UI.parameters.lines[1:2] = [("DS   = %s%%" % str(duty_cycle))]
-    test_UI.parameters.lines[2:3] = [("ON   = %s" % pretty_time(on_time_ms, 1))]
-    test_UI.parameters.lines[3:4] = [("OFF  = %s" % pretty_time(off_time_ms, 1))]
-    test_UI.parameters.lines[4:5] = [("Time = %s" % pretty_time(time, 1))]
+    test_UI.parameters.lines[2:3] = [("ON   = %s" % time_texts.pretty_time(on_time_ms, 1))]
+    test_UI.parameters.lines[3:4] = [("OFF  = %s" % time_texts.pretty_time(off_time_ms, 1))]
+    test_UI.parameters.lines[4:5] = [("Time = %s" % time_texts.pretty_time(time, 1))]
     test_UI.parameters.update_all_lines()
 
 def importlib(module_name: str, submodule_name: str=None):
@@ -778,31 +1691,32 @@ if __name__ == "cycleTest":
     print("Now starting... " + __name__)
     print("configuring hardware")
 
-    btn_a = machine.Signal(machine.Pin(m5stack.BUTTON_A_PIN, machine.Pin.IN), invert=True)
-    btn_b = machine.Signal(m5stack.Pin(m5stack.BUTTON_B_PIN, machine.Pin.IN), invert=True)
-    btn_c = machine.Signal(m5stack.Pin(m5stack.BUTTON_C_PIN, machine.Pin.IN), invert=True)
+    buttons = ButtonInput()
 
     menu_UI = MenuUI()
-    x = True
-    while x:
-        utime.sleep_ms(150)
-        # print("btn a = " + str(btn_a.value()))
-        # print("btn_b = " + str(btn_b.value()))
-
-        if btn_a.value() == 1:
-            menu_UI.menu.move_up()
-            print(menu_UI.menu.num_of_files, menu_UI.menu.aperture_size, menu_UI.menu.offset)
-
-        elif btn_b.value() == 1:
-            menu_UI.menu.move_down()
-            print(menu_UI.menu.num_of_files, menu_UI.menu.aperture_size, menu_UI.menu.offset)
-
-        elif btn_c.value() == 1:
-            test_file_to_import = menu_UI.menu.test_names_dict[menu_UI.menu.test_names_list[menu_UI.menu.highlighted]]
-            print(str(test_file_to_import))
-            m5stack.tone(2000, duration=15, volume=1)
-            test_UI = TestUI()
-            importlib(test_file_to_import[:-3])
+    checkpoint = Checkpoint()
+    telemetry = open_stream()
+    saved = checkpoint.load()
+    if saved is not None:
+        print("Checkpoint found: %s round %d cycle %d of %d" % saved)
+        if saved[0] in menu_UI.menu.test_names_dict.values() and offer_resume(saved):
+            run_test_file(saved[0], saved[1:3])
+        else:
+            checkpoint.clear()
+    menu_tasks = MenuTasks() if aio.AVAILABLE else None
+    while True:
+        if menu_tasks is not None:
+            selected = menu_tasks.run()
+        else:
+            event = buttons.get()
+            selected = None
+            if event == NO_EVENT:
+                menu_UI.menu.idle(MENU_POLL_MS)
+                utime.sleep_ms(MENU_POLL_MS)
+            else:
+                selected = menu_event(event)
+        if selected is not None:
+            run_test_file(selected)
 
 
     # utime.sleep(10)
@@ -0,0 +1,186 @@
+"""
+Binary log of every cycle of a test, written to the SD card.
+
+Each cycle becomes a fixed size record (cycle number, start time, measured ON and OFF durations and flags)
+packed into a preallocated ring of records.  The ring is written in large blocks from the idle hook, only when
+there is enough slack before the next edge, so the latency spikes of the SD card never reach the relay.  log()
+is the only writer of the head of the ring and flush() the only writer of the tail, as in buttons.py, so the
+records may be logged from the edge thread of the thread engine while the foreground writes the card.
+
+File layout: every run appends a HEADER_FORMAT header followed by its RECORD_FORMAT records, all little endian.
+"""
+
+try:
+    import ustruct as struct
+except ImportError:
+    import struct
+
+import utime
+from micropython import const
+
+MAGIC = b'CYLG'
+VERSION = const(1)
+HEADER_FORMAT = '<4sHHII'       # magic, version, record size, nominal on ms, nominal off ms
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+RECORD_FORMAT = '<IIIIHH'       # cycle, start ms since the test started, on us, off us, flags, reserved
+TICKS_MASK = const(0x3fffffff)  # the start, on and off fields are kept modulo the ticks period, 2 ** 30
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+
+FLAG_SKIPPED = const(0x01)      # a periodic function ran at the end of this cycle, its OFF time was not measured
+FLAG_OVERRUN = const(0x02)      # records were dropped before this one because the buffer was full
+FLAG_LAST = const(0x04)         # the last cycle of the test, its OFF time ends at the end of the test
+
+DEFAULT_RECORDS = const(128)    # records held in RAM between two writes
+WRITE_COST_MS = const(30)       # assumed cost of a block write before one has been measured
+GUARD_MS = const(2)
+
+
+class CycleLogger:
+    """
+    Args:
+        path (str): The log file, i.e. '/sd/log_32109.bin'. Records are appended to an existing log.
+        on_time_ms (int): The nominal ON time, stored in the header.
+        off_time_ms (int): The nominal OFF time, stored in the header.
+        records (int): The number of records buffered in RAM. Default = DEFAULT_RECORDS
+    Notes:
+        log() only packs a record into the ring.  Pass service() to the idle hook of the test so the ring
+        is written once it is half full and there is time for it, and call close() when the test is over.
+        If the ring fills up before it could be written, new records are dropped and the next one written
+        carries FLAG_OVERRUN.
+    """
+    def __init__(self, path: str, on_time_ms: int, off_time_ms: int, records: int=DEFAULT_RECORDS):
+        self.path = path
+        self.slots = records + 1  # one slot stays empty, so a full ring is told apart from an empty one
+        self.buffer = bytearray(RECORD_SIZE * self.slots)
+        self.view = memoryview(self.buffer)
+        self.capacity = records
+        self.head = 0  # written by log() only
+        self.tail = 0  # written by flush() only
+        self.dropped = 0
+        self.written = 0
+        self.flags = 0
+        self.write_cost_ms = WRITE_COST_MS
+        self.last_ms = utime.ticks_ms()
+        self.elapsed_ms = 0  # ms since the logger was made, kept in step with every record as EtaEstimator does
+        self.file = open(path, 'ab')
+        self.file.write(struct.pack(HEADER_FORMAT, MAGIC, VERSION, RECORD_SIZE, on_time_ms, off_time_ms))
+
+    def log(self, cycle_num: int, start_ms: int, on_us: int, off_us: int, flags: int=0):
+        """
+        Args:
+            cycle_num (int): The number of the cycle.
+            start_ms (int): The ticks_ms() value of the ON edge of the cycle.
+            on_us (int): The measured ON time in microseconds.
+            off_us (int): The measured OFF time in microseconds.
+            flags (int): FLAG_* values.
+        Returns:
+            Nothing
+        Notes:
+            The start time and the durations are stored modulo 2 ** 30, so they stay small ints and always
+            fit the record: the start wraps after 12.4 days, read_records() unwraps it, and a ticks_us()
+            duration that went negative, a phase longer than about 9 minutes, is read back as measured up to
+            17.9 minutes.
+        """
+        self.elapsed_ms = (self.elapsed_ms + utime.ticks_diff(start_ms, self.last_ms)) & TICKS_MASK
+        self.last_ms = start_ms
+        head = self.head + 1
+        if head == self.slots:
+            head = 0
+        if head == self.tail:
+            self.dropped += 1
+            self.flags |= FLAG_OVERRUN
+            return
+        struct.pack_into(RECORD_FORMAT, self.buffer, self.head * RECORD_SIZE, cycle_num, self.elapsed_ms,
+                         on_us & TICKS_MASK, off_us & TICKS_MASK, flags | self.flags, 0)
+        self.flags = 0
+        self.head = head
+
+    @property
+    def pending(self) -> int:
+        return (self.head - self.tail) % self.slots
+
+    def service(self, slack_ms: int) -> bool:
+        """
+        Args:
+            slack_ms (int): The time in milliseconds until the next relay edge.
+        Returns:
+            True if a block was written.
+        """
+        if self.pending < self.capacity // 2 or self.write_cost_ms + GUARD_MS >= slack_ms:
+            return False
+        self.flush()
+        return True
+
+    def flush(self):
+        """
+        Returns:
+            Nothing
+        Notes:
+            Writes every buffered record, whatever the slack.  The time taken is remembered as the cost of
+            the next write.
+        """
+        head = self.head  # read once, records logged during the write wait for the next flush
+        if head == self.tail:
+            return
+        start = utime.ticks_ms()
+        if head > self.tail:
+            self.file.write(self.view[self.tail * RECORD_SIZE:head * RECORD_SIZE])
+        else:
+            self.file.write(self.view[self.tail * RECORD_SIZE:])
+            if head > 0:
+                self.file.write(self.view[:head * RECORD_SIZE])
+        self.file.flush()
+        cost = utime.ticks_diff(utime.ticks_ms(), start)
+        self.write_cost_ms = max(cost, (self.write_cost_ms * 7 + cost) // 8)
+        self.written += (head - self.tail) % self.slots
+        self.tail = head
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+
+def read_header(data: bytes) -> tuple:
+    """
+    Args:
+        data (bytes): The start of a log file.
+    Returns:
+        (version, record size, nominal on ms, nominal off ms)
+    """
+    magic, version, record_size, on_ms, off_ms = struct.unpack(HEADER_FORMAT, data[:HEADER_SIZE])
+    if magic != MAGIC:
+        raise ValueError("not a cycle log")
+    return version, record_size, on_ms, off_ms
+
+
+def read_records(path: str):
+    """
+    Args:
+        path (str): A log file written by CycleLogger.
+    Returns:
+        A generator of (run, cycle, start_ms, on_us, off_us, flags) tuples.  run counts the headers seen so far,
+        starting at 1.  start_ms is unwrapped, see CycleLogger.log().
+    """
+    with open(path, 'rb') as log_file:
+        data = log_file.read()
+    run = 0
+    offset = 0
+    last_ms = 0
+    wraps = 0
+    while offset < len(data):
+        if data[offset:offset + 4] == MAGIC:
+            if read_header(data[offset:])[1] != RECORD_SIZE:
+                raise ValueError("unsupported record size")
+            run += 1
+            offset += HEADER_SIZE
+            last_ms = 0
+            wraps = 0
+            continue
+        if offset + RECORD_SIZE > len(data):
+            break
+        cycle, start_ms, on_us, off_us, flags = struct.unpack_from(RECORD_FORMAT, data, offset)[:5]
+        if start_ms < last_ms:
+            wraps += 1
+        last_ms = start_ms
+        yield run, cycle, start_ms + wraps * (TICKS_MASK + 1), on_us, off_us, flags
+        offset += RECORD_SIZE
@@ -0,0 +1,179 @@
+"""
+Relay edges generated by a thread of their own.
+
+The edge thread runs the cycles of a test with an EdgeScheduler and touches nothing but the relay and a small
+preallocated array('i') shared with the foreground: the count of completed cycles, the next deadline, the
+state of the run, the stop request and the pause counters.  Each value has a single writer, so no lock is
+needed.  The foreground, the thread that started the test, keeps the display, the buttons, the SD card and gc,
+and reads the slack before the next edge from the shared deadline, as it does for TimerPulseEngine.  It also
+runs the periodic functions: when one is due the edge thread counts a pause in PAUSES and waits, the foreground
+calls the function and resume() catches RESUMED up with it, so nothing but the relay is ever touched from the
+edge thread.
+
+Note: threads can not be pinned to a core from Python; on the LoBo firmware both run as FreeRTOS tasks of
+MicroPython.  The foreground still keeps its work within the slack, so the timing holds on a firmware whose
+threads share one interpreter lock as well.  gc.collect() stops every thread, which is why the collection is
+left to the foreground and its GcScheduler.
+"""
+
+import _thread
+import utime
+from array import array
+from micropython import const
+
+from scheduler import EdgeScheduler
+
+THREAD_NAME = "CycleEdges"
+
+COUNT = const(0)     # completed cycles, written by the edge thread
+DEADLINE = const(1)  # ticks_ms() of the next edge, written by the edge thread
+STATE = const(2)     # RUNNING or DONE, written by the edge thread
+PAUSES = const(3)    # pauses made for a periodic function, written by the edge thread
+STOP = const(4)      # 1 once a stop is requested, written by the foreground
+RESUMED = const(5)   # pauses the foreground has run the periodic function for, written by the foreground
+
+RUNNING = const(0)
+DONE = const(1)
+
+PAUSE_POLL_MS = const(1)  # how often the paused edge thread looks for resume()
+
+
+def start_thread(name: str, func, args: tuple):
+    """
+    Args:
+        name (str): The name of the thread, shown by the thread list of the LoBo firmware.
+        func: The function the thread runs.
+        args (tuple): Its arguments.
+    Returns:
+        The value of _thread.start_new_thread()
+    Notes:
+        The LoBo _thread takes the name first, the _thread of other ports and of CPython does not.
+    """
+    try:
+        return _thread.start_new_thread(name, func, args)
+    except TypeError:
+        return _thread.start_new_thread(func, args)
+
+
+class EdgeThread:
+    """
+    Args:
+        relay (Relay): The relay to drive.
+        on_time_ms (int): The ON time of every cycle in milliseconds.
+        off_time_ms (int): The OFF time of every cycle in milliseconds.
+        cycles (int): The number of cycles to run.
+        func_call_freq (int): Pause before every cycle whose number is a multiple of this, for the foreground
+                              to run the periodic function of the test. 0 = never. Default = 0
+        raw_relay (Relay): The relay itself when relay is a TimedRelay, forced off after an error or a stop
+                           without recording an edge. Default = relay
+    Notes:
+        count, done, paused and remaining() are what the foreground polls, as for TimerPulseEngine.  An
+        exception raised on the edge thread leaves the relay off and is kept in error for the foreground to raise.
+    """
+    def __init__(self, relay, on_time_ms: int, off_time_ms: int, cycles: int, func_call_freq: int=0,
+                 raw_relay=None):
+        self.relay = relay
+        self.raw_relay = relay if raw_relay is None else raw_relay
+        self.on_time_ms = on_time_ms
+        self.off_time_ms = off_time_ms
+        self.cycles = cycles
+        self.func_call_freq = func_call_freq
+        self.scheduler = EdgeScheduler()
+        self.shared = array('i', (0, 0, DONE, 0, 0, 0))
+        self.error = None
+
+    @property
+    def count(self) -> int:
+        return self.shared[COUNT]
+
+    @property
+    def done(self) -> bool:
+        return self.shared[STATE] == DONE
+
+    @property
+    def paused(self) -> bool:
+        return self.shared[RESUMED] != self.shared[PAUSES]
+
+    @property
+    def stopped(self) -> bool:
+        return self.shared[STOP] != 0 and self.shared[COUNT] < self.cycles
+
+    def remaining(self) -> int:
+        """
+        Returns:
+            The number of milliseconds until the next edge, negative if it is due.
+        """
+        return utime.ticks_diff(self.shared[DEADLINE], utime.ticks_ms())
+
+    def start(self, first_cycle: int=1):
+        """
+        Args:
+            first_cycle (int): The cycle to start from, for a test resumed part way through. Default = 1
+        Returns:
+            Nothing
+        Notes:
+            Starts the edge thread and returns.
+        """
+        self.error = None
+        self.scheduler.reset()
+        self.shared[COUNT] = first_cycle - 1
+        self.shared[DEADLINE] = self.scheduler.deadline
+        self.shared[PAUSES] = 0
+        self.shared[STOP] = 0
+        self.shared[RESUMED] = 0
+        self.shared[STATE] = RUNNING
+        start_thread(THREAD_NAME, self._run, (first_cycle,))
+
+    def resume(self):
+        """
+        Returns:
+            Nothing
+        Notes:
+            Lets the edge thread go on once the periodic function has run, within PAUSE_POLL_MS.  The time
+            spent paused is not counted as drift, the schedule is resynced from the next cycle.
+        """
+        self.shared[RESUMED] = self.shared[PAUSES]
+
+    def stop(self):
+        """
+        Returns:
+            Nothing
+        Notes:
+            Asks the edge thread to stop at the end of the running cycle, or at once while paused, it leaves the
+            relay off.  done is set once it has.
+        """
+        self.shared[STOP] = 1
+
+    def _run(self, first_cycle: int):
+        shared = self.shared
+        scheduler = self.scheduler
+        relay_on = self.relay.on  # bound once, a bound method made inside the loop would allocate every cycle
+        relay_off = self.relay.off
+        cycle_num = first_cycle
+        completed = False
+        try:
+            while cycle_num <= self.cycles and shared[STOP] == 0:
+                if self.func_call_freq > 0 and cycle_num % self.func_call_freq == 0:
+                    scheduler.wait()
+                    shared[PAUSES] += 1
+                    while shared[RESUMED] != shared[PAUSES] and shared[STOP] == 0:
+                        utime.sleep_ms(PAUSE_POLL_MS)
+                    if shared[STOP] != 0:
+                        break
+                    scheduler.resync()
+                    shared[DEADLINE] = scheduler.deadline
+                scheduler.edge(relay_on, self.on_time_ms)
+                shared[DEADLINE] = scheduler.deadline
+                scheduler.edge(relay_off, self.off_time_ms)
+                shared[DEADLINE] = scheduler.deadline
+                shared[COUNT] = cycle_num
+                cycle_num += 1
+            if cycle_num > self.cycles:
+                scheduler.finish()
+                completed = True
+        except Exception as error:
+            self.error = error
+        finally:
+            if not completed:
+                self.raw_relay.off()  # the last OFF edge already ran on a completed run
+            shared[STATE] = DONE
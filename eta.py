@@ -0,0 +1,107 @@
+"""
+Time remaining, finish time and cycle rate of a running test, from the measured cycle durations.
+
+mark() is called at the end of every cycle and only adds the time since the previous call to a running total,
+kept as seconds plus milliseconds so it stays a small int on the device however long the test.  The estimate
+itself, the mean measured cycle time times the cycles left, is only worked out by text(), when the line is
+drawn.  The mean includes the pauses of periodic functions, so the rate is the real one and drops below 100%
+when a test spends time outside its ON and OFF phases.
+"""
+
+import utime
+from micropython import const
+
+from timefmt import pretty_time, MINUTE_MS
+
+RTC_SET_YEAR = const(2020)  # the clock is taken as unset before this year and no finish time is shown
+
+
+class EtaEstimator:
+    """
+    Args:
+        cycles (int): The total number of cycles of the test.
+        period_ms (int): The nominal time of one cycle in milliseconds, ON plus OFF time.
+    Notes:
+        The first mark() only sets the reference: a cycle ends at its OFF edge, not when its OFF time is over,
+        so the time up to the first mark is no cycle time.  mark() returns True once a second, the time to
+        post a redraw of the line.
+    """
+    def __init__(self, cycles: int, period_ms: int):
+        self.cycles = cycles
+        self.period_ms = period_ms
+        self.base_cycle = 0  # the cycle of the first mark(), 0 before it
+        self.cycle = 0
+        self.elapsed_s = 0
+        self.elapsed_ms = 0
+        self.last = 0
+
+    def mark(self, cycle_num: int) -> bool:
+        """
+        Args:
+            cycle_num (int): The cycle just completed.
+        Returns:
+            True if a whole second has passed since the previous True.
+        """
+        now = utime.ticks_ms()
+        if self.base_cycle == 0:
+            self.base_cycle = self.cycle = cycle_num
+            self.last = now
+            return False
+        milliseconds = self.elapsed_ms + utime.ticks_diff(now, self.last)
+        self.last = now
+        self.cycle = cycle_num
+        if milliseconds < 1000:
+            self.elapsed_ms = milliseconds
+            return False
+        self.elapsed_s += milliseconds // 1000
+        self.elapsed_ms = milliseconds % 1000
+        return True
+
+    def remaining_ms(self) -> int:
+        """
+        Returns:
+            The estimated time in milliseconds until the last cycle is done, -1 until two mark() calls.
+        """
+        done = self.cycle - self.base_cycle
+        if done <= 0:
+            return -1
+        return (self.elapsed_s * 1000 + self.elapsed_ms) * (self.cycles - self.cycle) // done
+
+    def rate(self) -> int:
+        """
+        Returns:
+            The measured cycle rate in percent of the nominal one, 0 until two mark() calls.
+        """
+        elapsed = self.elapsed_s * 1000 + self.elapsed_ms
+        if elapsed <= 0:
+            return 0
+        return self.period_ms * (self.cycle - self.base_cycle) * 100 // elapsed
+
+    def finish_time(self, remaining_ms: int) -> str:
+        """
+        Args:
+            remaining_ms (int): The time left, as remaining_ms() returns it.
+        Returns:
+            The projected finish time of day, "HH:MM", or "" if the clock is not set.
+        """
+        finish = utime.localtime(utime.time() + remaining_ms // 1000)
+        if finish[0] < RTC_SET_YEAR:
+            return ""
+        return "%02d:%02d" % (finish[3], finish[4])
+
+    def text(self) -> str:
+        """
+        Returns:
+            The status line, i.e. "1h 02m 05s left 14:32 98%"
+        """
+        remaining = self.remaining_ms()
+        if remaining < 0:
+            return ""
+        if remaining < MINUTE_MS:
+            left = "%ds" % (remaining // 1000)  # the hundredths of pretty_time() are noise here
+        else:
+            left = pretty_time(remaining)
+        finish = self.finish_time(remaining)
+        if finish:
+            return "%s left %s %d%%" % (left, finish, self.rate())
+        return "%s left %d%%" % (left, self.rate())
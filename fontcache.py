@@ -0,0 +1,68 @@
+"""
+Font metrics cache for the display.
+
+tft.font() reloads the font tables of the driver and tft.fontSize() asks the driver again for numbers that
+never change, so both are kept here: the size of every font is read once, and select() only calls tft.font()
+when the font really changes.  Everything that draws text should select its font through here, otherwise the
+cache no longer knows which font is current; call forget() after code that switches the font behind its back.
+"""
+
+
+class FontMetrics:
+    """
+    Args:
+        tft: The display.
+    """
+    def __init__(self, tft):
+        self.tft = tft
+        self.current = None
+        self.sizes = {}
+        self.char_widths = {}
+
+    def select(self, font):
+        """
+        Args:
+            font: The font to draw with next.
+        Returns:
+            Nothing
+        """
+        if font != self.current:
+            self.tft.font(font)
+            self.current = font
+
+    def forget(self):
+        """
+        Returns:
+            Nothing
+        Notes:
+            The next select() calls tft.font() whatever the font.
+        """
+        self.current = None
+
+    def size(self, font) -> tuple:
+        """
+        Args:
+            font: A font.
+        Returns:
+            (width, height) of the font in pixels, as tft.fontSize() returns them.
+        """
+        size = self.sizes.get(font)
+        if size is None:
+            self.select(font)
+            size = self.sizes[font] = tuple(self.tft.fontSize())
+        return size
+
+    def char_width(self, font, char: str="0") -> int:
+        """
+        Args:
+            font: A font.
+            char (str): The character to measure. Default = "0", the cell width of fixed width digits
+        Returns:
+            The width of char in pixels.
+        """
+        key = (font, char)
+        width = self.char_widths.get(key)
+        if width is None:
+            self.select(font)
+            width = self.char_widths[key] = self.tft.textWidth(char)
+        return width
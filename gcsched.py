@@ -0,0 +1,110 @@
+"""
+Garbage collection in the slack between relay edges.
+
+The automatic collector runs whenever an allocation finds the heap full, which can be in the middle of a 4 ms
+ON phase.  While a test runs it is disabled instead, and service(), an idle hook, collects once enough has been
+allocated and only when the measured cost of a collection fits in the time left before the next edge.  The
+cycle loop itself does not allocate (see heapcheck.py), so collections are rare and come from periodic
+functions, logging and the display.
+
+If the heap runs low anyway, service() collects at the next idle moment whatever the slack, because a
+MemoryError is worse than a late edge; such collections are counted as overlaps.
+"""
+
+import gc
+import utime
+from micropython import const
+
+COLLECT_BYTES = const(16384)   # collect once this much has been allocated since the last collection
+LOW_WATER_BYTES = const(8192)  # collect at the next idle moment when less than this is free
+COLLECT_COST_MS = const(20)    # assumed cost of a collection before one has been measured
+GUARD_MS = const(2)
+
+
+class GcScheduler:
+    """
+    Args:
+        collect_bytes (int): Collect once this much has been allocated since the last collection.
+                             Default = COLLECT_BYTES
+        low_water_bytes (int): Collect whatever the slack below this much free heap. Default = LOW_WATER_BYTES
+    Notes:
+        Call begin() before the first edge and end() after the last one, in a finally clause so the automatic
+        collector is always enabled again.  worst_us, collections and overlaps describe the run; overlaps
+        counts the collections that were still running when the next edge was due.
+    """
+    def __init__(self, collect_bytes: int=COLLECT_BYTES, low_water_bytes: int=LOW_WATER_BYTES):
+        self.collect_bytes = collect_bytes
+        self.low_water_bytes = low_water_bytes
+        self.cost_ms = COLLECT_COST_MS
+        self.worst_us = 0
+        self.collections = 0
+        self.overlaps = 0
+        self.active = False
+        self.mark = 0
+
+    def begin(self):
+        """
+        Returns:
+            Nothing
+        Notes:
+            Collects once to start from a clean heap and to measure the cost of a collection, then disables
+            the automatic collector.
+        """
+        self._collect(0x7fffffff)
+        self.collections = 0
+        self.worst_us = 0
+        gc.disable()
+        self.active = True
+
+    def end(self):
+        gc.enable()
+        self.active = False
+
+    def paused(self, func, param):
+        """
+        Args:
+            func: A function run outside the schedule, i.e. the periodic function of a test.
+            param: Its parameter.
+        Returns:
+            Nothing
+        Notes:
+            Runs func with the automatic collector enabled, as nothing is timed while it runs.
+        """
+        if self.active:
+            gc.enable()
+        try:
+            func(param)
+        finally:
+            if self.active:
+                gc.disable()
+
+    def service(self, slack_ms: int) -> bool:
+        """
+        Args:
+            slack_ms (int): The time in milliseconds until the next relay edge.
+        Returns:
+            True if a collection was run.
+        """
+        if gc.mem_free() < self.low_water_bytes:
+            self._collect(slack_ms)
+            return True
+        if gc.mem_alloc() - self.mark < self.collect_bytes or self.cost_ms + GUARD_MS >= slack_ms:
+            return False
+        self._collect(slack_ms)
+        return True
+
+    def _collect(self, slack_ms: int):
+        start = utime.ticks_us()
+        gc.collect()
+        pause_us = utime.ticks_diff(utime.ticks_us(), start)
+        self.mark = gc.mem_alloc()
+        self.collections += 1
+        if pause_us > self.worst_us:
+            self.worst_us = pause_us
+        if pause_us >= slack_ms * 1000:
+            self.overlaps += 1
+        cost_ms = (pause_us + 999) // 1000
+        self.cost_ms = max(cost_ms, (self.cost_ms * 7 + cost_ms) // 8)
+
+    def report(self) -> str:
+        return "GC %d, worst %dus, %d overlapped" % (self.collections, self.worst_us, self.overlaps)
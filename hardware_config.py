@@ -11,46 +11,8 @@ def M5stack():
 
     m5stack.tone(1, duration=0, volume=0)  # Prevents first tone being at full volume
 
-    def button_hander_a(pin, pressed):
-        if pressed is True:
-            tft.text(
-                tft.CENTER, tft.LASTY, "> Button A pressed.     "
-            )
-            m5stack.tone(1800, duration=10, volume=1)
-        else:
-            tft.text(
-                tft.CENTER, tft.LASTY, "> Button A released.    "
-            )
-            m5stack.tone(1300, duration=10, volume=1)
-
-    def button_hander_b(pin, pressed):
-        if pressed is True:
-            tft.text(
-                tft.CENTER, tft.LASTY, "> Button B pressed.     "
-            )
-            m5stack.tone(2000, duration=10, volume=1)
-        else:
-            tft.text(
-                tft.CENTER, tft.LASTY, "> Button B released.    "
-            )
-            m5stack.tone(1500, duration=10, volume=1)
-
-    def button_hander_c(pin, pressed):
-        if pressed is True:
-            tft.text(
-                tft.CENTER, tft.LASTY, "> Button C pressed.     "
-            )
-            m5stack.tone(2200, duration=10, volume=1)
-        else:
-            tft.text(
-                tft.CENTER, tft.LASTY, "> Button C released.    "
-            )
-            m5stack.tone(1800, duration=10, volume=1)
-
+    # the buttons are read through IRQs by buttons.ButtonInput
     return tft
-           # m5stack.ButtonA(callback=button_hander_a),\
-           # m5stack.ButtonB(callback=button_hander_b),\
-           # m5stack.ButtonC(callback=button_hander_c)
 
 def ESP32_WROVER_KIT_v3():
     import display
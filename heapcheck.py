@@ -0,0 +1,47 @@
+"""
+Check that the cycle loop of a test does not allocate on the heap.
+
+gc.mem_free() is sampled once per cycle.  Every drop between two samples is memory allocated by the loop; a
+rise is a collection and only resets the reference.  A loop that allocates nothing reports 0 bytes, whatever
+the rest of the firmware does with the heap before or after the test.
+"""
+
+import gc
+
+
+class HeapProbe:
+    """
+    Notes:
+        Call sample() at the same point of every cycle, then read allocated, samples and per_sample().
+        samples counts the intervals between two samples, so it is one less than the number of calls.
+    """
+    def __init__(self):
+        self.last = None  # the first sample only sets the reference, the setup of the test is not counted
+        self.allocated = 0
+        self.worst = 0
+        self.samples = 0
+
+    def sample(self):
+        free = gc.mem_free()
+        if self.last is None:
+            self.last = free
+            return
+        drop = self.last - free
+        if drop > 0:
+            self.allocated += drop
+            if drop > self.worst:
+                self.worst = drop
+        self.last = free
+        self.samples += 1
+
+    def per_sample(self) -> int:
+        """
+        Returns:
+            The average number of bytes allocated between two samples.
+        """
+        if self.samples == 0:
+            return 0
+        return self.allocated // self.samples
+
+    def report(self) -> str:
+        return "Heap %dB in %d cycles, worst %dB" % (self.allocated, self.samples, self.worst)
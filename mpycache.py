@@ -0,0 +1,106 @@
+"""
+Loading of TEST_ modules from precompiled bytecode.
+
+Compiling a test profile from source on the ESP32 takes seconds and a large heap spike, while a .mpy file is
+only loaded.  The .mpy files are kept in their own directory on the SD card, next to a .sha file holding the
+SHA1 of the source they were compiled from, because MicroPython prefers a .py over a .mpy in the same
+directory.  A cache entry is only used while the digest still matches the source, so an edited test never
+runs stale bytecode.
+
+The firmware can not compile .mpy files itself; they are made on a PC with tools/precompile_tests.py.
+"""
+
+import sys
+import utime
+import uos as os
+
+try:
+    import uhashlib as hashlib
+except ImportError:
+    import hashlib
+
+try:
+    import ubinascii as binascii
+except ImportError:
+    import binascii
+
+TEST_DIR = '/sd'
+CACHE_DIR = '/sd/__mpycache__'
+CHUNK_SIZE = 512
+
+
+def source_digest(path: str) -> str:
+    """
+    Args:
+        path (str): The source file.
+    Returns:
+        The SHA1 of the file as hex, read in small chunks so the whole file is never held in RAM.
+    """
+    digest = hashlib.sha1()
+    buffer = bytearray(CHUNK_SIZE)
+    view = memoryview(buffer)
+    with open(path, 'rb') as source:
+        while True:
+            count = source.readinto(buffer)
+            if not count:
+                break
+            digest.update(view[:count])
+    return str(binascii.hexlify(digest.digest()), 'ascii')
+
+
+def stamp_path(module_name: str, cache_dir: str=CACHE_DIR) -> str:
+    return '%s/%s.sha' % (cache_dir, module_name)
+
+
+def is_fresh(test_file: str, directory: str=TEST_DIR, cache_dir: str=CACHE_DIR) -> bool:
+    """
+    Args:
+        test_file (str): The test file, i.e. 'TEST_32109.py'
+        directory (str): The directory holding the source. Default = TEST_DIR
+        cache_dir (str): The directory holding the cache. Default = CACHE_DIR
+    Returns:
+        True if a .mpy of the current source is in the cache.
+    """
+    module_name = test_file[:-3]
+    try:
+        os.stat('%s/%s.mpy' % (cache_dir, module_name))
+        with open(stamp_path(module_name, cache_dir), 'r') as stamp:
+            expected = stamp.read().strip()
+        return expected == source_digest('%s/%s' % (directory, test_file))
+    except OSError:
+        return False
+
+
+def import_test(test_file: str, directory: str=TEST_DIR, cache_dir: str=CACHE_DIR):
+    """
+    Args:
+        test_file (str): The test file, i.e. 'TEST_32109.py'
+        directory (str): The directory holding the source. Default = TEST_DIR
+        cache_dir (str): The directory holding the cache. Default = CACHE_DIR
+    Returns:
+        The imported module.
+    Notes:
+        Imports the cached bytecode when it is fresh and the source otherwise.  A .mpy made by an mpy-cross that
+        does not match the firmware is reported and the source is imported instead.  The module is always run
+        afresh, as the test is the code at its module level: one imported before, i.e. a test picked again
+        from the menu or resumed, is dropped from sys.modules first.
+    """
+    module_name = test_file[:-3]
+    if module_name in sys.modules:
+        del sys.modules[module_name]
+    start = utime.ticks_ms()
+    if is_fresh(test_file, directory, cache_dir):
+        sys.path.insert(0, cache_dir)
+        try:
+            module = __import__(module_name)
+            print("Loaded %s from bytecode in %dms" % (module_name, utime.ticks_diff(utime.ticks_ms(), start)))
+            return module
+        except ValueError as error:
+            if '.mpy' not in str(error):
+                raise
+            print("Can not use %s/%s.mpy: %s" % (cache_dir, module_name, error))
+        finally:
+            sys.path.remove(cache_dir)
+    else:
+        print("No fresh bytecode for %s, compiling the source" % test_file)
+    return __import__(module_name)
@@ -0,0 +1,122 @@
+"""
+Relay waveform generated from machine.Timer callbacks.
+
+The foreground loop only polls the shared counters of the engine, so rendering, buttons and SD access no
+longer decide when an edge happens.  Deadlines are kept by an EdgeScheduler, so every timer is armed for the
+time left until the absolute deadline and the latency of one callback does not add up over a run.
+
+Note: the LoBo firmware runs Timer callbacks through micropython.schedule(), between two bytecodes of the
+foreground.  A single native call that takes longer than the time left before an edge (i.e. a large
+tft.text()) still delays that edge, so the foreground should keep drawing through RenderDispatcher.
+"""
+
+import machine
+
+from scheduler import EdgeScheduler
+
+
+class TimerPulseEngine:
+    """
+    Args:
+        relay (Relay): The relay to drive.
+        on_time_ms (int): The ON time of every cycle in milliseconds.
+        off_time_ms (int): The OFF time of every cycle in milliseconds.
+        cycles (int): The number of cycles to run.
+        func_call_freq (int): Pause before every cycle whose number is a multiple of this, so the foreground can
+                              run the periodic function of the test. 0 = never. Default = 0
+        timer_id (int): The hardware timer to use. Default = 0
+    Notes:
+        count is the number of completed cycles, done is set once the last OFF phase has ended and paused is
+        set while the engine waits for resume().  These are the only values the foreground needs to poll.
+    """
+    def __init__(self, relay, on_time_ms: int, off_time_ms: int, cycles: int,
+                 func_call_freq: int=0, timer_id: int=0):
+        self.relay = relay
+        self.on_time_ms = on_time_ms
+        self.off_time_ms = off_time_ms
+        self.cycles = cycles
+        self.func_call_freq = func_call_freq
+        self.timer = machine.Timer(timer_id)
+        self.scheduler = EdgeScheduler()
+        self.count = 0
+        self.done = False
+        self.paused = False
+        self.relay_on = False
+        self._callback_ref = self._callback  # bound once, so arming the timer does not allocate
+        self._relay_on = relay.on
+        self._relay_off = relay.off
+
+    def start(self, first_cycle: int=1):
+        """
+        Args:
+            first_cycle (int): The cycle to start from, for a test resumed part way through. Default = 1
+        Returns:
+            Nothing
+        Notes:
+            Starts the first cycle right away and returns; the rest of the run happens in timer callbacks.
+        """
+        self.count = first_cycle - 1
+        self.done = False
+        self.paused = False
+        self.scheduler.reset()
+        self._next_cycle()
+
+    def resume(self):
+        """
+        Returns:
+            Nothing
+        Notes:
+            Continues after a pause.  The time spent paused is not counted as drift.
+        """
+        self.scheduler.resync()
+        self.paused = False
+        self._on()
+
+    def stop(self):
+        """
+        Returns:
+            Nothing
+        Notes:
+            Stops the timer and leaves the relay off.
+        """
+        self.timer.deinit()
+        self.relay.off()
+        self.relay_on = False
+        self.done = True
+
+    def remaining(self) -> int:
+        """
+        Returns:
+            The number of milliseconds until the next edge.
+        """
+        return self.scheduler.remaining()
+
+    def _next_cycle(self):
+        if self.count >= self.cycles:
+            self.done = True
+            self.scheduler.finish()
+            return
+        if self.func_call_freq > 0 and (self.count + 1) % self.func_call_freq == 0:
+            self.paused = True
+            return
+        self._on()
+
+    def _on(self):
+        self.scheduler.mark(self._relay_on, self.on_time_ms)
+        self.relay_on = True
+        self._arm()
+
+    def _arm(self):
+        period = self.scheduler.remaining()
+        if period < 1:
+            period = 1
+        self.timer.init(period=period, mode=machine.Timer.ONE_SHOT, callback=self._callback_ref)
+
+    def _callback(self, timer):
+        if self.relay_on:
+            self.scheduler.mark(self._relay_off, self.off_time_ms)
+            self.relay_on = False
+            self._arm()
+        else:
+            self.count += 1
+            self._next_cycle()
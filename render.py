@@ -0,0 +1,132 @@
+"""
+Slack-aware rendering of UI updates while a test is running.
+
+Drawing on the display takes tens of milliseconds, so it must never sit between a deadline and the relay
+edge that belongs to it.  Updates are queued by key and only drawn from the EdgeScheduler idle hook, when the
+measured cost of the draw fits in the time left before the next edge.
+
+The cost of a key is a decaying maximum of its draw times, so it follows a slower draw at once.  A single
+outlier, i.e. a draw that met a gc pause or an SD card write, could then keep the estimate above every later
+slack and the key would never be drawn again, so every time the key is skipped for lack of slack the estimate
+also decays towards the average draw time.
+"""
+
+import utime
+from micropython import const
+
+DISPLAY_UPDATE_INTERVAL = const(56)  # minimum ms between two draws, as in the original LCD cycle tester
+DEFAULT_COST_MS = const(40)         # assumed cost of a draw that has never been measured
+GUARD_MS = const(2)                 # kept free before every edge
+
+
+class RenderDispatcher:
+    """
+    Args:
+        interval_ms (int): The minimum time in milliseconds between two draws. Default = DISPLAY_UPDATE_INTERVAL
+        guard_ms (int): The time in milliseconds that must be left before the next edge after a draw.
+                        Default = GUARD_MS
+    Notes:
+        Register a draw function once per key with register(), then post() new values as often as needed.
+        Only the latest value of a key is kept, so stale counter updates are coalesced and never drawn.
+        Pass service() as the idle hook of EdgeScheduler.
+    """
+    def __init__(self, interval_ms: int=DISPLAY_UPDATE_INTERVAL, guard_ms: int=GUARD_MS):
+        self.interval_ms = interval_ms
+        self.guard_ms = guard_ms
+        self.disabled = False
+        self.keys = []
+        self.funcs = {}
+        self.costs = {}
+        self.averages = {}  # average draw time of every key, the floor of the decay of its cost
+        self.pending = {}
+        self.next_due = utime.ticks_ms()
+
+    def register(self, key: str, func, cost_ms: int=DEFAULT_COST_MS):
+        """
+        Args:
+            key (str): The name of the update, i.e. "counter"
+            func: Callable, func(value), that draws the update.
+            cost_ms (int): The initial estimate of the draw time in milliseconds. It is replaced by
+                           measurements once the function has run.
+        Returns:
+            Nothing
+        """
+        if key not in self.funcs:
+            self.keys.append(key)
+        self.funcs[key] = func
+        self.costs[key] = cost_ms
+        self.averages[key] = cost_ms
+
+    def check_phases(self, on_time_ms: int, off_time_ms: int) -> bool:
+        """
+        Args:
+            on_time_ms (int): The ON time of the test in milliseconds.
+            off_time_ms (int): The OFF time of the test in milliseconds.
+        Returns:
+            True if updates are disabled because neither phase is long enough for a draw.
+        """
+        self.disabled = on_time_ms < self.interval_ms and off_time_ms < self.interval_ms
+        return self.disabled
+
+    def post(self, key: str, value=None):
+        """
+        Args:
+            key (str): The registered name of the update.
+            value: The value handed to the draw function. Replaces any value still waiting for this key.
+        Returns:
+            Nothing
+        """
+        self.pending[key] = value
+
+    def service(self, slack_ms: int) -> bool:
+        """
+        Args:
+            slack_ms (int): The time in milliseconds until the next relay edge.
+        Returns:
+            True if some time was used (drawing or waiting for the rate limit), False if there is nothing
+            that can be drawn before the next edge.
+        """
+        if self.disabled or not self.pending:
+            return False
+
+        now = utime.ticks_ms()
+        wait = utime.ticks_diff(self.next_due, now)
+        if wait > 0:
+            if wait >= slack_ms:
+                return False
+            utime.sleep_ms(wait)
+            return True
+
+        for key in self.keys:
+            if key in self.pending:
+                if self.costs[key] + self.guard_ms < slack_ms:
+                    self._draw(key)
+                    self.next_due = utime.ticks_add(utime.ticks_ms(), self.interval_ms)
+                    return True
+                if self.costs[key] > self.averages[key]:
+                    self.costs[key] = (self.costs[key] * 3 + self.averages[key]) // 4
+        return False
+
+    def flush(self):
+        """
+        Returns:
+            Nothing
+        Notes:
+            Draws everything still pending, regardless of slack or of updates being disabled. For use once
+            the timing critical part is over.
+        """
+        for key in self.keys:
+            if key in self.pending:
+                self._draw(key)
+
+    def _draw(self, key: str):
+        value = self.pending.pop(key)
+        start = utime.ticks_ms()
+        self.funcs[key](value)
+        cost = utime.ticks_diff(utime.ticks_ms(), start)
+        self.averages[key] = (self.averages[key] * 7 + cost) // 8
+        previous = self.costs[key]
+        if cost > previous:
+            self.costs[key] = cost
+        else:
+            self.costs[key] = (previous * 7 + cost) // 8  # decaying maximum, follows slow changes only
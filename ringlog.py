@@ -0,0 +1,165 @@
+"""
+Levelled diagnostics kept in a RAM ring buffer.
+
+A message costs a function call and a few stores into preallocated lists: the format string and up to three
+arguments are kept as they are and only formatted when the ring is flushed to serial or to a file, from idle
+time.  Once the ring is full the oldest messages are overwritten, so the last RING_SIZE messages can still be
+read after a fault with recent().
+
+The level is fixed at import time.  Levels below it are bound to a function that does nothing, so a debug()
+left in a hot path costs one empty call in production.  Set LOG_LEVEL in a log_config.py module to change it.
+
+Usage:
+    import ringlog as log
+    log.debug("offset = %d, highlighted = %d", offset, highlighted)
+"""
+
+import utime
+from micropython import const
+
+DEBUG = const(10)
+INFO = const(20)
+WARNING = const(30)
+ERROR = const(40)
+LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARNING", ERROR: "ERROR"}
+
+try:
+    from log_config import LOG_LEVEL
+except ImportError:
+    LOG_LEVEL = INFO
+
+RING_SIZE = const(64)
+LINE_COST_MS = const(2)  # time to print one message at 115200 baud, most of it goes to the UART buffer
+GUARD_MS = const(2)
+
+_UNSET = object()
+
+
+class LogRing:
+    """
+    Args:
+        size (int): The number of messages kept. Default = RING_SIZE
+    Notes:
+        add() stores, flush() formats and writes the messages not flushed yet.  Messages overwritten before
+        they were flushed are counted in lost.  warnings and errors count the messages of those levels added
+        since power up, whatever the ring still holds.
+    """
+    def __init__(self, size: int=RING_SIZE):
+        self.size = size
+        self.levels = bytearray(size)
+        self.stamps = [0] * size
+        self.messages = [None] * size
+        self.first = [None] * size
+        self.second = [None] * size
+        self.third = [None] * size
+        self.next = 0      # index of the next message written
+        self.count = 0     # messages in the ring
+        self.pending = 0   # messages not flushed yet
+        self.lost = 0
+        self.warnings = 0
+        self.errors = 0
+
+    def add(self, level: int, message: str, first=_UNSET, second=_UNSET, third=_UNSET):
+        index = self.next
+        self.levels[index] = level
+        self.stamps[index] = utime.ticks_ms()
+        self.messages[index] = message
+        self.first[index] = first
+        self.second[index] = second
+        self.third[index] = third
+        if level >= ERROR:
+            self.errors += 1
+        elif level >= WARNING:
+            self.warnings += 1
+        self.next = (index + 1) % self.size
+        if self.count < self.size:
+            self.count += 1
+        if self.pending < self.size:
+            self.pending += 1
+        else:
+            self.lost += 1
+
+    def format(self, index: int) -> str:
+        message = self.messages[index]
+        if self.third[index] is not _UNSET:
+            message = message % (self.first[index], self.second[index], self.third[index])
+        elif self.second[index] is not _UNSET:
+            message = message % (self.first[index], self.second[index])
+        elif self.first[index] is not _UNSET:
+            message = message % (self.first[index],)
+        return "%d %s %s" % (self.stamps[index], LEVEL_NAMES.get(self.levels[index], "?"), message)
+
+    def recent(self, count: int=None) -> list:
+        """
+        Args:
+            count (int): How many messages to return. Default = all the messages in the ring
+        Returns:
+            The last count messages, formatted, oldest first.
+        """
+        if count is None or count > self.count:
+            count = self.count
+        return [self.format((self.next - count + i) % self.size) for i in range(count)]
+
+    def flush(self, path: str=None, limit: int=None) -> int:
+        """
+        Args:
+            path (str): Append the messages to this file instead of printing them, i.e. '/sd/diagnostics.log'
+            limit (int): Flush at most this many messages. Default = all pending messages
+        Returns:
+            The number of messages flushed.
+        """
+        count = self.pending if limit is None else min(limit, self.pending)
+        if count <= 0:
+            return 0
+        start = self.next - self.pending
+        if path is None:
+            for i in range(count):
+                print(self.format((start + i) % self.size))
+        else:
+            with open(path, 'a') as log_file:
+                for i in range(count):
+                    log_file.write(self.format((start + i) % self.size) + "\n")
+        self.pending -= count
+        if self.lost:
+            lost, self.lost = self.lost, 0
+            self.add(WARNING, "%d log messages were overwritten before they were flushed", lost)
+        return count
+
+    def service(self, slack_ms: int) -> bool:
+        """
+        Args:
+            slack_ms (int): The time in milliseconds until the next relay edge.
+        Returns:
+            True if messages were printed.
+        Notes:
+            An idle hook: prints as many pending messages as fit in the slack.
+        """
+        if self.pending == 0:
+            return False
+        limit = (slack_ms - GUARD_MS) // LINE_COST_MS
+        if limit <= 0:
+            return False
+        return self.flush(limit=limit) > 0
+
+
+ring = LogRing()
+add = ring.add
+flush = ring.flush
+service = ring.service
+recent = ring.recent
+
+
+def _nop(message: str, first=None, second=None, third=None):
+    pass
+
+
+def _emitter(level: int):
+    def emit(message: str, first=_UNSET, second=_UNSET, third=_UNSET):
+        add(level, message, first, second, third)
+    return emit
+
+
+debug = _emitter(DEBUG) if LOG_LEVEL <= DEBUG else _nop
+info = _emitter(INFO) if LOG_LEVEL <= INFO else _nop
+warning = _emitter(WARNING) if LOG_LEVEL <= WARNING else _nop
+error = _emitter(ERROR) if LOG_LEVEL <= ERROR else _nop
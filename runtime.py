@@ -0,0 +1,154 @@
+"""
+A test run as cooperative uasyncio tasks.
+
+The relay timing task owns the EdgeScheduler.  Between two edges it sleeps through the event loop, so the
+render, input and background tasks get the time, but it stops yielding WAKE_MS before every edge and waits for
+the deadline itself, so an edge never waits for a task that is not finished.  The other tasks only start work
+that fits in the time left before the next edge: they hand scheduler.remaining() to the same slack-aware
+services the other engines call from their idle hook (RenderDispatcher, GcScheduler, the log ring, the
+checkpoint).  That is what gives the timing task its priority, uasyncio itself has none.
+
+The input task reads the buttons while the test runs: holding SEL aborts it, the relay is switched off and
+begin_test() raises TestAborted.
+"""
+
+import utime
+from micropython import const
+
+import aio
+from buttons import NO_EVENT, BUTTON_C, EVENT_REPEAT
+from scheduler import EdgeScheduler
+
+WAKE_MS = const(4)          # the timing task stops yielding this long before an edge
+RENDER_POLL_MS = const(10)
+INPUT_POLL_MS = const(20)
+SERVICE_POLL_MS = const(25)
+ABORT_POLL_MS = const(100)  # the longest sleep of the timing task, so an abort is seen during long phases
+
+STEP_CALL = const(0)
+STEP_ON = const(1)
+STEP_OFF = const(2)
+
+ABORT_EVENT = BUTTON_C | EVENT_REPEAT  # SEL held for the repeat delay, a short press does not abort
+
+
+class TestAborted(Exception):
+    pass
+
+
+class TestRuntime:
+    """
+    Args:
+        test (Test): The test to run, from its first_cycle.
+        render (RenderDispatcher): The display updates of the test.
+        background: The idle hook of everything else, i.e. an IdleChain of the gc, log and checkpoint services.
+        buttons (ButtonInput): Read for the abort request. Default = None, the test can not be aborted
+    Notes:
+        run() returns the EdgeScheduler once the last cycle is done or the test was aborted, see aborted.
+    """
+    def __init__(self, test, render, background, buttons=None):
+        self.test = test
+        self.render = render
+        self.background = background
+        self.buttons = buttons
+        self.scheduler = EdgeScheduler()
+        self.done = False
+        self.aborted = False
+        self.helpers = 0  # helper tasks still running
+        self.cycle_num = test.first_cycle - 1
+
+    def run(self) -> EdgeScheduler:
+        aio.run(self.main())
+        return self.scheduler
+
+    async def main(self):
+        self.scheduler.reset()
+        self.helpers = 3 if self.buttons is not None else 2
+        aio.create_task(self.render_task())
+        aio.create_task(self.service_task())
+        if self.buttons is not None:
+            aio.create_task(self.input_task())
+        await self.relay_task()
+        self.done = True
+        while self.helpers > 0:  # let them see done and end, the old uasyncio would keep them in its queue
+            await aio.sleep_ms(INPUT_POLL_MS)
+
+    async def until_edge(self):
+        """
+        Notes:
+            Waits for the next deadline of the scheduler, handing all but the last WAKE_MS to the other tasks.
+        """
+        while True:
+            remaining = self.scheduler.remaining()
+            if remaining <= 0:
+                return
+            if remaining > WAKE_MS:
+                await aio.sleep_ms(remaining - WAKE_MS)
+            else:
+                utime.sleep_ms(remaining)
+
+    async def relay_task(self):
+        """
+        Notes:
+            The waits of until_edge() are written out here, as a coroutine created for every edge would
+            allocate.  step is the next thing due at the deadline: the periodic function, the ON or the OFF edge.
+        """
+        test = self.test
+        scheduler = self.scheduler
+        drive_on = test.drive.on  # bound once, as in Test._run_loop()
+        drive_off = test.drive.off
+        cycle_num = test.first_cycle
+        step = STEP_CALL if self._calls_before(cycle_num) else STEP_ON
+        while cycle_num <= test.cycles:
+            if self.aborted:
+                drive_off()
+                return
+            remaining = scheduler.remaining()
+            if remaining > WAKE_MS:
+                await aio.sleep_ms(min(remaining - WAKE_MS, ABORT_POLL_MS))
+                continue
+            if remaining > 0:
+                utime.sleep_ms(remaining)
+            if step == STEP_CALL:
+                test.periodic(test.func_param)
+                scheduler.resync()
+                step = STEP_ON
+            elif step == STEP_ON:
+                scheduler.mark(drive_on, test.on_time)
+                step = STEP_OFF
+            else:
+                scheduler.mark(drive_off, test.off_time)
+                test._cycle_done(cycle_num)
+                self.cycle_num = cycle_num
+                cycle_num += 1
+                step = STEP_CALL if self._calls_before(cycle_num) else STEP_ON
+        await self.until_edge()
+        scheduler.finish()
+
+    def _calls_before(self, cycle_num: int) -> bool:
+        return self.test.func_call_freq > 0 and cycle_num % self.test.func_call_freq == 0
+
+    async def render_task(self):
+        while not self.done:
+            if not self.render.service(self.scheduler.remaining()):
+                await aio.sleep_ms(RENDER_POLL_MS)
+            else:
+                await aio.sleep_ms(0)
+        self.helpers -= 1
+
+    async def service_task(self):
+        while not self.done:
+            if not self.background(self.scheduler.remaining()):
+                await aio.sleep_ms(SERVICE_POLL_MS)
+            else:
+                await aio.sleep_ms(0)
+        self.helpers -= 1
+
+    async def input_task(self):
+        while not self.done:
+            event = self.buttons.get()
+            if event == ABORT_EVENT:
+                self.aborted = True
+            elif event == NO_EVENT:
+                await aio.sleep_ms(INPUT_POLL_MS)
+        self.helpers -= 1
@@ -0,0 +1,304 @@
+"""
+Absolute-deadline scheduling of relay edges.
+
+Every edge is placed at a deadline computed with ticks_add() from the previous deadline, never from
+"now".  Time spent between edges (display updates, periodic functions, gc) is absorbed by the next wait
+instead of being added to the period, so the drift of a whole run stays at the lateness of a single edge.
+"""
+
+import utime
+
+try:
+    import heapq
+except ImportError:
+    import uheapq as heapq
+
+
+class EdgeScheduler:
+    """
+    Args:
+        start_ms (int): The ticks_ms() value of the first edge. Default = now
+    Notes:
+        Use edge() for every relay transition and finish() after the last one.  The drift figures are
+        reset by reset() and are valid for a single run.
+    """
+    def __init__(self, start_ms: int=None):
+        self.reset(start_ms)
+
+    def reset(self, start_ms: int=None):
+        """
+        Args:
+            start_ms (int): The ticks_ms() value of the first edge. Default = now
+        Returns:
+            Nothing
+        """
+        if start_ms is None:
+            start_ms = utime.ticks_ms()
+        self.start = start_ms
+        self.deadline = start_ms
+        self.nominal_ms = 0     # scheduled time since start, excluding pauses
+        self.paused_ms = 0      # time handed to resync(), i.e. intentional pauses such as a dwell
+        self.slipped_ms = 0     # time lost when an edge was so late that the following phase was skipped
+        self.edges = 0
+        self.late_edges = 0
+        self.max_late_ms = 0
+        self.drift_ms = 0
+        self.end_us = None      # ticks_us() at the end of the last phase, set by finish()
+
+    def remaining(self) -> int:
+        """
+        Returns:
+            The number of milliseconds until the next deadline, negative if it has already passed.
+        """
+        return utime.ticks_diff(self.deadline, utime.ticks_ms())
+
+    def wait(self, idle=None) -> None:
+        """
+        Args:
+            idle: Optional callable, idle(remaining_ms) -> bool, called while waiting for the deadline.
+                  It must return True if it did some work (the remaining time is re-checked) or False
+                  to let the scheduler sleep until the deadline.
+        Returns:
+            Nothing
+        """
+        while True:
+            remaining = utime.ticks_diff(self.deadline, utime.ticks_ms())
+            if remaining <= 0:
+                return
+            if idle is None or not idle(remaining):
+                utime.sleep_ms(remaining)
+
+    def edge(self, action, hold_ms: int, idle=None) -> int:
+        """
+        Args:
+            action: Callable performing the transition, i.e. relay.on
+            hold_ms (int): The time in milliseconds until the following edge.
+            idle: See wait()
+        Returns:
+            The lateness of this edge in milliseconds.
+        Notes:
+            If an edge is late by more than the hold time that follows it, the following phase would
+            collapse to nothing.  Instead, the schedule slips so the phase keeps its full length and the
+            lost time is recorded in slipped_ms.
+        """
+        self.wait(idle)
+        return self.mark(action, hold_ms)
+
+    def mark(self, action, hold_ms: int) -> int:
+        """
+        Args:
+            action: Callable performing the transition, i.e. relay.on
+            hold_ms (int): The time in milliseconds until the following edge.
+        Returns:
+            The lateness of this edge in milliseconds.
+        Notes:
+            Like edge(), but without waiting.  For callers that are woken up at the deadline by something
+            else, such as a machine.Timer callback.
+        """
+        action()
+        now = utime.ticks_ms()
+        late = utime.ticks_diff(now, self.deadline)
+        self.edges += 1
+        if late > 0:
+            self.late_edges += 1
+            if late > self.max_late_ms:
+                self.max_late_ms = late
+        self.deadline = utime.ticks_add(self.deadline, hold_ms)
+        self.nominal_ms += hold_ms
+        overrun = utime.ticks_diff(now, self.deadline)
+        if overrun >= 0:
+            self.slipped_ms += overrun + hold_ms
+            self.deadline = utime.ticks_add(now, hold_ms)
+        return late
+
+    def resync(self) -> None:
+        """
+        Returns:
+            Nothing
+        Notes:
+            Call after intentionally spending time outside the schedule (i.e. a periodic dwell).  If the
+            deadline has passed, it is moved to now and the gap is counted as a pause, not as drift.
+        """
+        late = utime.ticks_diff(utime.ticks_ms(), self.deadline)
+        if late > 0:
+            self.paused_ms += late
+            self.deadline = utime.ticks_add(self.deadline, late)
+
+    def finish(self, idle=None) -> int:
+        """
+        Args:
+            idle: See wait()
+        Returns:
+            The drift of the run in milliseconds.
+        Notes:
+            Waits for the end of the last phase, then compares the elapsed time with the nominal time.  The
+            end is kept in end_us, for a TimingCapture closed later on.
+        """
+        self.wait(idle)
+        self.end_us = utime.ticks_us()
+        elapsed = utime.ticks_diff(utime.ticks_ms(), self.start)
+        self.drift_ms = elapsed - self.nominal_ms - self.paused_ms
+        return self.drift_ms
+
+    def report(self) -> str:
+        """
+        Returns:
+            A one line summary of the timing accuracy of the run.
+        """
+        return "Drift %dms  max late %dms" % (self.drift_ms, self.max_late_ms)
+
+
+class IdleChain:
+    """
+    Args:
+        hooks (list): Idle hooks, idle(remaining_ms) -> bool, in order of priority.
+    Notes:
+        Combines several idle hooks into one for EdgeScheduler.wait().  Each call runs the first hook that has
+        something to do, so the remaining time is re-checked between two jobs.
+    """
+    def __init__(self, hooks: list):
+        self.hooks = hooks
+
+    def __call__(self, remaining_ms: int) -> bool:
+        for hook in self.hooks:
+            if hook(remaining_ms):
+                return True
+        return False
+
+
+class Channel:
+    """
+    Args:
+        relay (Relay): The relay of this fixture.
+        on_time_ms (int): The ON time of every cycle in milliseconds.
+        off_time_ms (int): The OFF time of every cycle in milliseconds.
+        cycles (int): The number of cycles to run.
+        name (str): Shown on the status pane. Default = ""
+    Notes:
+        One fixture driven by a ChannelScheduler.  due is the time of the next edge in milliseconds since the
+        start of the run, so it never wraps around like ticks_ms() does.
+    """
+    def __init__(self, relay, on_time_ms: int, off_time_ms: int, cycles: int, name: str=""):
+        self.relay = relay
+        self.on_time_ms = on_time_ms
+        self.off_time_ms = off_time_ms
+        self.cycles = cycles
+        self.name = name
+        self.reset()
+
+    @classmethod
+    def from_test(cls, test, name: str=""):
+        """
+        Args:
+            test (Test): A test whose relay, on/off times and cycle count are used.
+            name (str): Shown on the status pane. Default = ""
+        Returns:
+            A new Channel
+        Notes:
+            A channel has no periodic function, so a test with a func_call_freq raises ValueError rather than
+            run without it.
+        """
+        if test.func_call_freq > 0:
+            raise ValueError("channel %s: a channel can not call a periodic function" % name)
+        return cls(test.relay, test.on_time, test.off_time, test.cycles, name)
+
+    def reset(self):
+        self.count = 0
+        self.due = 0
+        self.relay_on = False
+        self.done = self.cycles <= 0
+        self.max_late_ms = 0
+        self.slipped_ms = 0
+        self.drift_ms = 0
+
+
+class ChannelScheduler:
+    """
+    Args:
+        channels (list): The Channel instances to run together.
+    Notes:
+        Runs independent waveforms from one loop.  The next edge of every channel sits in a min-heap keyed on
+        its deadline, so each pass only looks at the channel that is due first, however many there are.
+    """
+    def __init__(self, channels: list):
+        self.channels = channels
+        self.heap = []
+        self.elapsed_ms = 0
+        self.last_tick = 0
+
+    def now(self) -> int:
+        """
+        Returns:
+            The number of milliseconds since the start of run()
+        """
+        tick = utime.ticks_ms()
+        self.elapsed_ms += utime.ticks_diff(tick, self.last_tick)
+        self.last_tick = tick
+        return self.elapsed_ms
+
+    def run(self, idle=None, on_cycle=None):
+        """
+        Args:
+            idle: Optional callable, idle(remaining_ms) -> bool, see EdgeScheduler.wait()
+            on_cycle: Optional callable, on_cycle(channel), called each time a channel completes a cycle.
+        Returns:
+            Nothing
+        Notes:
+            Returns once every channel has completed all of its cycles.
+        """
+        self.elapsed_ms = 0
+        self.last_tick = utime.ticks_ms()
+        self.heap = []
+        index = 0
+        while index < len(self.channels):
+            channel = self.channels[index]
+            channel.reset()
+            if not channel.done:
+                heapq.heappush(self.heap, (0, index))
+            index += 1
+
+        while self.heap:
+            due, index = self.heap[0]
+            remaining = due - self.now()
+            if remaining > 0:
+                if idle is None or not idle(remaining):
+                    utime.sleep_ms(remaining)
+                continue
+            heapq.heappop(self.heap)
+            channel = self.channels[index]
+            if self._edge(channel, -remaining) and on_cycle is not None:
+                on_cycle(channel)
+            if not channel.done:
+                heapq.heappush(self.heap, (channel.due, index))
+
+    def _edge(self, channel: Channel, late: int) -> bool:
+        """
+        Returns:
+            True if this edge completed a cycle.
+        """
+        if late > channel.max_late_ms:
+            channel.max_late_ms = late
+
+        if channel.relay_on:
+            channel.relay.off()
+            channel.relay_on = False
+            hold_ms = channel.off_time_ms
+        elif channel.count < channel.cycles:
+            channel.relay.on()
+            channel.relay_on = True
+            hold_ms = channel.on_time_ms
+        else:
+            channel.done = True  # the OFF phase of the last cycle is over
+            channel.drift_ms = late + channel.slipped_ms
+            return False
+
+        channel.due += hold_ms
+        overrun = self.elapsed_ms - channel.due
+        if overrun >= 0:
+            channel.slipped_ms += overrun + hold_ms
+            channel.due = self.elapsed_ms + hold_ms
+
+        if channel.relay_on:
+            return False
+        channel.count += 1
+        return True
@@ -0,0 +1,292 @@
+"""
+Compilation of tests into flat segment tables.
+
+A test, or a sequence of rounds, is turned into an array('I') of 32 bit words before it starts.  Each word holds
+an opcode in the top 4 bits and an operand in the lower 28: a relay level with its duration, a repeat marker, a
+call to a periodic function or a relay selection.  The executor only walks the table, so the cost of every edge
+is the same whatever the test looks like, the table takes a few dozen bytes and the total runtime is known
+before the first edge.
+"""
+
+import utime
+from array import array
+
+OP_OFF = 0          # relay off, operand = duration in ms
+OP_ON = 1           # relay on, operand = duration in ms
+OP_OFF_CYCLE = 2    # relay off, completes a test cycle, operand = duration in ms
+OP_REPEAT = 3       # operand = repeat count, the next word holds the number of words in the body
+OP_CALL = 4         # operand = index in SegmentTable.funcs
+OP_RELAY = 5        # operand = index in SegmentTable.relays, used by the level segments that follow
+OP_ROUND = 6        # operand = index of the round that starts here
+
+OPCODE_SHIFT = 28
+OPERAND_MASK = (1 << OPCODE_SHIFT) - 1
+MAX_DEPTH = 4       # nesting of repeat markers supported by execute()
+
+
+def word(opcode: int, operand: int=0) -> int:
+    if operand < 0 or operand > OPERAND_MASK:
+        raise ValueError("operand out of range: %d" % operand)
+    return (opcode << OPCODE_SHIFT) | operand
+
+
+class Dwell:
+    """
+    Args:
+        relay (Relay): The relay to hold.
+        ms (int): The dwell time in milliseconds. Can be overridden by the func_param of the test.
+        on (bool): Hold the relay on (True) or off (False). Default = True
+    Notes:
+        A periodic function that holds the relay for a while, like the dwell() example in TEST_32109.py.
+        It works as a periodic_function of a Test run live, and compile_test() turns it into plain level
+        segments so its time is part of the exact total runtime.
+    """
+    def __init__(self, relay, ms: int=0, on: bool=True):
+        self.relay = relay
+        self.ms = ms
+        self.on = on
+
+    def duration(self, param=None) -> int:
+        if param is None:
+            return self.ms
+        return int(param)
+
+    def __call__(self, param=None):
+        if self.on:
+            self.relay.on()
+        else:
+            self.relay.off()
+        utime.sleep_ms(self.duration(param))
+        self.relay.off()
+
+
+class SegmentTable:
+    """
+    Notes:
+        words is the compiled array('I').  funcs holds (function, parameter) pairs for OP_CALL and relays the
+        relays for OP_RELAY.  exact is False if the table calls functions whose duration is unknown, in which
+        case duration_ms() is a lower bound.
+    """
+    def __init__(self):
+        self.words = array('I')
+        self.funcs = []
+        self.relays = []
+        self.exact = True
+        self.rounds = 0
+
+    def __len__(self):
+        return len(self.words)
+
+    def emit(self, opcode: int, operand: int=0):
+        self.words.append(word(opcode, operand))
+
+    def relay_index(self, relay) -> int:
+        for index in range(len(self.relays)):
+            if self.relays[index] is relay:
+                return index
+        self.relays.append(relay)
+        return len(self.relays) - 1
+
+    def repeat(self, count: int, body: array):
+        """
+        Args:
+            count (int): How many times to run body.
+            body (array): Words to repeat.
+        Returns:
+            Nothing
+        """
+        self.words.extend(repeated(count, body))
+
+    def duration_ms(self) -> int:
+        """
+        Returns:
+            The total runtime of the table in milliseconds.
+        """
+        return _span_ms(self.words, 0, len(self.words))
+
+    def cycles(self) -> int:
+        """
+        Returns:
+            The total number of test cycles in the table.
+        """
+        return _span_cycles(self.words, 0, len(self.words))
+
+
+def repeated(count: int, body: array) -> array:
+    """
+    Args:
+        count (int): How many times to run body.
+        body (array): Words to repeat.
+    Returns:
+        The words running body count times.  Bodies that run once are inlined, empty ones are dropped.
+    """
+    if count <= 0 or len(body) == 0:
+        return array('I')
+    if count == 1:
+        return array('I', body)
+    return array('I', (word(OP_REPEAT, count), len(body))) + body
+
+
+def _span_ms(words: array, start: int, end: int) -> int:
+    total = 0
+    pc = start
+    while pc < end:
+        opcode = words[pc] >> OPCODE_SHIFT
+        operand = words[pc] & OPERAND_MASK
+        if opcode == OP_REPEAT:
+            length = words[pc + 1]
+            total += operand * _span_ms(words, pc + 2, pc + 2 + length)
+            pc += 2 + length
+            continue
+        if opcode <= OP_OFF_CYCLE:
+            total += operand
+        pc += 1
+    return total
+
+
+def _span_cycles(words: array, start: int, end: int) -> int:
+    total = 0
+    pc = start
+    while pc < end:
+        opcode = words[pc] >> OPCODE_SHIFT
+        operand = words[pc] & OPERAND_MASK
+        if opcode == OP_REPEAT:
+            length = words[pc + 1]
+            total += operand * _span_cycles(words, pc + 2, pc + 2 + length)
+            pc += 2 + length
+            continue
+        if opcode == OP_OFF_CYCLE:
+            total += 1
+        pc += 1
+    return total
+
+
+def _cycle_words(on_time_ms: int, off_time_ms: int) -> array:
+    return array('I', (word(OP_ON, on_time_ms), word(OP_OFF_CYCLE, off_time_ms)))
+
+
+def _call_words(table: SegmentTable, test, relay, func) -> array:
+    if isinstance(func, Dwell):
+        level = OP_ON if func.on else OP_OFF
+        words = array('I', (word(level, func.duration(test.func_param)), word(OP_OFF, 0)))
+        if func.relay is not test.relay:
+            words = array('I', (word(OP_RELAY, table.relay_index(func.relay)),)) + words + \
+                    array('I', (word(OP_RELAY, table.relay_index(relay)),))
+        return words
+    table.funcs.append((func, test.func_param))
+    table.exact = False
+    return array('I', (word(OP_CALL, len(table.funcs) - 1),))
+
+
+def compile_test(test, table: SegmentTable=None, relay=None, periodic=None, first_cycle: int=1) -> SegmentTable:
+    """
+    Args:
+        test (Test): The test to compile.
+        table (SegmentTable): Append to this table instead of starting a new one. Default = None
+        relay: Drive this instead of test.relay, i.e. a TimedRelay. Default = None
+        periodic: Call this instead of test.periodic_function. Default = None
+        first_cycle (int): The first cycle to run, for a test resumed part way through. Default = 1
+    Returns:
+        The SegmentTable
+    Notes:
+        Follows Test.begin_test(): the periodic function runs before every cycle whose number is a multiple of
+        func_call_freq.  The cycles up to the first call are emitted on their own, then every F cycles become
+        one repeat of [call, F cycles], and the cycles left over follow their own call.
+    """
+    if table is None:
+        table = SegmentTable()
+    table.emit(OP_ROUND, table.rounds)
+    table.rounds += 1
+    if relay is None:
+        relay = test.relay
+    if periodic is None:
+        periodic = test.periodic_function
+    table.emit(OP_RELAY, table.relay_index(relay))
+
+    cycle_words = _cycle_words(test.on_time, test.off_time)
+    cycles = test.cycles - first_cycle + 1
+    freq = test.func_call_freq
+    if freq <= 0:
+        table.repeat(cycles, cycle_words)
+        return table
+
+    lead = min((freq - first_cycle % freq) % freq, max(cycles, 0))  # cycles before the first call
+    table.repeat(lead, cycle_words)
+    cycles -= lead
+    call_words = _call_words(table, test, relay, periodic)
+    table.repeat(cycles // freq, call_words + repeated(freq, cycle_words))
+    if cycles % freq:
+        table.words.extend(call_words)
+        table.repeat(cycles % freq, cycle_words)
+    return table
+
+
+def execute(table: SegmentTable, scheduler, idle=None, on_cycle=None, on_round=None, first_cycle: int=1) -> int:
+    """
+    Args:
+        table (SegmentTable): The compiled test.
+        scheduler (EdgeScheduler): Places every level segment on its absolute deadline.
+        idle: Optional idle hook handed to the scheduler, i.e. RenderDispatcher.service
+        on_cycle: Optional callable, on_cycle(cycle_num), called after every OFF edge that completes a cycle.
+                  The run stops there if it returns True.
+        on_round: Optional callable, on_round(round_index), called when a new round starts.
+        first_cycle (int): The number given to the first cycle, for a table compiled from a later cycle.
+                           Default = 1
+    Returns:
+        The number of cycles run.
+    Notes:
+        Waits for the end of the last segment before returning.  The repeat stack is preallocated, so walking
+        the table does not allocate.
+    """
+    words = table.words
+    stack = array('I', bytes(4 * 3 * MAX_DEPTH))  # (body start, body end, runs left) per level
+    depth = 0
+    relay_on = relay_off = None
+    cycle_num = first_cycle - 1
+    pc = 0
+    end = len(words)
+    while True:
+        if depth > 0 and pc >= stack[3 * depth - 2]:
+            stack[3 * depth - 1] -= 1
+            if stack[3 * depth - 1] > 0:
+                pc = stack[3 * depth - 3]
+            else:
+                depth -= 1
+            continue
+        if pc >= end:
+            break
+
+        opcode = words[pc] >> OPCODE_SHIFT
+        operand = words[pc] & OPERAND_MASK
+        pc += 1
+        if opcode == OP_ON:
+            scheduler.edge(relay_on, operand, idle)
+        elif opcode == OP_OFF:
+            scheduler.edge(relay_off, operand, idle)
+        elif opcode == OP_OFF_CYCLE:
+            scheduler.edge(relay_off, operand, idle)
+            cycle_num += 1
+            if on_cycle is not None and on_cycle(cycle_num):
+                break
+        elif opcode == OP_REPEAT:
+            if depth >= MAX_DEPTH:
+                raise ValueError("repeat markers nested too deep")
+            stack[3 * depth] = pc + 1
+            stack[3 * depth + 1] = pc + 1 + words[pc]
+            stack[3 * depth + 2] = operand
+            depth += 1
+            pc += 1
+        elif opcode == OP_CALL:
+            func, param = table.funcs[operand]
+            scheduler.wait(idle)
+            func(param)
+            scheduler.resync()
+        elif opcode == OP_RELAY:
+            relay = table.relays[operand]
+            relay_on = relay.on
+            relay_off = relay.off
+        elif opcode == OP_ROUND:
+            if on_round is not None:
+                on_round(operand)
+    scheduler.finish(idle)
+    return cycle_num - first_cycle + 1
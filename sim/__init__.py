@@ -0,0 +1,193 @@
+"""
+Host-side simulator for the cycle tester.
+
+Provides CPython stand-ins for the modules of the LoBo MicroPython firmware (machine, utime, display, uos,
+micropython and lib.m5stack), all running on one virtual clock, as does the asyncio event loop.  Sleeping
+advances the clock instantly, output pins record every edge with its timestamp and the display only counts the
+calls made to it, so a test profile that takes an hour on the bench runs in well under a second.
+
+Usage:
+    python -m sim tests/PCBA-32109Rev6.py
+"""
+
+import asyncio
+import gc
+import importlib.util
+import tracemalloc
+import os
+import runpy
+import sys
+import time
+
+from sim.clock import clock
+from sim import fs
+from sim.vloop import VirtualEventLoopPolicy
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STUBS = os.path.join(ROOT, 'sim', 'stubs')
+RELAY_PIN = 2  # pin used for profiles that only hold settings, as in TEST_32109.py
+HEAP_SIZE = 4 * 1024 * 1024  # heap reported by gc.mem_free(), as on an ESP32 with PSRAM
+
+_installed = False
+
+
+def install(sd: str=None, flash: str=None):
+    """
+    Args:
+        sd (str): The host directory backing /sd. Default = the tests directory of the repository
+        flash (str): The host directory backing /flash. Default = a temporary directory, the same for the whole
+                     process
+    Returns:
+        Nothing
+    Notes:
+        Makes the stand-in modules importable ahead of anything else on sys.path, and gives the device modules
+        imported from then on the /sd and /flash mapping of fs.device_open().  Safe to call repeatedly.
+    """
+    global _installed
+    if not hasattr(gc, 'mem_free'):
+        gc.mem_free = _mem_free
+        gc.mem_alloc = _mem_alloc
+    if not _installed:
+        for path in (ROOT, STUBS):
+            if path in sys.path:
+                sys.path.remove(path)
+            sys.path.insert(0, path)
+        if fs.DeviceFinder not in sys.meta_path:
+            sys.meta_path.insert(0, fs.DeviceFinder)
+        asyncio.set_event_loop_policy(VirtualEventLoopPolicy())
+        _install_thread()
+        _installed = True
+    fs.mount(sd if sd is not None else os.path.join(ROOT, 'tests'), flash)
+
+
+def _install_thread():
+    """
+    Returns:
+        Nothing
+    Notes:
+        _thread is built into CPython and wins over the stand-in on sys.path, so it is put in sys.modules.
+        threading, imported by the clock before, keeps the real functions it took from _thread.
+    """
+    spec = importlib.util.spec_from_file_location('_thread', os.path.join(STUBS, '_thread.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    sys.modules['_thread'] = module
+
+
+def _mem_alloc() -> int:
+    """
+    Returns:
+        The memory traced by tracemalloc, 0 unless tracemalloc.start() was called.
+    """
+    if tracemalloc.is_tracing():
+        return tracemalloc.get_traced_memory()[0]
+    return 0
+
+
+def _mem_free() -> int:
+    return HEAP_SIZE - _mem_alloc()
+
+
+def load_cycle_test():
+    """
+    Returns:
+        The cycleTest module, imported without running its menu loop.
+    Notes:
+        cycleTest runs the menu when imported under its own name, so it is loaded under another name and
+        registered as cycleTest for the "from cycleTest import *" of the test profiles.
+    """
+    module = sys.modules.get('cycleTest')
+    if module is not None:
+        return module
+    spec = importlib.util.spec_from_file_location('_cycleTest', os.path.join(ROOT, 'cycleTest.py'))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules['cycleTest'] = module
+    module.open = fs.device_open
+    spec.loader.exec_module(module)
+    return module
+
+
+class Result:
+    """
+    Notes:
+        The outcome of run_profile(): what the relay did on the virtual clock and what it cost on the host.
+    """
+    def __init__(self, path: str, pin, wall_ms: float, tft):
+        self.path = path
+        self.pin = pin
+        self.wall_ms = wall_ms
+        self.virtual_ms = clock.now_us // 1000
+        self.phases = clock.phases(pin)
+        self.on_ms = [us // 1000 for value, us in self.phases if value == 1]
+        self.off_ms = [us // 1000 for value, us in self.phases if value == 0]
+        self.cycles = sum(1 for t, p, v in clock.edges if p == pin and v == 1)
+        self.draw_calls = tft.draw_calls()
+        self.calls = dict(tft.calls)
+
+    def __str__(self):
+        lines = ["profile:     %s" % self.path,
+                 "cycles:      %d (rising edges on pin %s)" % (self.cycles, self.pin),
+                 "virtual:     %d ms" % self.virtual_ms]
+        if self.on_ms:
+            lines.append("on:          %d..%d ms" % (min(self.on_ms), max(self.on_ms)))
+        if self.off_ms:
+            lines.append("off:         %d..%d ms" % (min(self.off_ms), max(self.off_ms)))
+        lines.append("draw calls:  %d" % self.draw_calls)
+        lines.append("wall time:   %.1f ms" % self.wall_ms)
+        return "\n".join(lines)
+
+
+def run_profile(path: str, draw_cost_us: int=0, pin=RELAY_PIN, telemetry=None) -> Result:
+    """
+    Args:
+        path (str): A test profile: a TEST_*.py script, a declarative .cyc profile or a settings only module
+                    such as tests/PCBA-31334.py
+        draw_cost_us (int): Virtual time in microseconds charged for every display call that draws.
+        pin: The relay pin to report on. Default = RELAY_PIN
+        telemetry: A binary file the telemetry frames are written to, see telemetry.py. Default = None, no frames
+    Returns:
+        A Result
+    Notes:
+        Settings only modules (NUMBER_OF_CYCLES, PULSE_WIDTH_ms, ...) are turned into a Test on RELAY_PIN and run.
+    """
+    install()
+    from micropython import const
+    clock.reset()
+    cycle_test = load_cycle_test()
+    cycle_test.tft.calls.clear()
+    cycle_test.tft.draw_cost_us = draw_cost_us
+    cycle_test.test_UI = cycle_test.TestUI()
+    if telemetry is None:
+        cycle_test.telemetry = None
+    elif cycle_test.telemetry is None or cycle_test.telemetry.port is not telemetry:
+        import telemetry as frames
+        cycle_test.telemetry = frames.TelemetryStream(telemetry)  # one sequence for all the profiles of a recording
+
+    start = time.perf_counter()
+    if path.endswith('.cyc'):
+        cycle_test.run_profile(path)
+    else:
+        # the MicroPython compiler resolves const() without an import, the settings only profiles rely on that
+        settings = runpy.run_path(path, init_globals={'const': const, 'open': fs.device_open},
+                                  run_name='__sim_profile__')
+        if 'NUMBER_OF_CYCLES' in settings and not clock.edges:
+            _run_settings(cycle_test, settings)
+    wall_ms = (time.perf_counter() - start) * 1000
+    gc.collect()
+    return Result(path, pin, wall_ms, cycle_test.tft)
+
+
+def _run_settings(cycle_test, settings: dict):
+    relay = cycle_test.Relay(RELAY_PIN, settings.get('INVERTED', 0))
+    test = cycle_test.Test(relay=relay,
+                           cycles=settings['NUMBER_OF_CYCLES'],
+                           on_time=settings.get('ON_TIME_ms', 0),
+                           off_time=settings.get('OFF_TIME_ms', 0),
+                           pulse_width_ms=settings.get('PULSE_WIDTH_ms', 0),
+                           duty_cycle=settings.get('DUTY_CYCLE', 0))
+    header = cycle_test.test_UI.header
+    header.lines[0:1] = [settings.get('TEST_NAME_1', '')]
+    header.lines[1:2] = [settings.get('TEST_NAME_2', '')]
+    header.update_all_lines()
+    cycle_test.update_parameters_pane(*test)
+    test.begin_test()
@@ -0,0 +1,33 @@
+"""
+Runs test profiles on the simulator and prints what the relay did.
+
+Usage:
+    python -m sim [--draw-cost-us N] [--telemetry FILE] PROFILE [PROFILE ...]
+"""
+
+import argparse
+
+import sim
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m sim', description=__doc__.strip().splitlines()[0])
+    parser.add_argument('profiles', nargs='+', help='TEST_*.py script or settings only profile')
+    parser.add_argument('--draw-cost-us', type=int, default=0,
+                        help='virtual time charged for every display call that draws')
+    parser.add_argument('--telemetry', metavar='FILE',
+                        help='record the telemetry stream to FILE, for tools/telemetry_monitor.py')
+    args = parser.parse_args(argv)
+
+    telemetry = open(args.telemetry, 'wb') if args.telemetry else None
+    try:
+        for path in args.profiles:
+            print(sim.run_profile(path, draw_cost_us=args.draw_cost_us, telemetry=telemetry))
+            print()
+    finally:
+        if telemetry is not None:
+            telemetry.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""
+Virtual monotonic clock shared by the stand-in modules.
+
+Time only moves when something sleeps or explicitly spends time, so a test that takes an hour on the bench
+runs as fast as the host can execute its Python code.  Every pin transition is recorded with its timestamp.
+
+With threads started through the _thread stand-in, time only moves once every thread sleeps, and then only to
+the earliest time one of them waits for, as if each thread had a core of its own.
+"""
+
+import threading
+
+TICKS_PERIOD = 1 << 30  # same wrap-around as the MicroPython ticks_* functions
+TICKS_MAX = TICKS_PERIOD - 1
+TICKS_HALFPERIOD = TICKS_PERIOD // 2
+
+
+class VirtualClock:
+    """
+    Notes:
+        now_us is the time in microseconds since reset().  edges holds (time_us, pin_id, value) tuples for
+        every change of an output pin, in the order they happened.
+    """
+    def __init__(self):
+        self.threads = 1  # threads that take part in sleep(), see the _thread stand-in
+        self.condition = threading.Condition()
+        self.sleeping = {}  # thread ident -> time in microseconds it sleeps until
+        self.reset()
+
+    def reset(self):
+        """
+        Returns:
+            Nothing
+        Notes:
+            Sets the time back to 0 and forgets all recorded edges and pending alarms.
+        """
+        self.now_us = 0
+        self.edges = []
+        self.alarms = []  # [due_us, callback] pairs, see call_at()
+
+    def advance(self, us: int):
+        """
+        Args:
+            us (int): The number of microseconds to move forward. Negative values are ignored.
+        Returns:
+            Nothing
+        Notes:
+            Alarms that fall due on the way are fired in order, with the clock set to their due time.
+        """
+        if us <= 0:
+            return
+        target = self.now_us + us
+        while self.alarms:
+            self.alarms.sort(key=lambda alarm: alarm[0])
+            due, callback = self.alarms[0]
+            if due > target:
+                break
+            self.alarms.pop(0)
+            self.now_us = max(self.now_us, due)
+            callback()
+        self.now_us = max(self.now_us, target)
+
+    def sleep(self, us: int):
+        """
+        Args:
+            us (int): The number of microseconds the calling thread sleeps or spends.
+        Returns:
+            Nothing
+        Notes:
+            The same as advance() while there is a single thread.  Otherwise waits until every other thread
+            sleeps too, then advances to the earliest wake up time of all of them.
+        """
+        if us <= 0:
+            return
+        if self.threads <= 1:
+            self.advance(us)
+            return
+        target = self.now_us + us
+        ident = threading.get_ident()
+        with self.condition:
+            self.sleeping[ident] = target
+            self.condition.notify_all()
+            while self.now_us < target:
+                earliest = min(self.sleeping.values())
+                if len(self.sleeping) >= self.threads and earliest > self.now_us:
+                    self.advance(earliest - self.now_us)
+                    self.condition.notify_all()
+                else:
+                    self.condition.wait()
+            del self.sleeping[ident]
+            self.condition.notify_all()
+
+    def thread_started(self):
+        with self.condition:
+            self.threads += 1
+
+    def thread_ended(self):
+        with self.condition:
+            self.threads -= 1
+            self.condition.notify_all()
+
+    def call_at(self, due_us: int, callback):
+        """
+        Args:
+            due_us (int): The time in microseconds at which callback() is called.
+            callback: Callable without arguments.
+        Returns:
+            The alarm, which can be handed to cancel().
+        """
+        alarm = [due_us, callback]
+        self.alarms.append(alarm)
+        return alarm
+
+    def cancel(self, alarm):
+        """
+        Args:
+            alarm: A value returned by call_at()
+        Returns:
+            Nothing
+        """
+        if alarm in self.alarms:
+            self.alarms.remove(alarm)
+
+    def record_edge(self, pin_id, value: int):
+        self.edges.append((self.now_us, pin_id, value))
+
+    def phases(self, pin_id) -> list:
+        """
+        Args:
+            pin_id: The pin to look at.
+        Returns:
+            A list of (value, duration_us) tuples, one per completed level of the pin.
+        """
+        times = [(t, v) for t, p, v in self.edges if p == pin_id]
+        return [(times[i][1], times[i + 1][0] - times[i][0]) for i in range(len(times) - 1)]
+
+
+clock = VirtualClock()
@@ -0,0 +1,118 @@
+"""
+Mapping of the device filesystem onto host directories.
+
+/sd and /flash are backed by host directories so code that writes logs, checkpoints or caches can run
+unchanged.  Paths outside those two mount points are left alone.
+
+Only the device modules see the mapping: DeviceFinder gives every module imported from the firmware sources,
+the stand-ins or the mounted directories an open() of its own, so builtins.open, and with it the host tools and
+tests that load device modules, is never touched.  The temporary directories are made once per process and
+removed when it exits.
+"""
+
+import atexit
+import builtins
+import importlib.machinery
+import os
+import shutil
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STUBS = os.path.join(ROOT, 'sim', 'stubs')
+HOST_DIRS = (os.path.join(ROOT, 'sim'), os.path.join(ROOT, 'tools'))  # apart from STUBS
+
+sd_root = None
+flash_root = None
+sd_mounted = False
+_host_open = builtins.open
+_temp_roots = {}  # kind -> the temporary directory backing it, see _temp_root()
+
+
+def host_path(path: str) -> str:
+    """
+    Args:
+        path (str): A device path, i.e. '/sd/TEST_32109.py'
+    Returns:
+        The matching host path. Paths outside /sd and /flash are returned unchanged.
+    """
+    for mount, root in (('/sd', sd_root), ('/flash', flash_root)):
+        if root is not None and (path == mount or path.startswith(mount + '/')):
+            return os.path.join(root, path[len(mount) + 1:])
+    return path
+
+
+def device_open(file, *args, **kwargs):
+    if isinstance(file, str):
+        file = host_path(file)
+    return _host_open(file, *args, **kwargs)
+
+
+def _temp_root(kind: str) -> str:
+    if kind not in _temp_roots:
+        _temp_roots[kind] = tempfile.mkdtemp(prefix='sim_%s_' % kind)
+        atexit.register(shutil.rmtree, _temp_roots[kind], True)
+    return _temp_roots[kind]
+
+
+def _inside(path: str, directory: str) -> bool:
+    return path.startswith(os.path.abspath(directory) + os.sep)
+
+
+def is_device_file(path: str) -> bool:
+    """
+    Args:
+        path (str): The host path of a module.
+    Returns:
+        True for the firmware sources, the stand-ins and anything under /sd or /flash, i.e. the TEST_ modules.
+    """
+    path = os.path.abspath(path)
+    for root in (sd_root, flash_root, STUBS):
+        if root is not None and _inside(path, root):
+            return True
+    return _inside(path, ROOT) and not any([_inside(path, directory) for directory in HOST_DIRS])
+
+
+def mount(sd: str=None, flash: str=None):
+    """
+    Args:
+        sd (str): The host directory backing /sd. Default = a temporary directory, the same for the whole process
+        flash (str): The host directory backing /flash. Default = a temporary directory, the same for the whole
+                     process
+    Returns:
+        Nothing
+    """
+    global sd_root, flash_root
+    sd_root = sd if sd is not None else _temp_root('sd')
+    flash_root = flash if flash is not None else _temp_root('flash')
+
+
+class DeviceLoader:
+    """
+    Args:
+        loader: The loader found for a device module.
+    Notes:
+        Runs the module with device_open() as its open().
+    """
+    def __init__(self, loader):
+        self.loader = loader
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        module.open = device_open
+        self.loader.exec_module(module)
+
+
+class DeviceFinder:
+    """
+    Notes:
+        Goes first on sys.meta_path.  Finds modules as the path finder does and hands the device modules, see
+        is_device_file(), to a DeviceLoader.
+    """
+    @classmethod
+    def find_spec(cls, name: str, path=None, target=None):
+        spec = importlib.machinery.PathFinder.find_spec(name, path, target)
+        if spec is not None and spec.origin is not None and spec.loader is not None and is_device_file(spec.origin):
+            spec.loader = DeviceLoader(spec.loader)
+        return spec
@@ -0,0 +1,37 @@
+"""
+Stand-in for the _thread module of the LoBo firmware, which takes the name of the thread first.
+
+_thread is built into CPython, so a file on sys.path can not shadow it: sim.install() puts this module in
+sys.modules in its place.  What it does not define comes from the real module, for the CPython code that
+imports _thread after that.
+"""
+
+import _thread as _real_thread
+
+from sim.clock import clock
+
+
+def start_new_thread(name: str, func, args: tuple, kwargs: dict=None):
+    """
+    Args:
+        name (str): The name of the thread, as on the LoBo firmware.
+        func: The function the thread runs.
+        args (tuple): Its arguments.
+        kwargs (dict): Its keyword arguments. Default = None
+    Returns:
+        The ident of the thread.
+    Notes:
+        The thread takes part in the virtual clock until func returns, see VirtualClock.sleep().
+    """
+    def run():
+        try:
+            func(*args, **(kwargs or {}))
+        finally:
+            clock.thread_ended()
+
+    clock.thread_started()
+    return _real_thread.start_new_thread(run, ())
+
+
+def __getattr__(name: str):
+    return getattr(_real_thread, name)
@@ -0,0 +1,133 @@
+"""
+Stand-in for the LoBo MicroPython display module.
+
+Nothing is drawn; every call is counted in TFT.calls instead, and may be made to cost virtual time through
+TFT.draw_cost_us so slow SPI transfers can be simulated.
+"""
+
+from sim.clock import clock
+
+# (width, height) of a character cell, close enough to the real fonts for layout purposes
+FONT_SIZES = {
+    0: (8, 12),     # FONT_Default
+    1: (8, 12),     # FONT_DefaultSmall
+    2: (6, 8),      # FONT_Small
+    3: (14, 24),    # FONT_DejaVu24
+    4: (12, 22),    # FONT_Ubuntu
+    5: (14, 24),    # FONT_Comic
+    6: (16, 22),    # FONT_Minya
+    7: (16, 24),    # FONT_Tooney
+    8: (12, 18),    # FONT_DejaVu18
+    9: (24, 38),    # FONT_7seg
+}
+
+DRAW_CALLS = ('clear', 'clearwin', 'rect', 'roundrect', 'text', 'pixel', 'line', 'circle', 'fillrect',
+              'fillcircle', 'triangle', 'textClear', 'image')
+
+
+class TFT:
+    ST7789 = 1
+    ILI9341 = 2
+    ST7735R = 3
+    HSPI = 1
+    VSPI = 2
+    TOUCH_STMPE = 2
+
+    FONT_Default = 0
+    FONT_DefaultSmall = 1
+    FONT_Small = 2
+    FONT_DejaVu24 = 3
+    FONT_Ubuntu = 4
+    FONT_Comic = 5
+    FONT_Minya = 6
+    FONT_Tooney = 7
+    FONT_DejaVu18 = 8
+    FONT_7seg = 9
+
+    CENTER = -9003
+    RIGHT = -9004
+    BOTTOM = -9004
+    LASTX = 7000
+    LASTY = 8000
+
+    BLACK = 0x000000
+    NAVY = 0x000080
+    DARKGREEN = 0x008000
+    DARKCYAN = 0x008080
+    MAROON = 0x800000
+    PURPLE = 0x800080
+    OLIVE = 0x808000
+    LIGHTGREY = 0xc0c0c0
+    DARKGREY = 0x808080
+    BLUE = 0x0000ff
+    GREEN = 0x00ff00
+    CYAN = 0x00ffff
+    RED = 0xfc0000
+    MAGENTA = 0xfc00ff
+    YELLOW = 0xfcfc00
+    WHITE = 0xfcfcfc
+    ORANGE = 0xfca400
+    GREENYELLOW = 0xacfc2c
+    PINK = 0xfcc0ca
+
+    draw_cost_us = 0
+
+    def __init__(self):
+        self.width = 320
+        self.height = 240
+        self.current_font = TFT.FONT_Default
+        self.fg = TFT.WHITE
+        self.bg = TFT.BLACK
+        self.calls = {}
+        self.texts = []  # (x, y, text) of every text() call, newest last
+
+    def _count(self, name: str):
+        self.calls[name] = self.calls.get(name, 0) + 1
+        if name in DRAW_CALLS:
+            clock.sleep(self.draw_cost_us)
+
+    def draw_calls(self) -> int:
+        """
+        Returns:
+            The total number of calls that would have sent pixels to the panel.
+        """
+        return sum(self.calls.get(name, 0) for name in DRAW_CALLS)
+
+    def init(self, *args, **kwargs):
+        self._count('init')
+
+    def screensize(self) -> tuple:
+        return self.width, self.height
+
+    def font(self, font, **kwargs):
+        self._count('font')
+        self.current_font = font
+
+    def fontSize(self) -> tuple:
+        return FONT_SIZES.get(self.current_font, (8, 12))
+
+    def textWidth(self, text: str) -> int:
+        return len(text) * self.fontSize()[0]
+
+    def set_fg(self, color: int):
+        self.fg = color
+
+    def set_bg(self, color: int):
+        self.bg = color
+
+    def clear(self, color: int=None):
+        self._count('clear')
+
+    def clearwin(self, color: int=None):
+        self._count('clearwin')
+
+    def rect(self, x, y, width, height, color=None, fillcolor=None):
+        self._count('rect')
+
+    def roundrect(self, x, y, width, height, radius, color=None, fillcolor=None):
+        self._count('roundrect')
+
+    def text(self, x, y, text, color=None, transparent=False, **kwargs):
+        self._count('text')
+        self.texts.append((x, y, text))
+        del self.texts[:-256]
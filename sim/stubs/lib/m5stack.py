@@ -0,0 +1,27 @@
+"""Stand-in for lib/m5stack.py of the m5stack-tools firmware."""
+
+import display
+import machine
+from machine import Pin
+
+BUTTON_A_PIN = 39
+BUTTON_B_PIN = 38
+BUTTON_C_PIN = 37
+SPEAKER_PIN = 25
+
+for _pin in (BUTTON_A_PIN, BUTTON_B_PIN, BUTTON_C_PIN):
+    machine.inputs.setdefault(_pin, 1)  # the buttons have pull-ups on the board and read 0 while pressed
+
+tones = []  # (frequency, duration) of every tone() call
+
+
+def tone(frequency, duration: int=100, pin=None, volume: int=1):
+    tones.append((frequency, duration))
+
+
+def sdconfig(*args, **kwargs):
+    pass
+
+
+def Display(speed: int=40000000):
+    return display.TFT()
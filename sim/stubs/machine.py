@@ -0,0 +1,168 @@
+"""Stand-in for the MicroPython machine module.  Output pins record every edge on the virtual clock."""
+
+from sim.clock import clock
+
+_frequency = 240000000
+inputs = {}  # pin_id -> level read by input pins, set by the simulation
+_irq_pins = []  # pins with an IRQ handler, see set_input()
+
+
+class Pin:
+    IN = 1
+    OUT = 3
+    OPEN_DRAIN = 7
+    PULL_UP = 1
+    PULL_DOWN = 2
+    PULL_FLOAT = 3
+    IRQ_RISING = 1
+    IRQ_FALLING = 2
+    IRQ_ANYEDGE = 3
+
+    def __init__(self, pin_id, mode: int=IN, pull: int=None, value: int=None, **kwargs):
+        self.id = pin_id
+        self.mode = mode
+        self.pull = pull
+        self.level = 0
+        self.handler = None
+        self.trigger = 0
+        if value is not None:
+            self.value(value)
+
+    def value(self, value=None):
+        if value is None:
+            if self.mode == Pin.OUT:
+                return self.level
+            return inputs.get(self.id, 1 if self.pull == Pin.PULL_UP else 0)
+        value = 1 if value else 0
+        if value != self.level:
+            self.level = value
+            clock.record_edge(self.id, value)
+
+    def on(self):
+        self.value(1)
+
+    def off(self):
+        self.value(0)
+
+    def irq(self, handler=None, trigger: int=IRQ_ANYEDGE, **kwargs):
+        self.handler = handler
+        self.trigger = trigger
+        if self not in _irq_pins:
+            _irq_pins.append(self)
+
+    def __call__(self, value=None):
+        return self.value(value)
+
+
+class Signal:
+    def __init__(self, pin, *args, invert: bool=None):
+        if not isinstance(pin, Pin):
+            pin = Pin(pin, Pin.OUT)
+        if invert is None:
+            invert = args[0] if len(args) == 1 and args[0] in (False, True) else False  # Signal(pin, inverted)
+        self.pin = pin
+        self.invert = bool(invert)
+
+    def value(self, value=None):
+        if value is None:
+            return self.pin.value() ^ self.invert
+        self.pin.value((1 if value else 0) ^ self.invert)
+
+    def on(self):
+        self.value(1)
+
+    def off(self):
+        self.value(0)
+
+
+def set_input(pin_id, level: int):
+    """
+    Args:
+        pin_id: The input pin.
+        level (int): The new level of the pin.
+    Returns:
+        Nothing
+    Notes:
+        Runs the IRQ handlers of the pin if the change matches their trigger, as a button press would.
+    """
+    old = inputs.get(pin_id)
+    inputs[pin_id] = level
+    if old == level:
+        return
+    for pin in list(_irq_pins):
+        if pin.id == pin_id and pin.handler is not None and pin.trigger & (Pin.IRQ_RISING if level else Pin.IRQ_FALLING):
+            pin.handler(pin)
+
+
+def disable_irq() -> int:
+    return 0
+
+
+def enable_irq(state: int=0):
+    pass
+
+
+def freq(hz: int=None):
+    global _frequency
+    if hz is None:
+        return _frequency
+    _frequency = hz
+
+
+def reset():
+    raise SystemExit("machine.reset()")
+
+
+def unique_id() -> bytes:
+    return b"\x00sim\x00\x01"
+
+
+class Timer:
+    """
+    Notes:
+        Follows the LoBo machine.Timer API.  Callbacks are run by the virtual clock when it passes their due
+        time, as if scheduled by the firmware between two bytecodes of the foreground.
+    """
+    ONE_SHOT = 0
+    PERIODIC = 1
+    CHRONO = 2
+
+    def __init__(self, timer_id: int=0):
+        self.id = timer_id
+        self.callback = None
+        self.mode = Timer.ONE_SHOT
+        self.period_ms = 0
+        self.alarm = None
+        self.events = 0
+
+    def init(self, period: int=0, mode: int=ONE_SHOT, callback=None, **kwargs):
+        self.deinit()
+        self.period_ms = period
+        self.mode = mode
+        self.callback = callback
+        self._arm()
+
+    def _arm(self):
+        self.alarm = clock.call_at(clock.now_us + max(self.period_ms, 0) * 1000, self._fire)
+
+    def _fire(self):
+        self.alarm = None
+        self.events += 1
+        if self.mode == Timer.PERIODIC:
+            self._arm()
+        if self.callback is not None:
+            self.callback(self)
+
+    def period(self, period: int=None):
+        if period is None:
+            return self.period_ms
+        self.period_ms = period
+
+    def reshoot(self):
+        self.deinit()
+        self._arm()
+
+    def deinit(self):
+        if self.alarm is not None:
+            clock.cancel(self.alarm)
+            self.alarm = None
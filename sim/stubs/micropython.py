@@ -0,0 +1,18 @@
+"""Stand-in for the MicroPython micropython module."""
+
+
+def const(value):
+    return value
+
+
+def schedule(func, arg):
+    func(arg)
+    return True
+
+
+def alloc_emergency_exception_buf(size: int):
+    pass
+
+
+def mem_info(verbose: int=0):
+    print("mem_info: not available on the host")
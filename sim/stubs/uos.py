@@ -0,0 +1,49 @@
+"""
+Stand-in for the MicroPython uos module.
+
+Device paths below /sd and /flash are mapped onto host directories, see sim.fs.
+"""
+
+import os as _os
+
+from sim import fs
+
+
+def mountsd(*args):
+    fs.sd_mounted = True
+
+
+def umountsd():
+    fs.sd_mounted = False
+
+
+def listdir(path: str='/') -> list:
+    return sorted(_os.listdir(fs.host_path(path)))
+
+
+def ilistdir(path: str='/'):
+    host = fs.host_path(path)
+    for entry in _os.scandir(host):
+        yield entry.name, 0x4000 if entry.is_dir() else 0x8000, 0, entry.stat().st_size
+
+
+def stat(path: str) -> tuple:
+    result = _os.stat(fs.host_path(path))
+    return (result.st_mode, 0, 0, 0, 0, 0, result.st_size,
+            int(result.st_atime), int(result.st_mtime), int(result.st_ctime))
+
+
+def remove(path: str):
+    _os.remove(fs.host_path(path))
+
+
+def rename(old: str, new: str):
+    _os.replace(fs.host_path(old), fs.host_path(new))
+
+
+def mkdir(path: str):
+    _os.mkdir(fs.host_path(path))
+
+
+def getcwd() -> str:
+    return '/flash'
@@ -0,0 +1,47 @@
+"""Stand-in for the MicroPython utime module, running on the virtual clock."""
+
+import time as _time
+
+from sim.clock import clock, TICKS_MAX, TICKS_HALFPERIOD
+
+
+def ticks_us() -> int:
+    return clock.now_us & TICKS_MAX
+
+
+def ticks_ms() -> int:
+    return (clock.now_us // 1000) & TICKS_MAX
+
+
+def ticks_cpu() -> int:
+    return ticks_us()
+
+
+def ticks_add(ticks: int, delta: int) -> int:
+    return (ticks + delta) & TICKS_MAX
+
+
+def ticks_diff(ticks1: int, ticks2: int) -> int:
+    return ((ticks1 - ticks2 + TICKS_HALFPERIOD) & TICKS_MAX) - TICKS_HALFPERIOD
+
+
+def sleep_us(us: int):
+    clock.sleep(int(us))
+
+
+def sleep_ms(ms: int):
+    clock.sleep(int(ms) * 1000)
+
+
+def sleep(seconds):
+    clock.sleep(int(seconds * 1000000))
+
+
+def time() -> int:
+    return clock.now_us // 1000000
+
+
+def localtime(secs: int=None) -> tuple:
+    if secs is None:
+        secs = time()
+    return _time.gmtime(secs)[:8]
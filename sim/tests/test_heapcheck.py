@@ -0,0 +1,68 @@
+"""
+HeapProbe on a scripted gc.mem_free(), and the heap check of a Test run on the simulator.
+"""
+
+import gc
+import tracemalloc
+
+import sim
+
+sim.install()
+
+import heapcheck
+from sim.clock import clock
+
+RETAINED = 4096
+
+
+def probe_of(frees: list) -> heapcheck.HeapProbe:
+    samples = iter(frees)
+    original = gc.mem_free
+    gc.mem_free = lambda: next(samples)
+    try:
+        probe = heapcheck.HeapProbe()
+        for _ in frees:
+            probe.sample()
+    finally:
+        gc.mem_free = original
+    return probe
+
+
+def test_drops_are_allocations():
+    probe = probe_of([10000, 10000, 9900, 9900, 9600, 9600])
+    assert probe.samples == 5  # the first sample is the reference
+    assert (probe.allocated, probe.worst) == (400, 300)
+    assert probe.per_sample() == 80
+    assert probe.report() == "Heap 400B in 5 cycles, worst 300B"
+
+
+def test_a_collection_only_resets_the_reference():
+    probe = probe_of([5000, 4000, 9000, 8500, 9500])
+    assert (probe.allocated, probe.worst, probe.samples) == (1500, 1000, 4)
+
+
+def test_a_loop_that_allocates_nothing():
+    probe = probe_of([7000] * 10)
+    assert (probe.allocated, probe.worst, probe.per_sample()) == (0, 0, 0)
+
+
+def test_a_periodic_function_that_keeps_memory_is_reported():
+    ct = sim.load_cycle_test()
+    ct.test_UI = ct.TestUI()
+    kept = []
+
+    def periodic(param):
+        kept.append(bytearray(RETAINED))
+
+    clock.reset()
+    test = ct.Test(relay=ct.Relay(2), cycles=20, on_time=100, off_time=100, periodic_function=periodic,
+                   func_call_freq=1, heap_check=True)
+    tracemalloc.start()
+    try:
+        test.begin_test()
+    finally:
+        tracemalloc.stop()
+    assert len(kept) == 20
+    assert test.heap.samples == 19  # intervals between the samples of 20 cycles
+    assert test.heap.allocated >= 19 * RETAINED
+    assert RETAINED <= test.heap.worst < 2 * RETAINED
@@ -0,0 +1,104 @@
+"""
+TimerPulseEngine on the simulated machine.Timer: edge times against their deadlines, pauses and first_cycle.
+"""
+
+import sim
+
+sim.install()
+
+import machine
+import utime
+
+from pulse import TimerPulseEngine
+from sim.clock import clock
+
+PIN = 2
+ON_MS = 30
+OFF_MS = 70
+
+
+def edges() -> list:
+    return [(time_us // 1000, value) for time_us, pin_id, value in clock.edges if pin_id == PIN]
+
+
+def run(engine: TimerPulseEngine, first_cycle: int=1, pause_ms: int=0, poll_ms: int=1) -> list:
+    """
+    Runs the engine from a foreground that polls it every poll_ms, spending pause_ms in every pause, and
+    returns the cycle numbers the engine paused before.
+    """
+    pauses = []
+    engine.start(first_cycle)
+    while not engine.done:
+        if engine.paused:
+            pauses.append(engine.count + 1)
+            utime.sleep_ms(pause_ms)
+            engine.resume()
+        utime.sleep_ms(poll_ms)
+    return pauses
+
+
+def expected(cycles: int, start_ms: int=0) -> list:
+    waveform = []
+    for cycle in range(cycles):
+        waveform += [(start_ms + cycle * (ON_MS + OFF_MS), 1), (start_ms + cycle * (ON_MS + OFF_MS) + ON_MS, 0)]
+    return waveform
+
+
+def test_edges_on_their_deadlines():
+    clock.reset()
+    engine = TimerPulseEngine(machine.Signal(PIN), ON_MS, OFF_MS, 10)
+    run(engine)
+    assert edges() == expected(10)
+    assert engine.count == 10
+    assert engine.scheduler.max_late_ms == 0
+    assert engine.scheduler.drift_ms == 0
+    assert clock.now_us // 1000 <= 10 * (ON_MS + OFF_MS) + 1
+
+
+def test_a_slow_foreground_does_not_move_the_edges():
+    clock.reset()
+    engine = TimerPulseEngine(machine.Signal(PIN), ON_MS, OFF_MS, 10)
+    run(engine, poll_ms=250)  # the foreground sleeps across several edges at a time
+    assert edges() == expected(10)
+    assert engine.scheduler.late_edges == 0
+
+
+def test_resume_after_a_pause():
+    clock.reset()
+    engine = TimerPulseEngine(machine.Signal(PIN), ON_MS, OFF_MS, 9, func_call_freq=3)
+    pauses = run(engine, pause_ms=40)
+    assert pauses == [3, 6, 9]
+    period = ON_MS + OFF_MS
+    # the cycle after a pause starts once the foreground resumes, the schedule goes on from there
+    rising = [time_ms for time_ms, value in edges() if value == 1]
+    assert rising[:2] == [0, period]
+    for cycle in (3, 6, 9):
+        gap = rising[cycle - 1] - rising[cycle - 2]
+        assert period + 40 <= gap <= period + 41
+    assert len(rising) == 9
+    assert engine.scheduler.paused_ms >= 3 * 40
+    assert engine.scheduler.drift_ms == 0
+
+
+def test_first_cycle():
+    clock.reset()
+    engine = TimerPulseEngine(machine.Signal(PIN), ON_MS, OFF_MS, 8, func_call_freq=3)
+    pauses = run(engine, first_cycle=5)
+    assert pauses == [6]  # the cycle numbers carry on from first_cycle
+    assert engine.count == 8
+    assert len([value for time_ms, value in edges() if value == 1]) == 4
+    assert edges()[:2] == [(0, 1), (ON_MS, 0)]
+
+
+def test_stop_leaves_the_relay_off():
+    clock.reset()
+    relay = machine.Signal(PIN)
+    engine = TimerPulseEngine(relay, ON_MS, OFF_MS, 100)
+    engine.start()
+    utime.sleep_ms(ON_MS // 2)
+    assert relay.value() == 1
+    engine.stop()
+    utime.sleep_ms(10 * (ON_MS + OFF_MS))
+    assert engine.done
+    assert relay.value() == 0
+    assert edges() == [(0, 1), (ON_MS // 2, 0)]
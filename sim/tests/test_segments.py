@@ -0,0 +1,150 @@
+"""
+Segment tables: compile_test() against the cycles Test.begin_test() runs live, and execute() on the virtual clock.
+"""
+
+import pytest
+
+import sim
+
+sim.install()
+
+from scheduler import EdgeScheduler
+from segments import compile_test, execute, word, Dwell, OP_ON, OPERAND_MASK
+from sim.clock import clock
+
+ON_MS = 20
+OFF_MS = 50
+
+
+class RecordingRelay:
+    def __init__(self, log: list, name: str='relay'):
+        self.log = log
+        self.name = name
+
+    def on(self):
+        self.log.append((clock.now_us // 1000, self.name, 1))
+
+    def off(self):
+        self.log.append((clock.now_us // 1000, self.name, 0))
+
+
+class FakeTest:
+    def __init__(self, relay, cycles: int, periodic=None, func_call_freq: int=0, func_param=None):
+        self.relay = relay
+        self.on_time = ON_MS
+        self.off_time = OFF_MS
+        self.cycles = cycles
+        self.periodic_function = periodic
+        self.func_call_freq = func_call_freq
+        self.func_param = func_param
+
+
+def live(cycles: int, first_cycle: int=1, func_call_freq: int=0, dwell_ms: int=0) -> list:
+    """The relay actions of the loop engine, a dwell before every cycle whose number is a multiple of freq."""
+    actions = []
+    time_ms = 0
+    for cycle_num in range(first_cycle, cycles + 1):
+        if func_call_freq > 0 and cycle_num % func_call_freq == 0:
+            actions += [(time_ms, 'relay', 1), (time_ms + dwell_ms, 'relay', 0)]
+            time_ms += dwell_ms
+        actions += [(time_ms, 'relay', 1), (time_ms + ON_MS, 'relay', 0)]
+        time_ms += ON_MS + OFF_MS
+    return actions
+
+
+def run(table, first_cycle: int=1, on_cycle=None, on_round=None) -> int:
+    clock.reset()
+    scheduler = EdgeScheduler()
+    cycles = execute(table, scheduler, on_cycle=on_cycle, on_round=on_round, first_cycle=first_cycle)
+    assert scheduler.max_late_ms == 0
+    return cycles
+
+
+def test_plain_cycles_compile_to_one_repeat():
+    log = []
+    table = compile_test(FakeTest(RecordingRelay(log), 1000))
+    assert len(table) <= 6
+    assert table.cycles() == 1000
+    assert table.duration_ms() == 1000 * (ON_MS + OFF_MS)
+    assert table.exact
+    assert run(table) == 1000
+    assert log == live(1000)
+    assert clock.now_us // 1000 == table.duration_ms()
+
+
+@pytest.mark.parametrize('cycles, freq', [(10, 4), (12, 4), (3, 4), (7, 1), (9, 3)])
+def test_dwell_matches_the_live_test(cycles, freq):
+    log = []
+    relay = RecordingRelay(log)
+    table = compile_test(FakeTest(relay, cycles, Dwell(relay, 25), freq))
+    assert table.exact
+    assert table.cycles() == cycles
+    assert table.duration_ms() == cycles * (ON_MS + OFF_MS) + (cycles // freq) * 25
+    assert run(table) == cycles
+    assert log == live(cycles, func_call_freq=freq, dwell_ms=25)
+
+
+def test_dwell_param_overrides_its_time():
+    log = []
+    relay = RecordingRelay(log)
+    run(compile_test(FakeTest(relay, 4, Dwell(relay, 25), 2, func_param=5)))
+    assert log == live(4, func_call_freq=2, dwell_ms=5)
+
+
+@pytest.mark.parametrize('first_cycle', [1, 2, 4, 5, 8, 11])
+def test_first_cycle(first_cycle):
+    log = []
+    relay = RecordingRelay(log)
+    table = compile_test(FakeTest(relay, 10, Dwell(relay, 25), 4), first_cycle=first_cycle)
+    assert table.cycles() == 11 - first_cycle
+    numbers = []
+    run(table, first_cycle, on_cycle=numbers.append)
+    assert numbers == list(range(first_cycle, 11))
+    assert log == live(10, first_cycle, 4, 25)
+
+
+def test_calls_a_periodic_function():
+    log = []
+    calls = []
+
+    def periodic(param):
+        calls.append((clock.now_us // 1000, param))
+        clock.sleep(7000)  # a function of unknown duration, resynced after
+
+    table = compile_test(FakeTest(RecordingRelay(log), 6, periodic, 3, func_param='x'))
+    assert not table.exact
+    assert table.duration_ms() == 6 * (ON_MS + OFF_MS)  # a lower bound
+    assert run(table) == 6
+    period = ON_MS + OFF_MS
+    assert calls == [(2 * period, 'x'), (5 * period + 7, 'x')]
+    assert [time_ms for time_ms, name, level in log if level == 1][2:4] == [2 * period + 7, 3 * period + 7]
+
+
+def test_on_cycle_stops_the_run():
+    log = []
+    table = compile_test(FakeTest(RecordingRelay(log), 100))
+    assert run(table, on_cycle=lambda cycle_num: cycle_num == 5) == 5
+    assert log == live(5)
+
+
+def test_rounds_in_one_table():
+    log = []
+    first = RecordingRelay(log, 'first')
+    second = RecordingRelay(log, 'second')
+    table = compile_test(FakeTest(first, 3))
+    compile_test(FakeTest(second, 2), table)
+    assert table.rounds == 2
+    assert table.cycles() == 5
+    rounds = []
+    assert run(table, on_round=rounds.append) == 5
+    assert rounds == [0, 1]
+    assert [name for time_ms, name, level in log] == ['first'] * 6 + ['second'] * 4
+    assert log[6][0] == 3 * (ON_MS + OFF_MS)  # the second round follows without a gap
+
+
+def test_operand_out_of_range():
+    assert word(OP_ON, OPERAND_MASK) & OPERAND_MASK == OPERAND_MASK
+    with pytest.raises(ValueError):
+        word(OP_ON, OPERAND_MASK + 1)
+    with pytest.raises(ValueError):
+        word(OP_ON, -1)
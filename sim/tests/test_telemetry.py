@@ -0,0 +1,175 @@
+"""
+FrameDecoder against a recorded telemetry stream.
+
+telemetry_recording.bin holds what a tester sent on a port shared with print() and the log ring during a 40 cycle
+test, with the CRC of one frame corrupted and one frame cut out.  Write it again with:
+    python -m sim.tests.test_telemetry
+"""
+
+import io
+import os
+import sys
+
+import sim
+
+sim.install()
+
+import telemetry
+
+RECORDING = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'telemetry_recording.bin')
+TESTER_ID = 3
+CORRUPTED = 4  # index of the frame whose CRC is flipped
+DROPPED = 9    # index of the frame cut out
+CHUNKS = (1, 7, 64, 3, 200, 2, 55)
+
+
+def feed_in_chunks(decoder: telemetry.FrameDecoder, data: bytes) -> list:
+    frames = []
+    offset = 0
+    index = 0
+    while offset < len(data):
+        size = CHUNKS[index % len(CHUNKS)]
+        frames += decoder.feed(data[offset:offset + size])
+        offset += size
+        index += 1
+    return [dict(zip(telemetry.FIELDS, values)) for values in frames]
+
+
+def stream_of(count: int, tester_id: int=0) -> bytes:
+    port = io.BytesIO()
+    stream = telemetry.TelemetryStream(port, tester_id=tester_id)
+    stream.start(0, count, 10, 10)
+    for cycle_num in range(count):
+        stream.update(cycle_num)
+        stream.send()
+    return port.getvalue()
+
+
+def test_recording():
+    with open(RECORDING, 'rb') as recording:
+        data = recording.read()
+    decoder = telemetry.FrameDecoder()
+    frames = feed_in_chunks(decoder, data)
+    assert decoder.frames == len(frames) == 19
+    assert decoder.bad == 1
+    assert decoder.lost == 2  # the frame cut out and the one whose CRC was flipped
+    assert decoder.unknown == 0
+    assert decoder.skipped == len(data) - decoder.frames * telemetry.FRAME_SIZE
+    assert b'Drift' in data and decoder.skipped > telemetry.FRAME_SIZE  # the text around the frames
+    assert [frame['sequence'] for frame in frames] == [n for n in range(21) if n not in (CORRUPTED, DROPPED)]
+
+    first = frames[0]
+    assert first['tester'] == TESTER_ID
+    assert first['state'] == telemetry.RUNNING
+    assert (first['round'], first['cycle'], first['cycles']) == (0, 0, 40)
+    assert (first['on_ms'], first['off_ms']) == (300, 200)
+    running = frames[10]
+    assert running['state'] == telemetry.RUNNING
+    assert 0 < running['cycle'] < 40
+    assert (running['on_us'], running['off_us']) == (300000, 200000)
+    assert running['rate'] == 100
+    assert running['mem_free'] == sim.HEAP_SIZE
+    last = frames[-1]
+    assert last['state'] == telemetry.DONE
+    assert last['cycle'] == 40
+    assert last['elapsed_s'] == 19
+    assert (last['warnings'], last['errors']) == (1, 0)
+
+
+def test_chunk_size_does_not_matter():
+    with open(RECORDING, 'rb') as recording:
+        data = recording.read()
+    whole = telemetry.FrameDecoder()
+    frames = whole.feed(data)
+    decoder = telemetry.FrameDecoder()
+    one_by_one = []
+    for index in range(len(data)):
+        one_by_one += decoder.feed(data[index:index + 1])
+    assert one_by_one == frames
+    assert (decoder.frames, decoder.bad, decoder.lost, decoder.skipped) == (whole.frames, whole.bad, whole.lost,
+                                                                            whole.skipped)
+
+
+def test_lost_across_the_wrap():
+    data = stream_of(300)
+    size = telemetry.FRAME_SIZE
+    decoder = telemetry.FrameDecoder()
+    frames = decoder.feed(data[:256 * size] + data[257 * size:])  # sequence 0 of the second turn is lost
+    assert decoder.lost == 1
+    assert len(frames) == 299
+
+
+def test_reset_is_not_lost():
+    decoder = telemetry.FrameDecoder()
+    decoder.feed(stream_of(10, TESTER_ID))
+    frames = decoder.feed(stream_of(5, TESTER_ID))  # the tester started again
+    assert decoder.lost == 0
+    assert [frame[1] for frame in frames] == [0, 1, 2, 3, 4]
+
+
+def test_testers_are_followed_apart():
+    decoder = telemetry.FrameDecoder()
+    first = stream_of(3, 1)
+    second = stream_of(3, 2)
+    size = telemetry.FRAME_SIZE
+    frames = decoder.feed(b''.join(first[n * size:(n + 1) * size] + second[n * size:(n + 1) * size]
+                                   for n in range(3)))
+    assert [(frame[0], frame[1]) for frame in frames] == [(1, 0), (2, 0), (1, 1), (2, 1), (1, 2), (2, 2)]
+    assert decoder.lost == 0
+
+
+class _SharedPort:
+    """The REPL port: the frames and the text printed end up in one byte stream."""
+    def __init__(self):
+        self.data = bytearray()
+
+    def write(self, data):
+        self.data += data if isinstance(data, (bytes, bytearray)) else data.encode()
+        return len(data)
+
+    def flush(self):
+        pass
+
+
+def record(path: str=RECORDING):
+    """
+    Args:
+        path (str): Where the recording is written. Default = RECORDING
+    Returns:
+        Nothing
+    """
+    from sim.clock import clock
+    import ringlog as log
+    clock.reset()
+    cycle_test = sim.load_cycle_test()
+    cycle_test.test_UI = cycle_test.TestUI()
+    port = _SharedPort()
+    cycle_test.telemetry = telemetry.TelemetryStream(port, tester_id=TESTER_ID)
+    log.ring.warnings = log.ring.errors = 0
+    test = cycle_test.Test(relay=cycle_test.Relay(2, 0), cycles=40, on_time=300, off_time=200, capture=4)
+    stdout = sys.stdout
+    sys.stdout = port
+    try:
+        log.warning("recording %d cycles", test.cycles)
+        test.begin_test()
+    finally:
+        sys.stdout = stdout
+    cycle_test.telemetry = None
+    decoder = telemetry.FrameDecoder()
+    decoder.feed(bytes(port.data))
+    size = telemetry.FRAME_SIZE
+    starts = []
+    offset = port.data.find(telemetry.SYNC)
+    while offset >= 0:
+        starts.append(offset)
+        offset = port.data.find(telemetry.SYNC, offset + size)
+    data = port.data
+    data[starts[CORRUPTED] + size - 1] ^= 0xff
+    del data[starts[DROPPED]:starts[DROPPED] + size]
+    with open(path, 'wb') as recording:
+        recording.write(data)
+    print("%d frames, %d bytes written to %s" % (len(starts), len(data), path))
+
+
+if __name__ == '__main__':
+    record()
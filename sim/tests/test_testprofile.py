@@ -0,0 +1,91 @@
+"""
+The .cyc profile parser: the profiles shipped in tests/, comments, defaults and every error it reports.
+"""
+
+import os
+
+import pytest
+
+import sim
+
+sim.install()
+
+from testprofile import load_profile
+
+NO_PERIOD = "a round needs pulse_width_ms, or on_ms and off_ms adding up to more than 0"
+TESTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'tests')
+
+
+def profile_of(tmp_path, text: str):
+    path = tmp_path / 'TEST_x.cyc'
+    path.write_text(text)
+    return load_profile(str(path))
+
+
+def error_of(tmp_path, text: str) -> str:
+    with pytest.raises(ValueError) as error:
+        profile_of(tmp_path, text)
+    return str(error.value).split('TEST_x.cyc', 1)[1]
+
+
+def test_shipped_profile():
+    profile = load_profile(os.path.join(TESTS_DIR, 'TEST_32109r6.cyc'))
+    assert (profile.name, profile.version) == ('32109r6 Cycle Test', 'Version 1.1')
+    assert (profile.relay, profile.inverted, profile.start, profile.end) == (2, 0, True, False)
+    assert profile.rounds == [{'cycles': 1000, 'pulse_width_ms': 3000, 'duty': 90.0}]
+
+
+def test_rounds_take_the_defaults(tmp_path):
+    profile = profile_of(tmp_path, """
+        # header comment
+        name = Two rounds  # a comment after a space
+        relay = 4\t# and after a tab
+        on_ms = 20
+        off_ms = 100
+
+        [round]
+        cycles = 10
+        dwell_ms = 300
+        dwell_every = 5
+        dwell_level = off
+
+        [round]
+        cycles = 20
+        off_ms = 200\t# overrides the default
+        engine = table
+        """)
+    assert (profile.name, profile.relay, profile.start, profile.end) == ('Two rounds', 4, None, None)
+    assert profile.rounds == [
+        {'cycles': 10, 'on_ms': 20, 'off_ms': 100, 'dwell_ms': 300, 'dwell_every': 5, 'dwell_level': 'off'},
+        {'cycles': 20, 'on_ms': 20, 'off_ms': 200, 'engine': 'table'},
+    ]
+
+
+@pytest.mark.parametrize('text, error', [
+    ("cycles = 5\non_ms = 1\nspeed = 3\n", ":3: unknown key speed"),
+    ("cycles = 5\non_ms = 1\n[round]\nname = x\n", ":4: unknown key name"),
+    ("cycles = five\n", ":1: bad value for cycles: five"),
+    ("relay = two\ncycles = 5\non_ms = 1\n", ":1: bad value for relay: two"),
+    ("cycles = 5\non_ms = 1\nstart = HALF\n", ":3: expected ON or OFF, not HALF"),
+    ("cycles = 5\non_ms = 1\ndwell_level = UP\n", ":3: expected ON or OFF, not UP"),
+    ("cycles = 5\non_ms = 1\njust text\n", ":3: expected key = value"),
+    ("cycles = 5\non_ms = 1\nengine = fast\n", ":3: expected one of loop, timer, table, async, thread, not fast"),
+    ("cycles = 0\non_ms = 1\n", ":1: cycles must be above 0, not 0"),
+    ("cycles = 5\npulse_width_ms = 100\nduty = 100.5\n", ":3: duty must be within 0 to 100, not 100.5"),
+    ("on_ms = 1\n\n[round]\ncycles = 5\n[round]\noff_ms = 2\n", ":5: every round needs cycles"),
+    ("name = x\n[round]\ncycles = 5\n", ":2: " + NO_PERIOD),
+    ("cycles = 5\non_ms = 0\noff_ms = 0\n", ":1: " + NO_PERIOD),
+])
+def test_errors_name_the_line(tmp_path, text, error):
+    assert error_of(tmp_path, text) == error
+
+
+def test_limits_are_accepted(tmp_path):
+    profile = profile_of(tmp_path, "cycles = 1\npulse_width_ms = 100\n[round]\nduty = 0\n[round]\nduty = 100\n")
+    assert [round_keys['duty'] for round_keys in profile.rounds] == [0.0, 100.0]
+
+
+def test_a_script_and_a_profile_of_one_name_keep_apart():
+    from catalogue import menu_names
+    files = ['TEST_31334.cyc', 'TEST_32109.cyc', 'TEST_32109.py', 'TEST_32109r6.cyc']
+    assert menu_names(files) == ['31334', '32109.cyc', '32109.py', '32109r6']
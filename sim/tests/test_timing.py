@@ -0,0 +1,110 @@
+"""
+TimingCapture statistics from edges timed on the virtual clock.
+"""
+
+import statistics
+
+import sim
+
+sim.install()
+
+import machine
+import utime
+
+from cyclelog import FLAG_SKIPPED, FLAG_LAST
+from sim.clock import clock
+from timing import PhaseStats, TimingCapture, HISTOGRAM_BINS, MAX_DEVIATION_US
+
+
+class ListLogger:
+    def __init__(self):
+        self.records = []
+
+    def log(self, cycle_num: int, start_ms: int, on_us: int, off_us: int, flags: int=0):
+        self.records.append((cycle_num, start_ms, on_us, off_us, flags))
+
+
+def cycle(relay, on_us: int, off_us: int):
+    relay.on()
+    clock.sleep(on_us)
+    relay.off()
+    clock.sleep(off_us)
+
+
+def test_phase_stats():
+    durations = [10000, 10250, 9900, 10000, 13000, 10100]
+    stats = PhaseStats(10, 4, 250)
+    for duration in durations:
+        stats.add(duration)
+    assert stats.count == 6
+    assert (stats.min_us, stats.max_us) == (9900, 13000)
+    assert abs(stats.mean_us() - statistics.mean(durations)) < 1e-6
+    assert abs(stats.stddev_us() - statistics.stdev(durations)) < 1e-6
+    assert stats.recent() == durations[-4:]  # oldest first, across the wrap of the ring
+    middle = HISTOGRAM_BINS // 2
+    assert stats.histogram[middle] == 3       # 0 to 249us late
+    assert stats.histogram[middle + 1] == 1   # 250us
+    assert stats.histogram[middle - 1] == 1   # 100us early
+    assert stats.histogram[HISTOGRAM_BINS - 1] == 1  # 3ms late, beyond the last bin
+    assert sum(stats.histogram) == 6
+    assert stats.summary() == "%.2f +-%.2fms" % (statistics.mean(durations) / 1000,
+                                                 statistics.stdev(durations) / 1000)
+
+
+def test_clipped_deviations():
+    stats = PhaseStats(100, 8, 250)
+    stats.add(100000 + MAX_DEVIATION_US * 3)
+    stats.add(100000)
+    assert stats.clipped == 1
+    assert stats.max_us == 100000 + MAX_DEVIATION_US * 3  # min and max are not clipped
+    assert stats.mean_us() == 100000 + MAX_DEVIATION_US / 2
+
+
+def test_capture_of_a_run():
+    clock.reset()
+    capture = TimingCapture(30, 70, size=8)
+    capture.logger = ListLogger()
+    relay = capture.wrap(machine.Signal(2))
+    timings = [(30000, 70000), (30500, 69000), (29000, 71500)]
+    for on_us, off_us in timings:
+        cycle(relay, on_us, off_us)
+    capture.finish()
+    assert capture.on.recent() == [on_us for on_us, off_us in timings]
+    assert capture.off.recent() == [off_us for on_us, off_us in timings]
+    assert capture.max_jitter_us() == 1500
+    assert capture.results()[2] == "Jitter 1.50ms"
+    records = capture.logger.records
+    assert [record[0] for record in records] == [1, 2, 3]
+    assert [record[2:4] for record in records] == timings
+    assert [record[1] for record in records] == [0, 100, 199]  # ms, the third cycle starts at 199.5
+    assert [record[4] for record in records] == [0, 0, FLAG_LAST]
+
+
+def test_finish_at_the_end_of_the_last_phase():
+    clock.reset()
+    capture = TimingCapture(30, 70)
+    relay = capture.wrap(machine.Signal(2))
+    cycle(relay, 30000, 70000)
+    end_us = utime.ticks_us()
+    clock.sleep(25000)  # the engine winding down after the last deadline
+    capture.finish(end_us)
+    assert capture.off.recent() == [70000]
+    assert capture.max_jitter_us() == 0
+
+
+def test_skipped_phase():
+    clock.reset()
+    capture = TimingCapture(30, 70)
+    capture.logger = ListLogger()
+    relay = capture.wrap(machine.Signal(2))
+    cycle(relay, 30000, 70000)
+    cycle(relay, 30000, 5000)
+    capture.skip()  # i.e. a dwell moved the relay behind the back of the capture
+    clock.sleep(500000)
+    cycle(relay, 30000, 70000)
+    capture.finish()
+    assert capture.on.count == 3
+    assert capture.off.count == 2  # the OFF phase around the dwell is not counted
+    flags = [record[4] for record in capture.logger.records]
+    assert flags == [0, FLAG_SKIPPED, FLAG_LAST]
+    assert capture.logger.records[1][3] == 0
@@ -0,0 +1,34 @@
+"""
+An asyncio event loop on the virtual clock.
+
+The loop reads the time from the virtual clock, and where it would block in select() waiting for its next timer
+it advances the clock instead, so asyncio.sleep() takes no real time, like utime.sleep_ms() of the stand-ins.
+Tasks that sleep with utime instead of awaiting advance the same clock, so both kinds of waiting mix as they do
+on the device.
+"""
+
+import asyncio
+import selectors
+
+from sim.clock import clock
+
+
+class VirtualSelector(selectors.DefaultSelector):
+    def select(self, timeout=None):
+        events = super().select(0)
+        if not events and timeout is not None and timeout > 0:
+            clock.advance(int(timeout * 1000000 + 0.999))
+        return events
+
+
+class VirtualEventLoop(asyncio.SelectorEventLoop):
+    def __init__(self):
+        super().__init__(VirtualSelector())
+
+    def time(self) -> float:
+        return clock.now_us / 1000000
+
+
+class VirtualEventLoopPolicy(asyncio.DefaultEventLoopPolicy):
+    def new_event_loop(self):
+        return VirtualEventLoop()
@@ -0,0 +1,324 @@
+"""
+Compact binary telemetry of the running test, framed for a serial link.
+
+Every frame is a fixed size STATUS frame: the round and cycle, the nominal and last measured ON and OFF times,
+the elapsed time and cycle rate, the heap and gc counters and the warnings and errors logged so far.  It is
+packed into one preallocated bytearray and handed to the UART by service(), an idle hook, once per interval and
+only when the measured cost of a send fits in the slack before the next edge, so the stream never delays the
+relay.  The UART driver copies the frame to its transmit buffer and sends it in the background.
+
+Frame layout, little endian: HEADER_FORMAT, then STATUS_FORMAT, then the CRC-16/CCITT of everything after the
+sync bytes.  FrameDecoder skips whatever is not a frame with a valid checksum, so the frames can even share the
+REPL port with print() and the log ring, and counts the sequence numbers it missed.  At the default interval a
+tester sends FRAME_SIZE bytes a second, so one host can follow many of them.
+
+The stream is off unless a telemetry_config.py module sets TELEMETRY_INTERVAL_MS.  It then goes out on UART 2,
+port C of the M5Stack; TELEMETRY_UART, TELEMETRY_BAUD, TELEMETRY_TX, TELEMETRY_RX and TESTER_ID change the
+rest, see open_stream().  tools/telemetry_monitor.py decodes the stream of one or more testers, live or recorded.
+"""
+
+try:
+    import ustruct as struct
+except ImportError:
+    import struct
+
+import gc
+import sys
+import utime
+from array import array
+from micropython import const
+
+import ringlog as log
+
+SYNC = b'\xa5\x5a'
+VERSION = const(1)
+HEADER_FORMAT = '<2sBBBBB'          # sync, version, tester id, frame type, sequence, payload size
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+TYPE_OFFSET = const(4)
+SEQUENCE_OFFSET = const(5)
+STATUS_FORMAT = '<BBIIIIIIIHHIIHH'  # state, round, cycle, cycles, elapsed s, on ms, off ms, measured on us,
+                                    # measured off us, rate %, gc collections, mem free, mem alloc, warnings, errors
+STATUS_SIZE = struct.calcsize(STATUS_FORMAT)
+CHECKSUM_SIZE = const(2)
+FRAME_SIZE = HEADER_SIZE + STATUS_SIZE + CHECKSUM_SIZE
+
+STATUS = const(1)                   # the frame type
+FLAG_FIRST = const(0x80)            # or-ed into the frame type of the first frame a stream sends
+TYPE_MASK = const(0x7f)
+
+IDLE = const(0)                     # in the menu, no test started since power up
+RUNNING = const(1)
+DONE = const(2)
+ABORTED = const(3)
+FAULT = const(4)                    # the test file stopped on an exception
+STATE_NAMES = {IDLE: "idle", RUNNING: "running", DONE: "done", ABORTED: "aborted", FAULT: "fault"}
+
+FIELDS = ('tester', 'sequence', 'state', 'round', 'cycle', 'cycles', 'elapsed_s', 'on_ms', 'off_ms', 'on_us',
+          'off_us', 'rate', 'collections', 'mem_free', 'mem_alloc', 'warnings', 'errors')
+
+INTERVAL_MS = const(1000)
+UART_ID = const(2)                  # port C of the M5Stack
+REPL_PORT = const(-1)               # TELEMETRY_UART value that shares the REPL port
+BAUD = const(115200)
+TX_PIN = const(17)
+RX_PIN = const(16)
+SEND_COST_MS = const(2)             # assumed cost of a send before one has been measured
+GUARD_MS = const(2)
+
+
+def _crc_table():
+    table = array('H', [0] * 256)
+    for byte in range(256):
+        crc = byte << 8
+        for bit in range(8):
+            crc = ((crc << 1) ^ 0x1021 if crc & 0x8000 else crc << 1) & 0xffff
+        table[byte] = crc
+    return table
+
+
+_CRC_TABLE = _crc_table()
+
+
+def _last_us(stats) -> int:
+    if stats.count == 0:
+        return 0
+    return stats.ring[stats.index - 1]  # index 0 reads the end of the ring, where the last one went
+
+
+def crc16(data, start: int, end: int) -> int:
+    """
+    Args:
+        data: The bytes or bytearray holding the frame.
+        start (int): The index of the first byte covered.
+        end (int): The index after the last byte covered.
+    Returns:
+        The CRC-16/CCITT (polynomial 0x1021, initial value 0xffff) of data[start:end], without slicing it.
+    Notes:
+        One table lookup per byte.  A sum modulo 255, as Fletcher-16, can not tell 0x00 from 0xff.
+    """
+    table = _CRC_TABLE
+    crc = 0xffff
+    for index in range(start, end):
+        crc = ((crc << 8) & 0xffff) ^ table[(crc >> 8) ^ data[index]]
+    return crc
+
+
+class TelemetryStream:
+    """
+    Args:
+        port: Where the frames are written, anything with write(), i.e. a machine.UART.
+        interval_ms (int): The time between two frames in milliseconds. Default = INTERVAL_MS
+        tester_id (int): 0 to 255, tells the testers apart on the host. Default = 0
+    Notes:
+        start() describes the round that is starting and makes the next service() send at once, update() is
+        called after every cycle and only stores the cycle number, finish() sends the final state of the round
+        right away.  The rest of a frame is read from the EtaEstimator, GcScheduler and TimingCapture of the
+        round when it is sent.  sent counts the frames written.
+    """
+    def __init__(self, port, interval_ms: int=INTERVAL_MS, tester_id: int=0):
+        self.port = port
+        self.write = port.write
+        self.interval_ms = interval_ms
+        self.buffer = bytearray(FRAME_SIZE)
+        struct.pack_into(HEADER_FORMAT, self.buffer, 0, SYNC, VERSION, tester_id, STATUS | FLAG_FIRST, 0,
+                         STATUS_SIZE)
+        self.sequence = 0
+        self.sent = 0
+        self.cost_ms = SEND_COST_MS
+        self.sent_ms = utime.ticks_ms()
+        self.due = True
+        self.state = IDLE
+        self.round = 0
+        self.cycle = 0
+        self.cycles = 0
+        self.on_time_ms = 0
+        self.off_time_ms = 0
+        self.eta = None
+        self.collector = None
+        self.capture = None
+
+    def start(self, round_index: int, cycles: int, on_time_ms: int, off_time_ms: int, cycle_num: int=0,
+              eta=None, collector=None, capture=None):
+        """
+        Args:
+            round_index (int): The index of the round in the test file, from 0.
+            cycles (int): The number of cycles of the round.
+            on_time_ms (int): The nominal ON time in milliseconds.
+            off_time_ms (int): The nominal OFF time in milliseconds.
+            cycle_num (int): The last cycle completed, for a round resumed part way through. Default = 0
+            eta (EtaEstimator): The elapsed time and cycle rate. Default = None, sent as 0
+            collector (GcScheduler): The gc collections. Default = None, sent as 0
+            capture (TimingCapture): The measured ON and OFF times. Default = None, sent as 0
+        Returns:
+            Nothing
+        """
+        self.state = RUNNING
+        self.round = round_index
+        self.cycles = cycles
+        self.cycle = cycle_num
+        self.on_time_ms = on_time_ms
+        self.off_time_ms = off_time_ms
+        self.eta = eta
+        self.collector = collector
+        self.capture = capture
+        self.due = True
+
+    def update(self, cycle_num: int):
+        self.cycle = cycle_num
+
+    def finish(self, state: int, cycle_num: int=None):
+        """
+        Args:
+            state (int): DONE, ABORTED or FAULT
+            cycle_num (int): The last cycle completed. Default = None, the one given to update()
+        Returns:
+            Nothing
+        Notes:
+            Sends at once, the relay is idle.
+        """
+        self.state = state
+        if cycle_num is not None:
+            self.cycle = cycle_num
+        self.send()
+
+    def service(self, slack_ms: int) -> bool:
+        """
+        Args:
+            slack_ms (int): The time in milliseconds until the next relay edge.
+        Returns:
+            True if a frame was sent.
+        """
+        if not self.due and utime.ticks_diff(utime.ticks_ms(), self.sent_ms) < self.interval_ms:
+            return False
+        if self.cost_ms + GUARD_MS >= slack_ms:
+            return False
+        self.send()
+        return True
+
+    def send(self):
+        """
+        Returns:
+            Nothing
+        Notes:
+            Packs the frame into the buffer and writes it, without allocating.
+        """
+        start = utime.ticks_us()
+        elapsed_s = 0
+        rate = 0
+        if self.eta is not None:
+            elapsed_s = self.eta.elapsed_s
+            rate = min(self.eta.rate(), 0xffff)
+        collections = 0
+        if self.collector is not None:
+            collections = self.collector.collections & 0xffff
+        on_us = 0
+        off_us = 0
+        if self.capture is not None:
+            on_us = _last_us(self.capture.on)
+            off_us = _last_us(self.capture.off)
+        buffer = self.buffer
+        buffer[SEQUENCE_OFFSET] = self.sequence
+        struct.pack_into(STATUS_FORMAT, buffer, HEADER_SIZE, self.state, self.round & 0xff, self.cycle, self.cycles,
+                         elapsed_s, self.on_time_ms, self.off_time_ms, on_us, off_us, rate, collections,
+                         gc.mem_free(), gc.mem_alloc(), min(log.ring.warnings, 0xffff), min(log.ring.errors, 0xffff))
+        struct.pack_into('<H', buffer, FRAME_SIZE - CHECKSUM_SIZE, crc16(buffer, 2, FRAME_SIZE - CHECKSUM_SIZE))
+        self.write(buffer)
+        buffer[TYPE_OFFSET] = STATUS
+        self.sequence = (self.sequence + 1) & 0xff
+        self.sent += 1
+        self.due = False
+        self.sent_ms = utime.ticks_ms()
+        cost_ms = (utime.ticks_diff(utime.ticks_us(), start) + 999) // 1000
+        self.cost_ms = max(cost_ms, (self.cost_ms * 7 + cost_ms) // 8)
+
+
+def open_stream():
+    """
+    Returns:
+        A TelemetryStream set up from telemetry_config.py, or None if there is no such module or its
+        TELEMETRY_INTERVAL_MS is not above 0.
+    Notes:
+        A machine.UART numbered TELEMETRY_UART, default UART_ID, is opened at TELEMETRY_BAUD on the TELEMETRY_TX
+        and TELEMETRY_RX pins.  TELEMETRY_UART = REPL_PORT writes to the REPL port instead, for a tester with
+        nothing wired to port C; a terminal left open on it shows the frames as noise.
+    """
+    try:
+        import telemetry_config as config
+    except ImportError:
+        return None
+    interval_ms = getattr(config, 'TELEMETRY_INTERVAL_MS', 0)
+    if interval_ms <= 0:
+        return None
+    uart_id = getattr(config, 'TELEMETRY_UART', UART_ID)
+    if uart_id == REPL_PORT:
+        port = getattr(sys.stdout, 'buffer', sys.stdout)
+    else:
+        import machine
+        port = machine.UART(uart_id, baudrate=getattr(config, 'TELEMETRY_BAUD', BAUD),
+                            tx=getattr(config, 'TELEMETRY_TX', TX_PIN), rx=getattr(config, 'TELEMETRY_RX', RX_PIN))
+    return TelemetryStream(port, interval_ms, getattr(config, 'TESTER_ID', 0))
+
+
+class FrameDecoder:
+    """
+    Notes:
+        Host side.  feed() takes the bytes read so far, in chunks of any size, and returns the STATUS frames
+        completed by them as tuples in FIELDS order.  A frame split between two chunks is kept for the next
+        call.  frames counts the valid frames, bad the candidates whose header or checksum did not match,
+        skipped the bytes that were not part of a frame and lost the frames missing from the sequence numbers.
+        The first frame of a stream carries FLAG_FIRST, so a tester that starts again after a reset is not taken
+        as having lost frames, while frames lost across the wrap of the sequence number from 255 to 0 are.
+    """
+    def __init__(self):
+        self.pending = b''
+        self.frames = 0
+        self.bad = 0
+        self.skipped = 0
+        self.lost = 0
+        self.unknown = 0  # valid frames of a type this decoder does not know
+        self.sequences = {}  # tester id -> last sequence number seen
+
+    def feed(self, data) -> list:
+        buffer = self.pending + bytes(data)
+        frames = []
+        offset = 0
+        while True:
+            start = buffer.find(SYNC, offset)
+            if start < 0:
+                end = len(buffer) - 1 if buffer[-1:] == SYNC[:1] else len(buffer)  # keep half a sync
+                self.skipped += max(end - offset, 0)
+                offset = max(end, offset)
+                break
+            self.skipped += start - offset
+            offset = start
+            if len(buffer) - offset < HEADER_SIZE:
+                break
+            sync, version, tester, kind, sequence, size = struct.unpack_from(HEADER_FORMAT, buffer, offset)
+            end = offset + HEADER_SIZE + size + CHECKSUM_SIZE
+            if version != VERSION:
+                self._reject()
+                offset += 1
+                continue
+            if end > len(buffer):
+                break
+            if struct.unpack_from('<H', buffer, end - CHECKSUM_SIZE)[0] != crc16(buffer, offset + 2,
+                                                                                end - CHECKSUM_SIZE):
+                self._reject()
+                offset += 1
+                continue
+            self.frames += 1
+            last = self.sequences.get(tester)
+            if last is not None and not kind & FLAG_FIRST:
+                self.lost += (sequence - last - 1) & 0xff
+            self.sequences[tester] = sequence
+            if kind & TYPE_MASK == STATUS and size == STATUS_SIZE:
+                frames.append((tester, sequence) + struct.unpack_from(STATUS_FORMAT, buffer, offset + HEADER_SIZE))
+            else:
+                self.unknown += 1
+            offset = end
+        self.pending = buffer[offset:]
+        return frames
+
+    def _reject(self):
+        self.bad += 1
+        self.skipped += 1
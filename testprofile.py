@@ -0,0 +1,161 @@
+"""
+Declarative test profiles.
+
+A profile is a small text file describing a test, read line by line without the compiler, so loading one costs
+a few hundred bytes of heap instead of a module compile:
+
+    # 32109 Rev6 cycle test
+    name = 32109r6 Cycle Test
+    version = Version 1.1
+    relay = 2
+    inverted = 0
+    start = ON
+    end = OFF
+
+    [round]
+    cycles = 1000
+    pulse_width_ms = 3000
+    duty = 90
+
+    [round]
+    cycles = 1000
+    on_ms = 20
+    off_ms = 100
+    dwell_ms = 300
+    dwell_every = 100
+
+Keys before the first [round] apply to every round, and a profile without any [round] is a single round.
+Comments start with '#' at the start of a line or after a space or a tab.
+"""
+
+PROFILE_SUFFIX = '.cyc'
+
+PROFILE_KEYS = {
+    'name': str,            # first header line
+    'version': str,         # second header line
+    'relay': int,           # GPIO pin of the relay
+    'inverted': int,        # 1 = active low, 0 = active high
+    'start': str,           # relay level before the first round, ON or OFF
+    'end': str,             # relay level after the last round, ON or OFF
+}
+
+ROUND_KEYS = {
+    'cycles': int,
+    'on_ms': int,
+    'off_ms': int,
+    'pulse_width_ms': int,  # takes priority over on_ms and off_ms, as in Test
+    'duty': float,          # duty cycle in percent, used with pulse_width_ms
+    'dwell_ms': int,        # hold the relay this long before every dwell_every-th cycle
+    'dwell_every': int,
+    'dwell_level': str,     # ON or OFF, the relay level held during the dwell. Default = ON
+    'engine': str,          # loop, timer, table, async or thread, see Test
+    'capture': int,
+    'log': str,
+}
+
+LEVELS = {'ON': True, 'OFF': False}
+
+ENGINES = ('loop', 'timer', 'table', 'async', 'thread')
+
+
+class Profile:
+    """
+    Notes:
+        name, version, relay, inverted, start and end come from the profile keys (start and end are None when
+        not given).  rounds holds one dict of round keys per round, with the defaults merged in.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.name = ''
+        self.version = ''
+        self.relay = 2
+        self.inverted = 0
+        self.start = None
+        self.end = None
+        self.rounds = []
+
+
+def _level(path: str, line_num: int, value: str) -> bool:
+    try:
+        return LEVELS[value.upper()]
+    except KeyError:
+        raise ValueError("%s:%d: expected ON or OFF, not %s" % (path, line_num, value))
+
+
+def _strip_comment(line: str) -> str:
+    end = len(line)
+    for marker in (' #', '\t#'):
+        comment = line.find(marker)
+        if 0 <= comment < end:
+            end = comment
+    return line[:end].strip()
+
+
+def load_profile(path: str) -> Profile:
+    """
+    Args:
+        path (str): The profile, i.e. '/sd/TEST_32109r6.cyc'
+    Returns:
+        The Profile
+    Notes:
+        Raises ValueError with the file and line number for unknown keys and bad values.
+    """
+    profile = Profile(path)
+    defaults = {}
+    current = defaults
+    round_lines = []  # the line of every [round], for the errors found once the defaults are merged in
+    line_num = 0
+    with open(path, 'r') as profile_file:
+        for line in profile_file:
+            line_num += 1
+            line = _strip_comment(line)
+            if not line or line[0] == '#':
+                continue
+            if line == '[round]':
+                current = {}
+                profile.rounds.append(current)
+                round_lines.append(line_num)
+                continue
+            if '=' not in line:
+                raise ValueError("%s:%d: expected key = value" % (path, line_num))
+            key, value = line.split('=', 1)
+            key = key.strip()
+            value = value.strip()
+            if key in ROUND_KEYS:
+                try:
+                    current[key] = ROUND_KEYS[key](value)
+                except ValueError:
+                    raise ValueError("%s:%d: bad value for %s: %s" % (path, line_num, key, value))
+                if key == 'dwell_level':
+                    _level(path, line_num, value)
+                elif key == 'engine' and value not in ENGINES:
+                    raise ValueError("%s:%d: expected one of %s, not %s" % (path, line_num, ', '.join(ENGINES), value))
+                elif key == 'cycles' and current[key] <= 0:
+                    raise ValueError("%s:%d: cycles must be above 0, not %s" % (path, line_num, value))
+                elif key == 'duty' and not 0 <= current[key] <= 100:
+                    raise ValueError("%s:%d: duty must be within 0 to 100, not %s" % (path, line_num, value))
+            elif key in PROFILE_KEYS and current is defaults:
+                if key in ('start', 'end'):
+                    value = _level(path, line_num, value)
+                else:
+                    try:
+                        value = PROFILE_KEYS[key](value)
+                    except ValueError:
+                        raise ValueError("%s:%d: bad value for %s: %s" % (path, line_num, key, value))
+                setattr(profile, key, value)
+            else:
+                raise ValueError("%s:%d: unknown key %s" % (path, line_num, key))
+
+    if not profile.rounds:
+        profile.rounds.append({})
+        round_lines.append(1)
+    for round_keys, round_line in zip(profile.rounds, round_lines):
+        for key in defaults:
+            if key not in round_keys:
+                round_keys[key] = defaults[key]
+        if 'cycles' not in round_keys:
+            raise ValueError("%s:%d: every round needs cycles" % (path, round_line))
+        if not round_keys.get('pulse_width_ms', 0) and round_keys.get('on_ms', 0) + round_keys.get('off_ms', 0) <= 0:
+            raise ValueError("%s:%d: a round needs pulse_width_ms, or on_ms and off_ms adding up to more than 0"
+                             % (path, round_line))
+    return profile
@@ -0,0 +1,146 @@
+"""
+Integer formatting of times and truncated numbers for the display.
+
+The first versions of pretty_time() and truncate() went through floats and string splitting, i.e.
+str(float(original_number)).split('.').  These use integer arithmetic on integer input and give the same text.
+The one exception is the seconds at an exact half, i.e. 1005ms: "%.2f" rounds the binary value of 1.005, which
+is just below or just above the half depending on the number and on the float width of the port, so those
+still go through the float to round the same way.  tools/bench_timefmt.py compares both versions and measures
+the time and heap of a call, on the host and on the device.
+"""
+
+from micropython import const
+
+SECOND_MS = const(1000)
+MINUTE_MS = const(60000)
+HOUR_MS = const(3600000)
+DAY_MS = const(86400000)
+WEEK_MS = const(604800000)
+YEAR_MS = 31449600000  # 52 weeks, too big for a small int on the device
+
+CACHE_SIZE = const(16)
+
+_DIGITS = ("", "0", "00", "000", "0000", "00000", "000000")
+
+
+def truncate(original_number, precision: int=1) -> str:
+    """
+    Args:
+        original_number: The number that you want truncated (not rounded)
+        precision: Int defining how many decimal places to truncate at.
+                   Default = 1
+    Returns: The string of the original number, truncated to the specified number of decimal places.
+    Notes: An int is formatted without going through a float.  A float is scaled to an int once, which
+           truncates it the same way, without the digits the float conversion adds on the MCU.
+    """
+    precision = int(precision)
+    if precision <= 0:
+        return str(int(original_number))
+    if isinstance(original_number, int):
+        return "%d.%s" % (original_number, _zeros(precision))
+    scale = 10 ** precision
+    number = abs(original_number)
+    scaled = int(number * scale)
+    if (scaled + 1) / scale == number:
+        scaled += 1  # the product fell just short, i.e. 33.3 * 100 = 3329.9999999999995
+    sign = "-" if original_number < 0 else ""
+    whole, fraction = divmod(scaled, scale)
+    return "%s%d.%0*d" % (sign, whole, precision, fraction)
+
+
+def _zeros(count: int) -> str:
+    if count < len(_DIGITS):
+        return _DIGITS[count]
+    return "0" * count
+
+
+def pretty_time(milliseconds: int, precision_ms: int=1, verbose: bool=False) -> str:
+    """
+    Args:
+        milliseconds: The value in milliseconds to convert
+        precision_ms: The number of digits to show for the milliseconds portion of the output.
+                     Default = 1
+        verbose: If verbose is True, it will output days, hours, minutes, seconds, milliseconds.
+                 If verbose is False, it will display only the minimum values needed.
+                 Default = False
+
+                 If a negative value is entered, it is set to 0
+
+    Returns: A string with the converted time in human readable format with the precision specified.
+    """
+    if milliseconds < 0:
+        milliseconds = 0  # No negatives for you ...
+    if not isinstance(milliseconds, int):
+        if milliseconds < SECOND_MS:
+            return "%sms" % truncate(milliseconds, precision=precision_ms)
+        milliseconds = int(milliseconds)
+
+    if verbose:
+        seconds, milliseconds = divmod(milliseconds, SECOND_MS)
+        minutes, seconds = divmod(seconds, 60)
+        hours, minutes = divmod(minutes, 60)
+        days, hours = divmod(hours, 24)
+        weeks, days = divmod(days, 7)
+        years, weeks = divmod(weeks, 52)
+        return "%1dy %1dw %1dd %1dh %02dm %02d.%3ds" % (years, weeks, days, hours, minutes, seconds, milliseconds)
+
+    if milliseconds < SECOND_MS:
+        return "%sms" % truncate(milliseconds, precision=precision_ms)
+    if milliseconds < MINUTE_MS:
+        if milliseconds % 10 == 5:
+            return "%.2fs" % (milliseconds / SECOND_MS)  # rounded as the float is, see the module notes
+        hundredths = (milliseconds + 5) // 10
+        return "%d.%02ds" % (hundredths // 100, hundredths % 100)
+    if milliseconds < HOUR_MS:
+        minutes, seconds = divmod(milliseconds, MINUTE_MS)
+        return "%02dm %02ds" % (minutes, seconds // SECOND_MS)
+    if milliseconds < DAY_MS:
+        minutes, seconds = divmod(milliseconds, MINUTE_MS)
+        hours, minutes = divmod(minutes, 60)
+        return "%1dh %02dm %02ds" % (hours, minutes, seconds // SECOND_MS)
+    if milliseconds < WEEK_MS:
+        hours, minutes = divmod(milliseconds, HOUR_MS)
+        days, hours = divmod(hours, 24)
+        return "%1dd %1dh %02dm" % (days, hours, minutes // MINUTE_MS)
+    if milliseconds < YEAR_MS:
+        days, hours = divmod(milliseconds, DAY_MS)
+        weeks, days = divmod(days, 7)
+        return "%1dw %1dd %1dh" % (weeks, days, hours // HOUR_MS)
+    weeks, days = divmod(milliseconds, WEEK_MS)
+    years, weeks = divmod(weeks, 52)
+    return "%1dy %1dw %1dd" % (years, weeks, days // DAY_MS)
+
+
+class TimeTextCache:
+    """
+    Args:
+        size (int): The number of texts kept. Default = CACHE_SIZE
+    Notes:
+        Remembers the text of the times shown again and again, i.e. the ON and OFF times of the parameter
+        pane, which are the same for every round of most tests.  When full it is emptied and starts again,
+        which costs less than keeping track of the oldest entry.
+    """
+    def __init__(self, size: int=CACHE_SIZE):
+        self.size = size
+        self.texts = {}
+        self.hits = 0
+        self.misses = 0
+
+    def pretty_time(self, milliseconds: int, precision_ms: int=1) -> str:
+        """
+        Args:
+            milliseconds: The value in milliseconds to convert
+            precision_ms: As for pretty_time(). Default = 1
+        Returns:
+            pretty_time(milliseconds, precision_ms)
+        """
+        key = (milliseconds, precision_ms)
+        text = self.texts.get(key)
+        if text is not None:
+            self.hits += 1
+            return text
+        self.misses += 1
+        if len(self.texts) >= self.size:
+            self.texts.clear()
+        text = self.texts[key] = pretty_time(milliseconds, precision_ms)
+        return text
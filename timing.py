@@ -0,0 +1,258 @@
+"""
+Measurement of the real ON and OFF durations of a running test.
+
+Every edge is timestamped with ticks_us().  The durations of the last cycles are kept in preallocated ring
+buffers, and running statistics and a coarse histogram of the deviation from the nominal time are updated in
+place, so recording a cycle does not allocate anything on the heap.
+"""
+
+import utime
+from array import array
+
+from cyclelog import FLAG_SKIPPED, FLAG_LAST
+
+HISTOGRAM_BINS = 16
+SQUARE_SPLIT = 24   # the sum of squared deviations is kept as hi << SQUARE_SPLIT + lo, both small ints
+MAX_DEVIATION_US = 32000  # larger deviations are clipped, so sq_lo plus a square still fits in a small int
+
+
+class PhaseStats:
+    """
+    Args:
+        nominal_ms (int): The nominal duration of the phase in milliseconds.
+        size (int): The number of durations kept in the ring buffer.
+        bin_us (int): The width of a histogram bin in microseconds.
+    Notes:
+        Deviations from the nominal duration are accumulated instead of the durations themselves, which keeps
+        the sums small enough for MicroPython small ints.
+    """
+    def __init__(self, nominal_ms: int, size: int, bin_us: int):
+        self.nominal_us = nominal_ms * 1000
+        self.bin_us = bin_us
+        self.ring = array('l', [0] * size)
+        self.histogram = array('L', [0] * HISTOGRAM_BINS)
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.index = 0
+        self.min_us = 0
+        self.max_us = 0
+        self.sum_dev = 0
+        self.sq_lo = 0
+        self.sq_hi = 0
+        self.clipped = 0
+        for i in range(len(self.histogram)):
+            self.histogram[i] = 0
+
+    def add(self, duration_us: int):
+        self.ring[self.index] = duration_us
+        self.index += 1
+        if self.index >= len(self.ring):
+            self.index = 0
+
+        if self.count == 0 or duration_us < self.min_us:
+            self.min_us = duration_us
+        if self.count == 0 or duration_us > self.max_us:
+            self.max_us = duration_us
+        self.count += 1
+
+        dev = duration_us - self.nominal_us
+        if dev > MAX_DEVIATION_US:
+            dev = MAX_DEVIATION_US
+            self.clipped += 1
+        elif dev < -MAX_DEVIATION_US:
+            dev = -MAX_DEVIATION_US
+            self.clipped += 1
+        self.sum_dev += dev
+        self.sq_lo += dev * dev
+        if self.sq_lo >= 1 << SQUARE_SPLIT:
+            self.sq_hi += self.sq_lo >> SQUARE_SPLIT
+            self.sq_lo &= (1 << SQUARE_SPLIT) - 1
+
+        slot = dev // self.bin_us + HISTOGRAM_BINS // 2
+        if slot < 0:
+            slot = 0
+        elif slot >= HISTOGRAM_BINS:
+            slot = HISTOGRAM_BINS - 1
+        self.histogram[slot] += 1
+
+    def mean_us(self) -> float:
+        if self.count == 0:
+            return 0
+        return self.nominal_us + self.sum_dev / self.count
+
+    def stddev_us(self) -> float:
+        if self.count < 2:
+            return 0
+        sum_sq = self.sq_hi * (1 << SQUARE_SPLIT) + self.sq_lo
+        mean_dev = self.sum_dev / self.count
+        variance = (sum_sq - self.count * mean_dev * mean_dev) / (self.count - 1)
+        return max(variance, 0) ** 0.5
+
+    def recent(self) -> list:
+        """
+        Returns:
+            The durations in the ring buffer, oldest first.
+        """
+        if self.count < len(self.ring):
+            return list(self.ring[:self.count])
+        return list(self.ring[self.index:]) + list(self.ring[:self.index])
+
+    def summary(self) -> str:
+        return "%.2f +-%.2fms" % (self.mean_us() / 1000, self.stddev_us() / 1000)
+
+
+class TimingCapture:
+    """
+    Args:
+        on_time_ms (int): The nominal ON time in milliseconds.
+        off_time_ms (int): The nominal OFF time in milliseconds.
+        size (int): The number of cycles kept in the ring buffers. Default = 256
+        bin_us (int): The width of a histogram bin in microseconds. Default = 250
+    Notes:
+        Hand the relay of the test to wrap() and drive the returned TimedRelay instead.  Call skip() after
+        anything that moves the relay behind its back, such as a periodic dwell, so the phase around it is
+        not counted.  Call finish() after the last edge to close the last cycle.
+
+        If logger is set to a CycleLogger, every cycle is also logged once its OFF phase is over.
+    """
+    def __init__(self, on_time_ms: int, off_time_ms: int, size: int=256, bin_us: int=250):
+        self.on = PhaseStats(on_time_ms, size, bin_us)
+        self.off = PhaseStats(off_time_ms, size, bin_us)
+        self.logger = None
+        self.reset()
+
+    def reset(self):
+        self.on.reset()
+        self.off.reset()
+        self.last_us = 0
+        self.last_level = -1  # -1 = the next edge only starts a phase
+        self.cycle_num = 0
+        self.cycle_open = False
+        self.cycle_start_ms = 0
+        self.cycle_flags = 0
+        self.on_us = 0
+        self.off_us = 0
+
+    def wrap(self, relay):
+        return TimedRelay(relay, self)
+
+    def skip(self):
+        self.last_level = -1
+        self.cycle_flags |= FLAG_SKIPPED
+
+    def edge(self, level: int):
+        now = utime.ticks_us()
+        if self.last_level == 1 and level == 0:
+            self.on_us = utime.ticks_diff(now, self.last_us)
+            self.on.add(self.on_us)
+        elif self.last_level == 0 and level == 1:
+            self.off_us = utime.ticks_diff(now, self.last_us)
+            self.off.add(self.off_us)
+        if level == 1:
+            self._end_cycle(0)
+            self.cycle_start_ms = utime.ticks_ms()
+            self.cycle_open = True
+        self.last_us = now
+        self.last_level = level
+
+    def finish(self, end_us: int=None):
+        """
+        Args:
+            end_us (int): The ticks_us() value at the end of the last phase, i.e. EdgeScheduler.end_us.
+                          Default = None, now
+        Returns:
+            Nothing
+        Notes:
+            Measures the OFF phase of the last cycle up to end_us and closes the cycle.
+        """
+        if end_us is None:
+            end_us = utime.ticks_us()
+        if self.last_level == 0:
+            self.off_us = utime.ticks_diff(end_us, self.last_us)
+            self.off.add(self.off_us)
+        self._end_cycle(FLAG_LAST)
+        self.last_level = -1
+
+    def _end_cycle(self, flags: int):
+        if self.cycle_open:
+            self.cycle_num += 1
+            if self.logger is not None:
+                self.logger.log(self.cycle_num, self.cycle_start_ms, self.on_us, self.off_us,
+                                self.cycle_flags | flags)
+        self.cycle_open = False
+        self.cycle_flags = 0
+        self.on_us = 0
+        self.off_us = 0
+
+    def max_jitter_us(self) -> int:
+        """
+        Returns:
+            The largest deviation from the nominal duration seen in either phase, in microseconds.
+        """
+        jitter = 0
+        for phase in (self.on, self.off):
+            if phase.count:
+                jitter = max(jitter, phase.max_us - phase.nominal_us, phase.nominal_us - phase.min_us)
+        return jitter
+
+    def results(self) -> list:
+        """
+        Returns:
+            Short lines for the results screen.
+        """
+        return ["ON  %s" % self.on.summary(),
+                "OFF %s" % self.off.summary(),
+                "Jitter %.2fms" % (self.max_jitter_us() / 1000)]
+
+    def dump(self):
+        """
+        Returns:
+            Nothing
+        Notes:
+            Prints the statistics, histograms and ring buffers over serial as CSV.
+        """
+        print("phase,nominal_us,count,min_us,max_us,mean_us,stddev_us,clipped")
+        for name, phase in (("on", self.on), ("off", self.off)):
+            print("%s,%d,%d,%d,%d,%.1f,%.1f,%d" % (name, phase.nominal_us, phase.count, phase.min_us, phase.max_us,
+                                                 phase.mean_us(), phase.stddev_us(), phase.clipped))
+        print("phase,bin_from_us,bin_to_us,count")
+        for name, phase in (("on", self.on), ("off", self.off)):
+            for slot in range(HISTOGRAM_BINS):
+                low = (slot - HISTOGRAM_BINS // 2) * phase.bin_us
+                print("%s,%d,%d,%d" % (name, low, low + phase.bin_us, phase.histogram[slot]))
+        print("sample,on_us,off_us")
+        on = self.on.recent()
+        off = self.off.recent()
+        for i in range(max(len(on), len(off))):
+            print("%d,%s,%s" % (i + 1, on[i] if i < len(on) else "", off[i] if i < len(off) else ""))
+
+
+class TimedRelay:
+    """
+    Args:
+        relay (Relay): The relay to drive.
+        capture (TimingCapture): Receives a timestamp of every edge.
+    Notes:
+        Drop-in replacement for the relay in the test engines.
+    """
+    def __init__(self, relay, capture: TimingCapture):
+        self.relay = relay
+        self.capture = capture
+
+    def on(self):
+        self.relay.on()
+        self.capture.edge(1)
+
+    def off(self):
+        self.relay.off()
+        self.capture.edge(0)
+
+    def value(self, value=None):
+        if value is None:
+            return self.relay.value()
+        if value:
+            self.on()
+        else:
+            self.off()
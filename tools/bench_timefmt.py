@@ -0,0 +1,155 @@
+"""
+Compares the float based pretty_time() and truncate() of earlier versions with the integer ones of timefmt.py:
+the texts they give for a sweep of values, then the time and heap each takes per call.
+
+Runs on the host, and on the device once copied to /flash next to timefmt.py:
+    python tools/bench_timefmt.py
+    >>> import bench_timefmt
+"""
+
+import gc
+import sys
+
+try:
+    import utime
+    ON_DEVICE = True
+except ImportError:
+    import os
+    import time
+    import tracemalloc
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    import sim
+    sim.install()
+    ON_DEVICE = False
+
+import timefmt
+
+ROUNDS = 200 if ON_DEVICE else 2000
+SWEEP = (0, 1, 4, 50, 250, 999, 1000, 1005, 1234, 4321, 59994, 59995, 59999, 60000, 61500, 3599999, 3600000,
+         5025000, 86399999, 86400000, 90061000, 604799999, 604800000, 1234567890, 31449600001, 98765432101)
+
+
+def old_truncate(original_number, precision=1):
+    precision = int(precision)
+    if precision > 0:
+        temp = str(float(original_number)).split('.')
+        temp[1] = temp[1]+('0'*precision)
+        truncated_number = temp[0]+'.'+temp[1][:precision]
+    else:
+        truncated_number = str(int(original_number))
+    return truncated_number
+
+
+def old_pretty_time(milliseconds, precision_ms=1, verbose=False):
+    years = weeks = days = hours = minutes = 0
+    if milliseconds < 0:
+        milliseconds = 0
+    if not verbose:
+        if milliseconds < 1000:
+            time = str("%sms" % old_truncate(milliseconds, precision=precision_ms))
+        elif milliseconds < 60000:
+            time = str("%04.2fs" % (milliseconds / 1000))
+        elif milliseconds < 3600000:
+            minutes, seconds = divmod(milliseconds, 60000)
+            seconds = int(seconds/1000)
+            time = str("%02dm %02ds" % (minutes, seconds))
+        elif milliseconds < 86400000:
+            minutes, seconds = divmod(milliseconds, 60000)
+            seconds = int(seconds / 1000)
+            hours, minutes = divmod(minutes, 60)
+            time = str("%1dh %02dm %02ds" % (hours, minutes, seconds))
+        elif milliseconds < 604800000:
+            hours, minutes = divmod(milliseconds, 3600000)
+            minutes = int(minutes/60000)
+            days, hours = divmod(hours, 24)
+            time = str("%1dd %1dh %02dm" % (days, hours, minutes))
+        elif milliseconds < 31449600000:
+            days, hours = divmod(milliseconds, 86400000)
+            hours = int(hours/3600000)
+            weeks, days = divmod(days, 7)
+            time = str("%1dw %1dd %1dh" % (weeks, days, hours))
+        elif milliseconds > 31449600000:
+            weeks, days = divmod(milliseconds, 604800000)
+            days = int(days/86400000)
+            years, weeks = divmod(weeks, 52)
+            time = str("%1dy %1dw %1dd" % (years, weeks, days))
+    else:
+        seconds, milliseconds = divmod(milliseconds, 1000)
+        minutes, seconds = divmod(seconds, 60)
+        hours, minutes = divmod(minutes, 60)
+        days, hours = divmod(hours, 24)
+        weeks, days = divmod(days, 7)
+        years, weeks = divmod(weeks, 52)
+        time = str("%1dy %1dw %1dd %1dh %02dm %02d.%3ds" % (years, weeks, days, hours, minutes, seconds, milliseconds))
+    return time
+
+
+def compare() -> int:
+    """
+    Returns:
+        The number of values for which the old and the new versions differ, each printed.
+    """
+    differences = 0
+    for value in SWEEP:
+        for verbose in (False, True):
+            old, new = old_pretty_time(value, 1, verbose), timefmt.pretty_time(value, 1, verbose)
+            if old != new:
+                differences += 1
+                print("pretty_time(%d, verbose=%s): %r != %r" % (value, verbose, old, new))
+    for value in (0, 7, 250, -5, 71.42857142857143, 33.3, 0.5, -1.57):
+        for precision in (0, 1, 2, 3):
+            old, new = old_truncate(value, precision), timefmt.truncate(value, precision)
+            if old != new:
+                differences += 1
+                print("truncate(%r, %d): %r != %r" % (value, precision, old, new))
+    halves = 0
+    for value in range(1005, 60000, 10):
+        if old_pretty_time(value) != timefmt.pretty_time(value):
+            halves += 1
+    print("Seconds rounded differently at an exact half: %d of %d" % (halves, (60000 - 1005) // 10 + 1))
+    return differences
+
+
+def _ticks_us() -> int:
+    if ON_DEVICE:
+        return utime.ticks_us()
+    return time.perf_counter_ns() // 1000  # the utime of the simulator runs on a virtual clock
+
+
+def _heap_per_call(func, args) -> int:
+    if not ON_DEVICE:
+        tracemalloc.start()  # the heap is freed as soon as the call returns, so count the peak of one call
+        func(*args)
+        used = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return used
+    gc.collect()
+    gc.disable()
+    free = gc.mem_free()
+    for _ in range(ROUNDS):
+        func(*args)
+    used = free - gc.mem_free()
+    gc.enable()
+    return used // ROUNDS
+
+
+def measure(name: str, func, *args):
+    start = _ticks_us()
+    for _ in range(ROUNDS):
+        func(*args)
+    elapsed = _ticks_us() - start
+    print("%-30s %8dns/call %6dB/call" % (name, elapsed * 1000 // ROUNDS, _heap_per_call(func, args)))
+
+
+def benchmark():
+    cache = timefmt.TimeTextCache()
+    for value in (250, 4321, 5025000):
+        measure("old pretty_time(%d)" % value, old_pretty_time, value, 1)
+        measure("new pretty_time(%d)" % value, timefmt.pretty_time, value, 1)
+        measure("cached pretty_time(%d)" % value, cache.pretty_time, value, 1)
+    measure("old truncate(71.428, 2)", old_truncate, 71.42857142857143, 2)
+    measure("new truncate(71.428, 2)", timefmt.truncate, 71.42857142857143, 2)
+
+
+print("%d differences" % compare())
+benchmark()
@@ -0,0 +1,58 @@
+"""
+Converts a binary cycle log written by cyclelog.CycleLogger into CSV.
+
+Usage:
+    python tools/cyclelog_csv.py LOG.bin [OUT.csv]
+"""
+
+import csv
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sim
+
+sim.install()
+
+import cyclelog
+
+COLUMNS = ('run', 'cycle', 'start_ms', 'on_us', 'off_us', 'skipped', 'overrun', 'last')
+
+
+def convert(log_path: str, out) -> int:
+    """
+    Args:
+        log_path (str): The binary log.
+        out: A text file to write the CSV to.
+    Returns:
+        The number of records converted.
+    """
+    writer = csv.writer(out)
+    writer.writerow(COLUMNS)
+    count = 0
+    for run, cycle_num, start_ms, on_us, off_us, flags in cyclelog.read_records(log_path):
+        writer.writerow((run, cycle_num, start_ms, on_us, off_us,
+                         int(bool(flags & cyclelog.FLAG_SKIPPED)),
+                         int(bool(flags & cyclelog.FLAG_OVERRUN)),
+                         int(bool(flags & cyclelog.FLAG_LAST))))
+        count += 1
+    return count
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not 1 <= len(argv) <= 2:
+        print(__doc__.strip())
+        return 2
+    if len(argv) == 2:
+        with open(argv[1], 'w', newline='') as out:
+            count = convert(argv[0], out)
+        print("%d records written to %s" % (count, argv[1]))
+    else:
+        convert(argv[0], sys.stdout)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""
+Compiles the TEST_*.py files of an SD card into the bytecode cache read by mpycache.import_test().
+
+Needs an mpy-cross of the same MicroPython version as the firmware, i.e. "pip install mpy-cross==1.9.4" for a
+firmware based on MicroPython 1.9.4.  Only tests whose source changed since they were last compiled are
+compiled again, unless --force is given.
+
+Usage:
+    python tools/precompile_tests.py [--mpy-cross PATH] [--force] SD_DIR
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sim
+
+sim.install()
+
+import catalogue
+import mpycache
+
+CACHE_NAME = os.path.basename(mpycache.CACHE_DIR)
+
+
+def precompile(sd_dir: str, mpy_cross: str='mpy-cross', force: bool=False) -> int:
+    """
+    Args:
+        sd_dir (str): The host directory holding the contents of the SD card.
+        mpy_cross (str): The mpy-cross executable. Default = 'mpy-cross'
+        force (bool): Compile every test, fresh or not. Default = False
+    Returns:
+        The number of tests compiled.
+    """
+    cache_dir = os.path.join(sd_dir, CACHE_NAME)
+    os.makedirs(cache_dir, exist_ok=True)
+    compiled = 0
+    for test_file in sorted(os.listdir(sd_dir)):
+        if not catalogue.is_test_file(test_file) or not test_file.endswith('.py'):
+            continue
+        if not force and mpycache.is_fresh(test_file, sd_dir, cache_dir):
+            continue
+        module_name = test_file[:-3]
+        source = os.path.join(sd_dir, test_file)
+        subprocess.run([mpy_cross, '-o', os.path.join(cache_dir, module_name + '.mpy'), source], check=True)
+        with open(mpycache.stamp_path(module_name, cache_dir), 'w') as stamp:
+            stamp.write(mpycache.source_digest(source) + '\n')
+        print("compiled %s" % test_file)
+        compiled += 1
+    return compiled
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile the TEST_*.py files of an SD card into .mpy files.")
+    parser.add_argument('sd_dir', help="the directory holding the contents of the SD card")
+    parser.add_argument('--mpy-cross', default='mpy-cross', help="the mpy-cross executable")
+    parser.add_argument('--force', action='store_true', help="compile every test, fresh or not")
+    args = parser.parse_args(argv)
+    try:
+        count = precompile(args.sd_dir, args.mpy_cross, args.force)
+    except FileNotFoundError:
+        print("%s not found, install it with pip install mpy-cross" % args.mpy_cross)
+        return 1
+    print("%d tests compiled" % count)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
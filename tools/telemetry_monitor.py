@@ -0,0 +1,143 @@
+"""
+Follows the telemetry stream of one or more testers, see telemetry.py.
+
+Every SOURCE is a serial port (needs pyserial), a file recorded from one, i.e. with python -m sim --telemetry, or -
+for stdin.  A line is printed for every STATUS frame, prefixed with the source and the tester id, so many testers
+can be followed from one terminal.  With --summary only the last frame of each tester is printed, once every
+source has ended, followed by the decoder counters.
+
+Usage:
+    python tools/telemetry_monitor.py [--baud N] [--summary] SOURCE [SOURCE ...]
+"""
+
+import argparse
+import os
+import queue
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sim
+
+sim.install()
+
+import telemetry
+from timefmt import pretty_time
+
+READ_SIZE = 256
+
+
+def open_source(source: str, baud: int):
+    """
+    Args:
+        source (str): A serial port, a recorded file or - for stdin.
+        baud (int): The baud rate of a serial port.
+    Returns:
+        A binary file like object with read().
+    """
+    if source == '-':
+        return sys.stdin.buffer
+    if os.path.isfile(source):
+        return open(source, 'rb')
+    try:
+        import serial
+    except ImportError:
+        raise SystemExit("%s is not a file and pyserial is not installed" % source)
+    return serial.Serial(source, baud, timeout=0.2)
+
+
+def format_frame(source: str, frame: dict) -> str:
+    """
+    Args:
+        source (str): Where the frame was read.
+        frame (dict): A frame from FrameDecoder.feed(), keyed by telemetry.FIELDS.
+    Returns:
+        One line, i.e. "bench.bin#2 running r1 1234/50000 20m 34s 99% on 250/251.2ms off 100/100.4ms ..."
+    """
+    return ("%s#%d %-7s r%d %d/%d %s %d%% on %d/%.1fms off %d/%.1fms heap %dk free %dk used gc %d warn %d err %d"
+            % (source, frame['tester'], telemetry.STATE_NAMES.get(frame['state'], "?%d" % frame['state']),
+               frame['round'] + 1, frame['cycle'], frame['cycles'], pretty_time(frame['elapsed_s'] * 1000),
+               frame['rate'], frame['on_ms'], frame['on_us'] / 1000, frame['off_ms'], frame['off_us'] / 1000,
+               frame['mem_free'] // 1024, frame['mem_alloc'] // 1024, frame['collections'], frame['warnings'],
+               frame['errors']))
+
+
+def follow(source: str, stream, decoder: telemetry.FrameDecoder, frames: queue.Queue):
+    """
+    Args:
+        source (str): The name of the source.
+        stream: The open source.
+        decoder (FrameDecoder): The decoder of this source.
+        frames (queue.Queue): Gets (source, frame) for every frame decoded and (source, None) at the end.
+    Returns:
+        Nothing
+    """
+    try:
+        while True:
+            data = stream.read(READ_SIZE)
+            if data is None:
+                continue
+            if not data:
+                if os.path.isfile(source) or source == '-':
+                    break
+                continue  # a serial port that timed out
+            for values in decoder.feed(data):
+                frames.put((source, dict(zip(telemetry.FIELDS, values))))
+    finally:
+        frames.put((source, None))
+
+
+def monitor(sources: list, baud: int=115200, summary: bool=False, out=sys.stdout) -> dict:
+    """
+    Args:
+        sources (list): The sources to follow, see open_source().
+        baud (int): The baud rate of the serial ports. Default = 115200
+        summary (bool): Only print the last frame of each tester, at the end. Default = False
+        out: Where the lines are printed. Default = sys.stdout
+    Returns:
+        The FrameDecoder of each source, by source.
+    """
+    frames = queue.Queue()
+    decoders = {}
+    for source in sources:
+        decoders[source] = telemetry.FrameDecoder()
+        thread = threading.Thread(target=follow, args=(source, open_source(source, baud), decoders[source], frames),
+                                  daemon=True)
+        thread.start()
+    last = {}
+    running = len(sources)
+    while running:
+        source, frame = frames.get()
+        if frame is None:
+            running -= 1
+            continue
+        last[(source, frame['tester'])] = frame
+        if not summary:
+            print(format_frame(source, frame), file=out, flush=True)
+    if summary:
+        for (source, tester) in sorted(last):
+            print(format_frame(source, last[(source, tester)]), file=out)
+        for source in sources:
+            decoder = decoders[source]
+            print("%s: %d frames, %d lost, %d bad, %d bytes skipped" % (source, decoder.frames, decoder.lost,
+                                                                       decoder.bad, decoder.skipped), file=out)
+    return decoders
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('sources', nargs='+', metavar='SOURCE', help='serial port, recorded file or -')
+    parser.add_argument('--baud', type=int, default=telemetry.BAUD, help='baud rate of the serial ports')
+    parser.add_argument('--summary', action='store_true',
+                        help='only print the last frame of each tester and the decoder counters')
+    args = parser.parse_args(argv)
+    try:
+        monitor(args.sources, args.baud, args.summary)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())